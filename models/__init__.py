@@ -0,0 +1,18 @@
+# Models module
+# This module contains data models
+
+from .company_model import (
+    CompanyData,
+    COMPANY_ADAPTER,
+    COMPANY_LIST_ADAPTER,
+    validate_company,
+    validate_companies_json,
+)
+
+__all__ = [
+    "CompanyData",
+    "COMPANY_ADAPTER",
+    "COMPANY_LIST_ADAPTER",
+    "validate_company",
+    "validate_companies_json",
+]
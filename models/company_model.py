@@ -0,0 +1,134 @@
+"""
+CompanyData model
+27 trường chuẩn của dữ liệu công ty (xem README - Data Fields Extracted)
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+
+# Các trường số cần ép kiểu nhẹ khi dữ liệu đến từ scraper
+_INT_FIELDS = ('mitarbeiter', 'anzahl_immobilien')
+_FLOAT_FIELDS = ('umsatz', 'gewinn', 'gesamtwert_immobilien')
+# Các trường list lưu dạng tuple (model frozen, không cần default_factory)
+_TUPLE_FIELDS = ('sonstige_rechte', 'geschaeftsfuehrer')
+
+
+# Số đầu tiên trong chuỗi scrape (vd: "ca. 50", "1.234", "24,1 Mio. €")
+_NUMBER_RE = re.compile(r'\d[\d.,]*')
+# Chỉ có dấu chấm ngăn cách hàng nghìn kiểu Đức (vd: "1.234", "12.500.000")
+_THOUSANDS_RE = re.compile(r'^\d{1,3}(\.\d{3})+$')
+
+
+def _to_float(value: Any) -> Optional[float]:
+    """Số từ scraper (số hoặc chuỗi định dạng Đức), None nếu không đọc được"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER_RE.search(str(value))
+    if not match:
+        return None
+    number = match.group().rstrip('.,')
+    if ',' in number:
+        # "1.234,5" → 1234.5, "24,1" → 24.1
+        number = number.replace('.', '').replace(',', '.')
+    elif _THOUSANDS_RE.match(number):
+        number = number.replace('.', '')
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    """Như _to_float rồi làm tròn - "ca. 50" → 50, "1.234" → 1234"""
+    number = _to_float(value)
+    return None if number is None else int(round(number))
+
+
+class CompanyData(BaseModel):
+    """Dữ liệu công ty tổng hợp từ các scraper"""
+    
+    # Bất biến sau khi tạo, bỏ qua trường lạ, tự strip khoảng trắng của string
+    model_config = ConfigDict(frozen=True, extra='ignore', str_strip_whitespace=True)
+    
+    company_name: Optional[str] = None
+    
+    # Basic Information
+    registernummer: Optional[str] = None
+    handelsregister: Optional[str] = None
+    geschaeftsadresse: Optional[str] = None
+    unternehmenszweck: Optional[str] = None
+    land_des_hauptsitzes: Optional[str] = None
+    gerichtsstand: Optional[str] = None
+    paragraph_34_gewo: Optional[bool] = None
+    
+    # Financial Data
+    mitarbeiter: Optional[int] = None
+    umsatz: Optional[float] = None
+    gewinn: Optional[float] = None
+    insolvenz: Optional[bool] = None
+    
+    # Real Estate Data
+    anzahl_immobilien: Optional[int] = None
+    gesamtwert_immobilien: Optional[float] = None
+    
+    # Other Information
+    sonstige_rechte: Optional[Tuple[str, ...]] = ()
+    gruendungsdatum: Optional[str] = None
+    aktiv_seit: Optional[str] = None
+    
+    # Contact Information (XML trả list, PDF trả string)
+    geschaeftsfuehrer: Optional[Union[Tuple[str, ...], str]] = None
+    telefonnummer: Optional[str] = None
+    email: Optional[str] = None
+    website: Optional[str] = None
+    
+    # File Data
+    html_filepath: Optional[str] = None
+    about_html: Optional[str] = None
+    pdf_filepath: Optional[str] = None
+    xml_filepath: Optional[str] = None
+    search_results_html: Optional[str] = None
+    jahresabschluss_html: Optional[str] = None
+    
+    # Additional Information
+    ust_idnr: Optional[str] = None
+    
+    @classmethod
+    def from_scraped(cls, data: Dict[str, Any]) -> "CompanyData":
+        """
+        Tạo CompanyData từ dict scraper đã làm sạch - không chạy validation
+        
+        Scraper là nguồn tin cậy nên chỉ ép kiểu nhẹ các trường số rồi dùng
+        model_construct. JSON từ bên ngoài vẫn phải qua model_validate.
+        """
+        values = {key: value for key, value in data.items() if key in cls.model_fields}
+        
+        for field in _INT_FIELDS:
+            if field in values:
+                values[field] = _to_int(values[field])
+        for field in _FLOAT_FIELDS:
+            if field in values:
+                values[field] = _to_float(values[field])
+        for field in _TUPLE_FIELDS:
+            if isinstance(values.get(field), list):
+                values[field] = tuple(values[field])
+        
+        return cls.model_construct(**values)
+
+
+# Validator dựng sẵn một lần khi import module, dùng lại cho mọi lần validate
+COMPANY_ADAPTER: TypeAdapter[CompanyData] = TypeAdapter(CompanyData)
+COMPANY_LIST_ADAPTER: TypeAdapter[List[CompanyData]] = TypeAdapter(List[CompanyData])
+
+
+def validate_company(data: Dict[str, Any]) -> CompanyData:
+    """Validate một dict từ nguồn bên ngoài thành CompanyData"""
+    return COMPANY_ADAPTER.validate_python(data)
+
+
+def validate_companies_json(raw: Union[str, bytes]) -> List[CompanyData]:
+    """Parse + validate JSON list công ty trong một lượt (không qua json.loads)"""
+    return COMPANY_LIST_ADAPTER.validate_json(raw)
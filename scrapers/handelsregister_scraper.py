@@ -12,13 +12,19 @@ import time
 import logging
 import hashlib
 import io
-from typing import Dict
-from playwright.sync_api import sync_playwright, Page
+import queue
+import re
+import shutil
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from playwright.sync_api import sync_playwright, Page, TimeoutError as PlaywrightTimeoutError
 from utils import HandelsregisterXMLParser, PDFDataExtractor
-# from models.company_model import CompanyData  # Removed - not needed
+from models import CompanyData, validate_companies_json
 
-# Force UTF-8 encoding cho console
-if sys.platform == 'win32':
+# Force UTF-8 encoding cho console (Windows chạy không có -X utf8 / PYTHONUTF8=1)
+if sys.platform == 'win32' and not sys.flags.utf8_mode:
     try:
         sys.stdout.reconfigure(encoding='utf-8', errors='replace')
         sys.stderr.reconfigure(encoding='utf-8', errors='replace')
@@ -27,13 +33,83 @@ if sys.platform == 'win32':
         sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace', line_buffering=True)
 
 # Setup logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
+# Loại register + số register (vd: "HRB182742", "HRB 124894")
+_REG_RE = re.compile(r'^(HRB|HRA|GnR|PR|VR|GsR)\s*(.*)$')
+
+# Dòng kết quả hợp lệ phải chứa tên tòa án hoặc số HRB
+_RESULT_RE = re.compile(r'Amtsgericht|HRB')
+
+# Các trường lấy từ XML - CHỈ các trường có trong CompanyData model
+# (stammkapital, letzte_eintragung, letzte_aenderung, abrufdatum không có trong model)
+_XML_FIELDS = frozenset({
+    'registernummer',
+    'handelsregister',
+    'geschaeftsfuehrer',
+    'geschaeftsadresse',
+    'unternehmenszweck',
+    'gruendungsdatum',
+    'land_des_hauptsitzes',
+    'gerichtsstand',
+    'paragraph_34_gewo',
+})
+
+# Các trường PDF backup cho XML - KHÔNG lấy gruendungsdatum vì không chính xác
+_PDF_FIELDS = frozenset({
+    'geschaeftsadresse',
+    'unternehmenszweck',
+    'geschaeftsfuehrer',
+    'handelsregister',
+    'registernummer',
+})
+
+# Tăng khi đổi parser hoặc _XML_FIELDS/_PDF_FIELDS để bỏ kết quả extract đã memo
+_EXTRACT_CACHE_VERSION = 1
+
+
+def _stat_or_none(path):
+    """os.stat trong một syscall - None nếu file không tồn tại"""
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _normalize_name(name: str) -> str:
+    """Tên company để so sánh: bỏ khoảng trắng thừa, không phân biệt hoa/thường"""
+    return ' '.join(name.split()).casefold()
+
 
 class HandelsregisterScraper:
     """Scraper cho handelsregister.de sử dụng Playwright"""
     
+    # Selector cố định - khai báo một lần ở class
+    _SEARCH_SELECTORS = (
+        'button#form\\:btnSuche',  # Button ID
+        'span.ui-button-text:has-text("Suchen")',  # German
+        'span.ui-button-text:has-text("Rechercher")',  # French
+        'span.ui-button-text:has-text("Search")',  # English
+        'button[type="submit"]',  # Generic submit
+    )
+    _AD_LINK = 'a[onclick*="Global.Dokumentart.AD"]'
+    _SI_LINK = 'a[onclick*="Global.Dokumentart.SI"]'
+    
+    # Args launch Chromium - tắt các tính năng không cần cho form + download
+    _LAUNCH_ARGS = (
+        '--no-sandbox',
+        '--disable-gpu',
+        '--disable-dev-shm-usage',
+        '--disable-extensions',
+        '--disable-blink-features=AutomationControlled',
+    )
+    # Resource không cần tải - giữ stylesheet vì menu/bảng PrimeFaces cần CSS để hiện (:visible)
+    _BLOCKED_RESOURCES = frozenset({'image', 'font', 'media'})
+    
+    # Files AD/SI đã download quá 30 ngày thì crawl lại (cùng hạn với cache Northdata)
+    _CACHE_MAX_AGE = 30 * 24 * 3600
+    
     def __init__(self, headless: bool = False, language: str = 'FR'):
         self.search_url = "https://www.handelsregister.de/rp_web/normalesuche/welcome.xhtml"
         self.headless = headless
@@ -41,7 +117,68 @@ class HandelsregisterScraper:
         self.xml_parser = HandelsregisterXMLParser()
         self.pdf_extractor = PDFDataExtractor()
         
-    def scrape_company(self, company_name: str, registernummer: str, ust_idnr: str) -> Dict:
+        # Thư mục lưu files download: data/companies/ - tính và tạo một lần
+        self._download_dir = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'companies'
+        )
+        os.makedirs(self._download_dir, exist_ok=True)
+        
+        # Memo kết quả extract theo (loại file, hash nội dung, version) - dùng chung giữa các worker
+        self._extract_cache: Dict[Tuple[str, str, int], Dict] = {}
+        self._extract_lock = threading.Lock()
+        
+        # Browser dùng chung cho nhiều company (chỉ có khi gọi start() / with)
+        self._pw = None
+        self._browser = None
+        # Cookies/session sau khi đã chọn ngôn ngữ - context mới trên browser dùng chung
+        # load lại state này nên không phải chọn ngôn ngữ lần nữa
+        self._storage_state = None
+    
+    def start(self) -> 'HandelsregisterScraper':
+        """Khởi động Playwright + Chromium một lần để tái sử dụng cho nhiều company"""
+        if self._browser is None:
+            self._pw = sync_playwright().start()
+            self._browser = self._launch_browser(self._pw)
+            logger.info("🌐 Đã khởi động browser dùng chung")
+        return self
+    
+    def stop(self):
+        """Đóng browser và Playwright dùng chung"""
+        self._storage_state = None
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception as e:
+                logger.warning(f"⚠️  Lỗi đóng browser: {str(e)}")
+            self._browser = None
+        if self._pw is not None:
+            self._pw.stop()
+            self._pw = None
+    
+    def __enter__(self) -> 'HandelsregisterScraper':
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        
+    def _launch_browser(self, playwright):
+        """Launch Chromium với _LAUNCH_ARGS"""
+        return playwright.chromium.launch(headless=self.headless, args=list(self._LAUNCH_ARGS))
+    
+    def _new_context(self, browser, storage_state: Optional[Dict] = None):
+        """Tạo BrowserContext, chặn image/font/media để giảm bytes tải về"""
+        context = browser.new_context(storage_state=storage_state)
+        context.route('**/*', self._route_resource)
+        return context
+    
+    def _route_resource(self, route):
+        """Abort resource nằm trong _BLOCKED_RESOURCES, còn lại cho đi tiếp"""
+        if route.request.resource_type in self._BLOCKED_RESOURCES:
+            route.abort()
+        else:
+            route.continue_()
+    
+    def scrape_company(self, company_name: str, registernummer: str, ust_idnr: str, force: bool = False) -> Dict:
         """
         Scrape dữ liệu công ty từ handelsregister.de
         
@@ -49,124 +186,224 @@ class HandelsregisterScraper:
             company_name: Tên công ty
             registernummer: Số đăng ký (vd: "HRB182742")
             ust_idnr: Mã số thuế VAT
+            force: True → luôn download lại, bỏ qua files AD/SI đã có
             
         Returns:
             Dict chứa dữ liệu đã scrape
         """
         logger.info(f"🚀 Bắt đầu scrape: {company_name}")
         
+        # Đã có đủ files AD/SI → extract từ files, không cần mở browser
+        if not force:
+            cached = self._extract_existing(company_name, registernummer)
+            if cached is not None:
+                return cached
+        
+        # Đã start() → chỉ tạo context mới, không launch lại browser
+        if self._browser is not None:
+            return self._scrape_in_browser(self._browser, company_name, registernummer)
+        
+        # Chưa start() (vd: server gọi từ worker thread) → browser riêng cho lần gọi này
         with sync_playwright() as p:
-            browser = p.chromium.launch(headless=self.headless)
-            page = browser.new_page()
+            browser = self._launch_browser(p)
+            try:
+                return self._scrape_in_browser(browser, company_name, registernummer)
+            finally:
+                browser.close()
+    
+    def scrape_many(self, companies: List[Dict], max_workers: int = 6, force: bool = False) -> List[Dict]:
+        """
+        Scrape nhiều company song song
+        
+        Mỗi worker thread có Playwright + browser + BrowserContext riêng (sync API
+        không cho dùng chung object giữa các thread) và dùng lại context đó cho
+        mọi company lấy từ queue.
+        
+        Args:
+            companies: List dict có 'company_name', 'registernummer'
+            max_workers: Số worker chạy song song
+            force: True → luôn download lại, bỏ qua files AD/SI đã có
             
+        Returns:
+            List kết quả theo đúng thứ tự của companies
+        """
+        results: List[Dict] = [{} for _ in companies]
+        jobs = queue.Queue()
+        for index, company in enumerate(companies):
+            cached = None if force else self._extract_existing(company['company_name'], company['registernummer'])
+            if cached is not None:
+                results[index] = cached
+            else:
+                jobs.put((index, company))
+        
+        if jobs.empty():
+            return results
+        
+        worker_count = max(1, min(max_workers, jobs.qsize()))
+        logger.info(f"🚀 Scrape {jobs.qsize()} companies với {worker_count} workers")
+        
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            futures = [executor.submit(self._scrape_worker, jobs, results) for _ in range(worker_count)]
+            for future in futures:
+                future.result()
+        
+        return results
+    
+    def _scrape_worker(self, jobs: queue.Queue, results: List[Dict]):
+        """Worker: lấy company từ queue cho tới khi hết, dùng chung một context"""
+        with sync_playwright() as p:
+            browser = self._launch_browser(p)
+            context = self._new_context(browser)
             try:
-                # 1. Truy cập trang
-                logger.info(f"🔗 Truy cập: {self.search_url}")
-                page.goto(self.search_url, wait_until='networkidle')
-                page.wait_for_timeout(2000)
-                
-                # 2. Chọn ngôn ngữ (luôn chọn)
-                self._select_language(page)
-                
-                # 3. Điền form
-                self._fill_search_form(page, company_name, registernummer)
-                
-                # 4. Click search
-                self._click_search_button(page)
-                
-                # 5. Tạo thư mục lưu files
-                download_dir = self._create_download_directory(company_name)
-                logger.info(f"📁 Download directory: {download_dir}")
-                
-                # 6. LUÔN LUÔN CRAWL - Đợi và check kết quả tìm kiếm
-                logger.info("⏱️  Đang đợi kết quả tìm kiếm...")
-                page.wait_for_load_state('networkidle')
-                page.wait_for_timeout(5000)
-                
-                # 7. Kiểm tra có kết quả
-                if self._check_results_found(page):
-                    logger.info("✅ Đã tìm thấy company - Bắt đầu download files (đè lên files cũ)")
-                    
-                    # 8. Download AD (PDF) và SI (XML) - Đè lên files cũ nếu có
-                    self._download_documents(page, download_dir, registernummer)
-                    
-                    # 9. Extract data từ PDF (trước)
-                    pdf_data = self._extract_pdf_data(download_dir, registernummer)
+                while True:
+                    try:
+                        index, company = jobs.get_nowait()
+                    except queue.Empty:
+                        return
                     
-                    # 10. Extract data từ XML (sau - override PDF)
-                    xml_data = self._extract_xml_data(download_dir, registernummer)
-                    
-                    # 11. Combine data (XML override PDF vì có format tốt hơn)
-                    data = {
-                        'registernummer': registernummer,
-                        'download_directory': download_dir,
-                        **pdf_data,  # PDF data trước (backup)
-                        **xml_data   # XML data sau (override - priority cao hơn)
-                    }
-                else:
-                    logger.warning("❌ Không tìm thấy kết quả")
-                    data = {
-                        'registernummer': registernummer,
-                        'download_directory': download_dir
-                    }
-                
+                    logger.info(f"🚀 Bắt đầu scrape: {company['company_name']}")
+                    results[index] = self._scrape_with_context(
+                        context,
+                        company['company_name'],
+                        company['registernummer']
+                    )
+            finally:
                 browser.close()
-                return data
+    
+    def _scrape_in_browser(self, browser, company_name: str, registernummer: str) -> Dict:
+        """Tạo BrowserContext mới trên browser có sẵn và scrape"""
+        # Chỉ browser dùng chung (start()) mới tái dùng state: các lần gọi riêng lẻ có thể
+        # chạy song song từ server nên không share một session JSF giữa các thread
+        storage_state = self._storage_state if browser is self._browser else None
+        context = self._new_context(browser, storage_state)
+        try:
+            return self._scrape_with_context(context, company_name, registernummer)
+        finally:
+            context.close()
+    
+    def _scrape_with_context(self, context, company_name: str, registernummer: str) -> Dict:
+        """Mở page mới trong context có sẵn, scrape rồi chỉ đóng page"""
+        page = context.new_page()
+        
+        try:
+            return self._scrape_on_page(page, company_name, registernummer)
+        except Exception as e:
+            logger.error(f"❌ Lỗi: {str(e)}")
+            return {}
+        finally:
+            page.close()
+    
+    def _scrape_on_page(self, page: Page, company_name: str, registernummer: str) -> Dict:
+        """Chạy các bước 1-11 trên page đã mở"""
+        # 1. Truy cập trang
+        logger.info(f"🔗 Truy cập: {self.search_url}")
+        page.goto(self.search_url, wait_until='domcontentloaded')
+        
+        # 2. Chọn ngôn ngữ - bỏ qua nếu session (cookies) đã ở đúng ngôn ngữ
+        if self._language_active(page):
+            logger.info(f"🌍 Ngôn ngữ {self.language} đã được chọn từ trước")
+        elif self._select_language(page) and self._storage_state is None:
+            self._storage_state = page.context.storage_state()
+        
+        # 3. Điền form
+        self._fill_search_form(page, company_name, registernummer)
+        
+        # 4. Click search
+        self._click_search_button(page)
+        
+        # 5. Files lưu vào data/companies/ (thư mục đã tạo sẵn trong __init__)
+        download_dir = self._download_dir
+        logger.info(f"📁 Download directory: {download_dir}")
+        pdf_path, xml_path = self._document_paths(registernummer)
+        
+        # 6. Đợi và check kết quả tìm kiếm (tới đây là force hoặc chưa có files hợp lệ để dùng lại)
+        logger.info("⏱️  Đang đợi kết quả tìm kiếm...")
+        page.wait_for_load_state('networkidle')
+        try:
+            page.wait_for_selector('tr.ui-widget-content', timeout=10000)
+        except Exception:
+            logger.info("ℹ️  Chưa thấy bảng kết quả sau 10s")
+        
+        # 7. Kiểm tra có kết quả
+        if self._check_results_found(page):
+            logger.info("✅ Đã tìm thấy company - Bắt đầu download files")
+            
+            # 8-10. Download AD (PDF) và SI (XML) - thay files cũ nếu có (force, hết hạn hoặc của company khác cùng HRB)
+            # Parse PDF ở thread phụ ngay khi AD tải xong, song song với download SI
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                logger.info("📥 Downloading AD (PDF)...")
+                self._download_ad_pdf(page, pdf_path)
+                pdf_future = executor.submit(self._extract_pdf_data, pdf_path)
                 
-            except Exception as e:
-                logger.error(f"❌ Lỗi: {str(e)}")
-                browser.close()
-                return {}
+                self._download_si_after_ad(page, xml_path)
+                xml_data = self._extract_xml_data(xml_path)
+                pdf_data = pdf_future.result()
+            self._write_download_meta(company_name, registernummer)
+            
+            # 11. Combine data (XML override PDF vì có format tốt hơn)
+            return {
+                'registernummer': registernummer,
+                'download_directory': download_dir,
+                **pdf_data,  # PDF data trước (backup)
+                **xml_data   # XML data sau (override - priority cao hơn)
+            }
+        
+        logger.warning("❌ Không tìm thấy kết quả")
+        return {
+            'registernummer': registernummer,
+            'download_directory': download_dir
+        }
     
-    def _select_language(self, page: Page):
-        """Chọn ngôn ngữ từ dropdown menu"""
+    def _language_active(self, page: Page) -> bool:
+        """Trang hiện tại đã hiển thị đúng ngôn ngữ chưa (theo thuộc tính lang của <html>)"""
+        try:
+            lang = page.locator('html').get_attribute('lang', timeout=1000) or ''
+            return lang.lower().startswith(self.language.lower())
+        except Exception:
+            return False
+    
+    def _select_language(self, page: Page) -> bool:
+        """Chọn ngôn ngữ từ dropdown menu, trả về True nếu chọn thành công"""
         try:
             logger.info(f"🌍 Chọn ngôn ngữ: {self.language}")
             
             # Hover để mở dropdown
             page.hover('li#localSubMenu')
-            page.wait_for_timeout(1000)
             
-            # Đợi menu hiển thị với timeout dài hơn
+            # Đợi menu hiển thị
             try:
-                page.wait_for_selector('ul.ui-menu-list[style*="display: block"]', state='visible', timeout=10000)
+                page.wait_for_selector('ul.ui-menu-list:visible', timeout=10000)
             except:
                 logger.warning("⚠️  Dropdown menu không hiển thị, thử click trực tiếp")
             
-            # Click ngôn ngữ
+            # Click ngôn ngữ và đợi trang reload xong DOM
             language_id = self.language.lower()
-            page.click(f'a#{language_id}', timeout=5000)
-            
-            # Đợi reload
-            page.wait_for_load_state('networkidle', timeout=30000)
-            page.wait_for_timeout(2000)
+            with page.expect_navigation(wait_until='domcontentloaded', timeout=30000):
+                page.click(f'a#{language_id}', timeout=5000)
             
             logger.info(f"✅ Đã chọn ngôn ngữ: {self.language}")
+            return True
         except Exception as e:
             logger.warning(f"⚠️  Không thể chọn ngôn ngữ: {str(e)}")
             logger.info("ℹ️  Tiếp tục với ngôn ngữ mặc định (German)")
+            return False
     
     def _fill_search_form(self, page: Page, company_name: str, registernummer: str):
         """Điền form tìm kiếm"""
         try:
-            register_type = self._get_register_type(registernummer)
-            register_number = self._get_register_number(registernummer)
+            register_type, register_number = self._split_register(registernummer)
             
             logger.info(f"📝 Điền form: {company_name} - {register_type}{register_number}")
             
-            # Điền tên công ty
-            page.fill('textarea#form\\:schlagwoerter', company_name)
-            page.wait_for_timeout(500)
+            # Điền tên công ty (Playwright tự đợi element sẵn sàng)
+            page.locator('textarea#form\\:schlagwoerter').fill(company_name)
             
             # Chọn loại register
-            page.click('label#form\\:registerArt_label')
-            page.wait_for_timeout(500)
-            page.click(f'li[data-label="{register_type}"]')
-            page.wait_for_timeout(500)
+            page.locator('label#form\\:registerArt_label').click()
+            page.locator(f'li[data-label="{register_type}"]').click()
             
             # Điền số register
-            page.fill('input#form\\:registerNummer', register_number)
-            page.wait_for_timeout(500)
+            page.locator('input#form\\:registerNummer').fill(register_number)
             
             logger.info("✅ Đã điền form xong")
         except Exception as e:
@@ -178,21 +415,12 @@ class HandelsregisterScraper:
             logger.info("🔍 Click nút tìm kiếm")
             
             # Thử nhiều selector khác nhau
-            selectors = [
-                'button#form\\:btnSuche',  # Button ID
-                'span.ui-button-text:has-text("Suchen")',  # German
-                'span.ui-button-text:has-text("Rechercher")',  # French
-                'span.ui-button-text:has-text("Search")',  # English
-                'button[type="submit"]',  # Generic submit
-            ]
-            
             clicked = False
-            for selector in selectors:
+            for selector in self._SEARCH_SELECTORS:
                 try:
                     locator = page.locator(selector)
-                    count = locator.count()
-                    if count > 0:
-                        page.click(selector, timeout=3000)
+                    if locator.count():
+                        locator.first.click(timeout=3000)
                         logger.info(f"✅ Clicked button with selector: {selector}")
                         clicked = True
                         break
@@ -208,52 +436,80 @@ class HandelsregisterScraper:
     def _check_results_found(self, page: Page) -> bool:
         """Kiểm tra có tìm thấy kết quả không"""
         try:
-            results_table = page.query_selector('tr.ui-widget-content')
-            if results_table:
-                page_text = page.inner_text('body')
-                if 'Amtsgericht' in page_text or 'HRB' in page_text:
-                    return True
-            return False
-        except:
+            # Lọc trong browser, không kéo toàn bộ text của body về Python
+            page.locator('tr.ui-widget-content').filter(has_text=_RESULT_RE).first.wait_for(
+                state='visible', timeout=3000
+            )
+            return True
+        except PlaywrightTimeoutError:
             return False
     
-    def _get_register_type(self, registernummer: str) -> str:
-        """Extract loại register"""
-        types = ['HRB', 'HRA', 'GnR', 'PR', 'VR', 'GsR']
-        for reg_type in types:
-            if registernummer.startswith(reg_type):
-                return reg_type
-        return 'HRB'
-    
-    def _get_register_number(self, registernummer: str) -> str:
-        """Extract số register"""
-        for reg_type in ['HRB', 'HRA', 'GnR', 'PR', 'VR', 'GsR']:
-            if registernummer.startswith(reg_type):
-                return registernummer[len(reg_type):]
-        return registernummer
-    
-    def _create_download_directory(self, company_name: str) -> str:
-        """Tạo thư mục lưu files download - Lưu vào data/companies/"""
-        import re
-        # Tạo đường dẫn: data/companies/
-        base_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
-        download_dir = os.path.join(base_dir, 'companies')
+    def _split_register(self, registernummer: str) -> Tuple[str, str]:
+        """Tách loại register và số register, mặc định là HRB"""
+        match = _REG_RE.match(registernummer)
+        if match:
+            return match.group(1), match.group(2)
+        return 'HRB', registernummer
+    
+    def _document_paths(self, registernummer: str) -> Tuple[Path, Path]:
+        """Đường dẫn file AD (PDF) và SI (XML) của một company trong data/companies/ - build một lần rồi truyền xuống"""
+        base = Path(self._download_dir)
+        return base / f"{registernummer}_AD.pdf", base / f"{registernummer}_SI.xml"
+    
+    def _meta_path(self, registernummer: str) -> Path:
+        """File meta đi kèm files AD/SI: company_name + thời điểm download"""
+        return Path(self._download_dir) / f"{registernummer}_meta.json"
+    
+    def _write_download_meta(self, company_name: str, registernummer: str):
+        """Ghi meta sau khi download xong - _extract_existing dựa vào file này để dùng lại files"""
+        try:
+            with open(self._meta_path(registernummer), 'w', encoding='utf-8') as f:
+                json.dump({'company_name': company_name, 'fetched_at': time.time()}, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"⚠️ Không thể ghi meta cho {registernummer}: {e}")
+    
+    def _extract_existing(self, company_name: str, registernummer: str) -> Optional[Dict]:
+        """
+        Extract từ files AD/SI đã download trước đó
+        
+        None (→ crawl lại) nếu chưa đủ files, không có meta, meta quá _CACHE_MAX_AGE
+        hoặc files của company khác: số HRB chỉ unique trong một Amtsgericht nên
+        phải khớp cả tên company
+        """
+        pdf_path, xml_path = self._document_paths(registernummer)
+        if not self._check_existing_files(pdf_path, xml_path):
+            return None
+        
+        try:
+            with open(self._meta_path(registernummer), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            logger.info(f"ℹ️  Chưa có meta cho files của {registernummer} - crawl lại")
+            return None
         
-        # Tạo thư mục nếu chưa tồn tại
-        os.makedirs(download_dir, exist_ok=True)
+        if _normalize_name(meta.get('company_name') or '') != _normalize_name(company_name):
+            logger.info(f"ℹ️  Files {registernummer} thuộc company khác ({meta.get('company_name')}) - crawl lại")
+            return None
+        if time.time() - meta.get('fetched_at', 0) > self._CACHE_MAX_AGE:
+            logger.info(f"ℹ️  Files {registernummer} đã quá hạn - crawl lại")
+            return None
         
-        logger.info(f"📁 Sử dụng thư mục: {download_dir}")
-        return download_dir
+        logger.info(f"♻️  Dùng lại files đã download cho {registernummer} (force=True để download lại)")
+        return {
+            'registernummer': registernummer,
+            'download_directory': self._download_dir,
+            **self._extract_pdf_data(pdf_path),  # PDF data trước (backup)
+            **self._extract_xml_data(xml_path)   # XML data sau (override)
+        }
     
-    def _check_existing_files(self, download_dir: str, registernummer: str) -> bool:
+    def _check_existing_files(self, pdf_path: Path, xml_path: Path) -> bool:
         """Kiểm tra files đã tồn tại chưa"""
         try:
-            pdf_path = os.path.join(download_dir, f"{registernummer}_AD.pdf")
-            xml_path = os.path.join(download_dir, f"{registernummer}_SI.xml")
-            
-            # Kiểm tra PDF và XML
-            pdf_exists = os.path.exists(pdf_path)
-            xml_exists = os.path.exists(xml_path)
+            # Kiểm tra PDF và XML - file rỗng (download lỗi) coi như chưa có
+            pdf_st = _stat_or_none(pdf_path)
+            xml_st = _stat_or_none(xml_path)
+            pdf_exists = pdf_st is not None and pdf_st.st_size > 0
+            xml_exists = xml_st is not None and xml_st.st_size > 0
             
             if pdf_exists and xml_exists:
                 logger.info(f"✅ Files đã tồn tại:")
@@ -270,27 +526,22 @@ class HandelsregisterScraper:
             logger.error(f"❌ Lỗi kiểm tra files: {str(e)}")
             return False
     
-    def _check_files_changed(self, page: Page, download_dir: str, registernummer: str) -> bool:
+    def _check_files_changed(self, page: Page, pdf_path: Path, xml_path: Path) -> bool:
         """Kiểm tra files mới có khác files cũ không bằng cách so sánh hash"""
         try:
             # Tạo temp directory
-            temp_dir = os.path.join(download_dir, '.temp')
-            os.makedirs(temp_dir, exist_ok=True)
+            temp_dir = pdf_path.parent / '.temp'
+            temp_dir.mkdir(parents=True, exist_ok=True)
+            temp_pdf = temp_dir / pdf_path.name
+            temp_xml = temp_dir / xml_path.name
             
             # Download files mới vào temp
             logger.info("📥 Downloading files mới để so sánh...")
-            self._download_documents(page, temp_dir, registernummer)
+            self._download_documents(page, temp_pdf, temp_xml)
             
             # So sánh hash
-            pdf_changed = self._compare_file_hash(
-                os.path.join(download_dir, f"{registernummer}_AD.pdf"),
-                os.path.join(temp_dir, f"{registernummer}_AD.pdf")
-            )
-            
-            xml_changed = self._compare_file_hash(
-                os.path.join(download_dir, f"{registernummer}_SI.xml"),
-                os.path.join(temp_dir, f"{registernummer}_SI.xml")
-            )
+            pdf_changed = self._compare_file_hash(pdf_path, temp_pdf)
+            xml_changed = self._compare_file_hash(xml_path, temp_xml)
             
             # Nếu có file nào thay đổi → move temp files sang main dir
             if pdf_changed or xml_changed:
@@ -298,38 +549,31 @@ class HandelsregisterScraper:
                 
                 # Move files mới sang main directory
                 if pdf_changed:
-                    os.replace(
-                        os.path.join(temp_dir, f"{registernummer}_AD.pdf"),
-                        os.path.join(download_dir, f"{registernummer}_AD.pdf")
-                    )
+                    os.replace(temp_pdf, pdf_path)
                 if xml_changed:
-                    os.replace(
-                        os.path.join(temp_dir, f"{registernummer}_SI.xml"),
-                        os.path.join(download_dir, f"{registernummer}_SI.xml")
-                    )
-                
-                # Clean up temp
-                import shutil
-                shutil.rmtree(temp_dir, ignore_errors=True)
-                
-                return True
-            else:
-                # Clean up temp
-                import shutil
-                shutil.rmtree(temp_dir, ignore_errors=True)
-                
-                return False
+                    os.replace(temp_xml, xml_path)
+            
+            # Clean up temp
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            
+            return pdf_changed or xml_changed
                 
         except Exception as e:
             logger.error(f"❌ Lỗi check files changed: {str(e)}")
             return False
     
-    def _compare_file_hash(self, file1: str, file2: str) -> bool:
+    def _compare_file_hash(self, file1: Path, file2: Path) -> bool:
         """So sánh hash của 2 files, return True nếu khác nhau"""
         try:
-            if not os.path.exists(file1) or not os.path.exists(file2):
+            st1 = _stat_or_none(file1)
+            st2 = _stat_or_none(file2)
+            if st1 is None or st2 is None:
                 return True  # Nếu file không tồn tại → coi như khác
             
+            # Khác size → chắc chắn khác, không cần hash
+            if st1.st_size != st2.st_size:
+                return True
+            
             hash1 = self._get_file_hash(file1)
             hash2 = self._get_file_hash(file2)
             
@@ -338,54 +582,53 @@ class HandelsregisterScraper:
         except:
             return True
     
-    def _get_file_hash(self, filepath: str) -> str:
-        """Tính MD5 hash của file"""
+    def _get_file_hash(self, filepath: Path) -> str:
+        """Tính BLAKE2b hash (16 bytes) của file - chỉ dùng để phát hiện thay đổi"""
         try:
-            md5_hash = hashlib.md5()
             with open(filepath, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    md5_hash.update(chunk)
-            return md5_hash.hexdigest()
+                if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+                    return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+                file_hash = hashlib.blake2b(digest_size=16)
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    file_hash.update(chunk)
+            return file_hash.hexdigest()
         except:
             return ""
     
-    def _download_documents(self, page: Page, download_dir: str, registernummer: str):
+    def _download_documents(self, page: Page, pdf_path: Path, xml_path: Path):
         """Download AD (PDF) và SI (XML)"""
         try:
             # Download AD (PDF)
             logger.info("📥 Downloading AD (PDF)...")
-            pdf_path = self._download_ad_pdf(page, download_dir, registernummer)
-            
-            # Wait for download to complete
-            page.wait_for_timeout(3000)
-            
-            # Reload trang để có thể download SI
-            page.reload(wait_until='networkidle')
-            page.wait_for_timeout(2000)
+            self._download_ad_pdf(page, pdf_path)
             
             # Download SI (XML)
-            logger.info("📥 Downloading SI (XML)...")
-            self._download_si_xml(page, download_dir, registernummer)
+            self._download_si_after_ad(page, xml_path)
             
             logger.info("✅ Đã download xong tất cả documents")
             
         except Exception as e:
             logger.error(f"❌ Lỗi download documents: {str(e)}")
     
-    def _download_ad_pdf(self, page: Page, download_dir: str, registernummer: str) -> str:
+    def _download_si_after_ad(self, page: Page, xml_path: Path) -> Path:
+        """Download SI (XML) ngay trên trang hiện tại - download AD không điều hướng trang"""
+        logger.info("📥 Downloading SI (XML)...")
+        if not page.locator(self._SI_LINK).count():
+            # Chỉ reload khi link SI thực sự mất khỏi DOM
+            logger.info("🔄 Không thấy link SI, reload trang...")
+            page.reload(wait_until='domcontentloaded')
+        return self._download_si_xml(page, xml_path)
+    
+    def _download_ad_pdf(self, page: Page, pdf_path: Path) -> Path:
         """Click và download AD (PDF)"""
         try:
             # Setup download handler
             with page.expect_download() as download_info:
-                # Click vào link AD với selector chính xác
-                page.click('a[onclick*="Global.Dokumentart.AD"]')
-                # Wait for form submission và download
-                page.wait_for_timeout(5000)
+                # Click vào link AD - expect_download trả về ngay khi file bắt đầu tải
+                page.click(self._AD_LINK)
             
             # Lưu file
-            download = download_info.value
-            pdf_path = os.path.join(download_dir, f"{registernummer}_AD.pdf")
-            download.save_as(pdf_path)
+            download_info.value.save_as(pdf_path)
             
             logger.info(f"✅ Đã lưu AD PDF: {pdf_path}")
             return pdf_path
@@ -394,60 +637,32 @@ class HandelsregisterScraper:
             logger.error(f"❌ Lỗi download AD: {str(e)}")
             return None
     
-    def _download_si_xml(self, page: Page, download_dir: str, registernummer: str):
+    def _download_si_xml(self, page: Page, xml_path: Path) -> Path:
         """Click và download SI (XML)"""
         try:
             # Setup download handler
             with page.expect_download() as download_info:
-                # Click vào link SI với selector chính xác
-                page.click('a[onclick*="Global.Dokumentart.SI"]')
-                # Wait for form submission và download
-                page.wait_for_timeout(5000)
+                # Click vào link SI - expect_download trả về ngay khi file bắt đầu tải
+                page.click(self._SI_LINK)
             
             # Lưu file
-            download = download_info.value
-            xml_path = os.path.join(download_dir, f"{registernummer}_SI.xml")
-            download.save_as(xml_path)
+            download_info.value.save_as(xml_path)
             
             logger.info(f"✅ Đã lưu SI XML: {xml_path}")
+            return xml_path
             
         except Exception as e:
             logger.error(f"❌ Lỗi download SI: {str(e)}")
+            return None
     
-    def _extract_xml_data(self, download_dir: str, registernummer: str) -> Dict:
+    def _extract_xml_data(self, xml_path: Path) -> Dict:
         """Extract data từ XML file"""
         try:
-            xml_path = os.path.join(download_dir, f"{registernummer}_SI.xml")
-            
-            if not os.path.exists(xml_path):
+            if not xml_path.exists():
                 logger.warning(f"⚠️  XML file không tồn tại: {xml_path}")
                 return {}
             
-            logger.info(f"📊 Extracting data từ XML: {xml_path}")
-            xml_data = self.xml_parser.parse_xml_file(xml_path)
-            
-            # Map XML fields sang CompanyData fields
-            # CHỈ lấy các trường có trong CompanyData model (27 trường)
-            company_data = {}
-            
-            # Map trực tiếp - CHỈ các trường trong model
-            field_mapping = {
-                'registernummer': 'registernummer',
-                'handelsregister': 'handelsregister', 
-                'geschaeftsfuehrer': 'geschaeftsfuehrer',
-                'geschaeftsadresse': 'geschaeftsadresse',
-                'unternehmenszweck': 'unternehmenszweck',
-                'gruendungsdatum': 'gruendungsdatum',
-                'land_des_hauptsitzes': 'land_des_hauptsitzes',
-                'gerichtsstand': 'gerichtsstand',
-                'paragraph_34_gewo': 'paragraph_34_gewo'
-                # stammkapital KHÔNG có trong CompanyData model nên không lấy
-                # letzte_eintragung, letzte_aenderung, abrufdatum cũng không có trong model
-            }
-            
-            for xml_field, company_field in field_mapping.items():
-                if xml_field in xml_data and xml_data[xml_field] is not None:
-                    company_data[company_field] = xml_data[xml_field]
+            company_data = self._cached_extract('xml', xml_path, self._parse_xml_fields)
             
             logger.info(f"✅ Đã extract {len(company_data)} trường từ XML")
             return company_data
@@ -456,40 +671,14 @@ class HandelsregisterScraper:
             logger.error(f"❌ Lỗi extract XML data: {str(e)}")
             return {}
     
-    def _extract_pdf_data(self, download_dir: str, registernummer: str) -> Dict:
+    def _extract_pdf_data(self, pdf_path: Path) -> Dict:
         """Extract data từ PDF file"""
         try:
-            pdf_path = os.path.join(download_dir, f"{registernummer}_AD.pdf")
-            
-            if not os.path.exists(pdf_path):
+            if not pdf_path.exists():
                 logger.warning(f"⚠️  PDF file không tồn tại: {pdf_path}")
                 return {}
             
-            logger.info(f"📊 Extracting data từ PDF: {pdf_path}")
-            pdf_data = self.pdf_extractor.extract_from_pdf(pdf_path)
-            
-            # Map PDF fields sang CompanyData fields
-            # CHỈ lấy các trường có trong CompanyData model (27 trường)
-            company_data = {}
-            
-            # Map trực tiếp (không override nếu XML đã có) - CHỈ các trường trong model
-            field_mapping = {
-                # PDF có thể backup cho các trường này nếu XML không có:
-                'geschaeftsadresse': 'geschaeftsadresse',
-                'unternehmenszweck': 'unternehmenszweck',
-                'geschaeftsfuehrer': 'geschaeftsfuehrer',
-                # 'gruendungsdatum': 'gruendungsdatum',  # KHÔNG lấy từ PDF vì không chính xác
-                'handelsregister': 'handelsregister',
-                'registernummer': 'registernummer'
-                # KHÔNG lấy: stammkapital, letzte_eintragung, anzahl_eintragungen, gruendungsdatum
-                # Vì không có trong model hoặc không chính xác
-            }
-            
-            for pdf_field, company_field in field_mapping.items():
-                if pdf_field in pdf_data and pdf_data[pdf_field] is not None:
-                    # Chỉ add nếu chưa có từ XML (XML có priority cao hơn)
-                    if company_field not in company_data or company_data.get(company_field) is None:
-                        company_data[company_field] = pdf_data[pdf_field]
+            company_data = self._cached_extract('pdf', pdf_path, self._parse_pdf_fields)
             
             logger.info(f"✅ Đã extract {len(company_data)} trường từ PDF")
             return company_data
@@ -497,9 +686,44 @@ class HandelsregisterScraper:
         except Exception as e:
             logger.error(f"❌ Lỗi extract PDF data: {str(e)}")
             return {}
+    
+    def _parse_xml_fields(self, xml_path: Path) -> Dict:
+        """Parse XML và chỉ giữ các trường trong _XML_FIELDS"""
+        logger.info(f"📊 Extracting data từ XML: {xml_path}")
+        xml_data = self.xml_parser.parse_xml_file(xml_path)
+        
+        # Tên trường XML trùng với CompanyData → chỉ cần lọc theo _XML_FIELDS
+        return {k: v for k, v in xml_data.items() if k in _XML_FIELDS and v is not None}
+    
+    def _parse_pdf_fields(self, pdf_path: Path) -> Dict:
+        """Parse PDF và chỉ giữ các trường trong _PDF_FIELDS"""
+        logger.info(f"📊 Extracting data từ PDF: {pdf_path}")
+        pdf_data = self.pdf_extractor.extract_from_pdf(pdf_path)
+        
+        # Tên trường PDF trùng với CompanyData → chỉ cần lọc theo _PDF_FIELDS
+        # (XML override PDF khi combine ở _scrape_on_page)
+        return {k: v for k, v in pdf_data.items() if k in _PDF_FIELDS and v is not None}
+    
+    def _cached_extract(self, kind: str, path: Path, parse) -> Dict:
+        """Gọi parse(path), memo theo hash nội dung file - file không đổi thì không parse lại"""
+        digest = self._get_file_hash(path)
+        if not digest:
+            return parse(path)
+        
+        key = (kind, digest, _EXTRACT_CACHE_VERSION)
+        with self._extract_lock:
+            cached = self._extract_cache.get(key)
+        if cached is not None:
+            logger.info(f"♻️  Dùng lại kết quả extract {kind.upper()}: {path}")
+            return dict(cached)
+        
+        company_data = parse(path)
+        with self._extract_lock:
+            self._extract_cache[key] = company_data
+        return dict(company_data)
 
 
-def test_from_companies_json(language: str = 'FR'):
+def test_from_companies_json(language: str = 'FR', force: bool = False):
     """Test scraper với data từ companies.json"""
     
     companies_file = os.path.join(
@@ -508,28 +732,31 @@ def test_from_companies_json(language: str = 'FR'):
         'companies.json'
     )
     
-    with open(companies_file, 'r', encoding='utf-8') as f:
-        companies = json.load(f)
+    # Đọc bytes và parse + validate trong một lượt bằng pydantic-core
+    with open(companies_file, 'rb') as f:
+        companies = validate_companies_json(f.read())
     
-    if companies:
-        company = companies[0]
-        
-        scraper = HandelsregisterScraper(headless=False, language=language)
-        
-        result = scraper.scrape_company(
-            company['company_name'],
-            company['registernummer'],
-            company['ust_idnr']
-        )
-        
+    if not companies:
+        print("❌ Không có company trong companies.json")
+        return
+    
+    scraper = HandelsregisterScraper(headless=False, language=language)
+    results = scraper.scrape_many([
+        {'company_name': company.company_name, 'registernummer': company.registernummer}
+        for company in companies
+    ], force=force)
+    
+    for company, result in zip(companies, results):
+        # Chuẩn hoá kết quả qua CompanyData (ép kiểu số, list → tuple) trước khi in
+        company_data = CompanyData.from_scraped({'company_name': company.company_name, **result})
         print("\n" + "="*60)
-        print("📊 KẾT QUẢ SCRAPE:")
+        print(f"📊 KẾT QUẢ SCRAPE: {company.company_name}")
         print("="*60)
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+        print(f"📁 Download directory: {result.get('download_directory')}")
+        print(json.dumps(company_data.model_dump(exclude_none=True), indent=2, ensure_ascii=False))
         print("="*60)
-    else:
-        print("❌ Không có company trong companies.json")
 
 
 if __name__ == "__main__":
-    test_from_companies_json(language='FR')
+    # --force: download lại files AD/SI kể cả khi đã có
+    test_from_companies_json(language='FR', force='--force' in sys.argv)
@@ -6,43 +6,386 @@ Scrapes company data from LinkedIn using Playwright with session/cookie manageme
 import sys
 from pathlib import Path
 import os
+import argparse
+import re
 import json
 import time
 import logging
+import threading
 from typing import Dict, Optional, List, Tuple
+from urllib.parse import quote_plus
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
-# Add parent directory to path for imports
-sys.path.append(str(Path(__file__).parent.parent))
-
-from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright, Browser, BrowserContext, Page
 
 # Setup logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
+# Các số trong text "Company size" (vd: "51-200 employees")
+_DIGIT_RE = re.compile(r'\d+')
+
+# URL gốc của trang công ty (bỏ /posts/, /life/, query...)
+_COMPANY_URL_RE = re.compile(r'^(https://[^/]+/company/[^/?#]+)')
+
+# Ký tự không dùng được trong slug URL công ty (vd: "MAGNA Real Estate GmbH" → "magna-real-estate-gmbh")
+_SLUG_RE = re.compile(r'[^a-z0-9]+')
+
+# Loại request bị hủy khi không chặn được qua CDP (fallback page.route).
+# Giữ stylesheet: _IS_VISIBLE_JS / modal dismissal dựa vào display/visibility đã tính từ CSS
+BLOCKED_RESOURCE_TYPES = frozenset({
+    "image", "imageset", "media", "font", "beacon", "csp_report", "texttrack",
+})
+
+
+
+def _block_by_resource_type(route):
+    """Route handler: abort các resource type trong BLOCKED_RESOURCE_TYPES, còn lại cho qua"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
+
 
 class LinkedInScraper:
-    """Scraper for LinkedIn using Playwright with session management"""
+    """
+    Scraper for LinkedIn using Playwright with session management
+    
+    Threading model: sync Playwright gắn browser/context/page với thread đã tạo ra chúng.
+    - start() / with: browser + context dùng chung, chỉ gọi scrape từ CÙNG thread đã start()
+    - Không start(): mỗi lần gọi tự launch browser riêng → an toàn khi gọi song song
+      từ nhiều thread (vd: ThreadPoolExecutor trong server.py)
+    """
+    
+    # Selector dùng lại ở nhiều bước (khai báo một lần)
+    _ABOUT_SECTION = "section.artdeco-card.org-page-details-module__card-spacing"
+    _SEARCH_BOX = "input[placeholder='Search']"
+    _LOGIN_FORM = "input#username"
+    _COMPANY_LINK = "a[href*='/company/']"
+    _FILTERS_BAR = "#search-reusables__filters-bar"
+    
+    # Element có đang hiển thị không - một evaluate, không qua locator/is_visible
+    _IS_VISIBLE_JS = """
+        (selector) => {
+            const el = document.querySelector(selector);
+            return !!(el && el.getClientRects().length);
+        }
+    """
+    
+    # Click nút "Companies" trên thanh filter của trang search - một evaluate, true nếu đã click
+    _CLICK_COMPANIES_FILTER_JS = """
+        (bar) => {
+            const btn = Array.from(document.querySelectorAll(`${bar} button`))
+                .find(b => (b.innerText || '').trim().startsWith('Companies'));
+            if (!btn) return false;
+            btn.click();
+            return true;
+        }
+    """
+    
+    # Field trong About section: (key, nhãn <dt>, lấy href của link trong <dd> thay vì text)
+    # _ABOUT_DATA_JS đọc các field này ngay trong browser
+    _ABOUT_FIELDS = (
+        ('website', 'Website', True),
+        ('phone', 'Phone', True),
+        ('size', 'Company size', False),
+        ('industry', 'Industry', False),
+        ('founded', 'Founded', False),
+    )
+    
+    # Session đã kiểm tra qua homepage được tin trong bao lâu (giây) trước khi kiểm tra lại
+    # (browser dùng chung sau start(): tin tới khi bị redirect về login / invalidate_session())
+    _SESSION_TTL = 600
+    
+    # URL công ty đã tìm được dùng lại trong bao lâu (giây) trước khi tìm lại
+    _URL_CACHE_MAX_AGE = 30 * 24 * 3600
+    
+    # Kết quả scrape trong bộ nhớ được dùng lại trong bao lâu (giây)
+    _RESULT_TTL = 3600
+    
+    # Các cặp <dt>/<dd> (+ HTML nếu cần) của About section trong MỘT lần evaluate (null nếu chưa render)
+    # fields theo key của _ABOUT_FIELDS, truyền thẳng vào _extract_about_data
+    _ABOUT_DATA_JS = """
+        ({selector, includeHtml, aboutFields}) => {
+            const section = document.querySelector(selector);
+            if (!section) return null;
+            const text = el => (el.textContent || '').replace(/\\s+/g, ' ').trim();
+            const fields = {};
+            section.querySelectorAll('dt').forEach(dt => {
+                const label = text(dt);
+                let dd = dt.nextElementSibling;
+                while (dd && dd.tagName !== 'DD') dd = dd.nextElementSibling;
+                if (!dd) return;
+                const link = dd.querySelector('a');
+                const field = aboutFields.find(([key, name, fromLink]) => label.includes(name) && (!fromLink || link));
+                if (field) fields[field[0]] = field[2] ? link.getAttribute('href') : text(dd);
+            });
+            return {html: includeHtml ? section.innerHTML : null, fields: fields};
+        }
+    """
+    
+    # Ảnh/font/video/tracking không cần cho scrape - chặn qua CDP (giữ CSS + JS vì LinkedIn cần để render)
+    _BLOCKED_URLS = (
+        "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+        "*.woff", "*.woff2", "*.ttf", "*.mp4", "*.webm",
+        # Ảnh không có đuôi file (logo, ảnh cover, avatar)
+        "*media.licdn.com/dms/image/*",
+        # Analytics / quảng cáo
+        "*px.ads.linkedin.com*", "*/li/track*", "*li.lms-analytics*",
+        "*google-analytics.com*", "*doubleclick.net*",
+    )
+    
+    # Link công ty trong kết quả search: href + tên, một lần evaluate
+    _COMPANY_LINKS_JS = """
+        (selector) => Array.from(document.querySelectorAll(selector))
+            .slice(0, 20)
+            .map(a => ({href: a.href, text: (a.innerText || '').trim()}))
+    """
+    
+    # Nút đóng modal/overlay/toast của LinkedIn
+    _MODAL_SELECTORS = (
+        "button[aria-label='Dismiss']",
+        "button[data-test-modal-close-btn]",
+        ".artdeco-modal__dismiss",
+        "button[aria-label='Close']",
+        "button[data-control-name='modal.dismiss']",
+        ".premium-upsell-modal button[aria-label='Dismiss']",
+        ".network-growth-modal button[aria-label='Dismiss']",
+        "button[data-test-id='modal-close']",
+        ".artdeco-toast-item__dismiss",
+    )
     
-    def __init__(self, headless: bool = True):
+    # Click mọi nút đóng đang hiển thị, rồi ẩn overlay/dialog và xoá toast - một lần evaluate
+    # Trả về -1 nếu không có modal/overlay/toast nào (trường hợp thường gặp) để bỏ qua luôn
+    _DISMISS_MODALS_JS = """
+        (selectors) => {
+            if (!document.querySelector('.artdeco-modal, .artdeco-modal__overlay, [role="dialog"], .artdeco-toast-item')) {
+                return -1;
+            }
+            let n = 0;
+            selectors.forEach(sel => {
+                document.querySelectorAll(sel).forEach(el => {
+                    const r = el.getBoundingClientRect();
+                    if (r.width && r.height) {
+                        try { el.click(); n++; } catch (_) {}
+                    }
+                });
+            });
+            
+            document.querySelectorAll('.artdeco-modal__overlay, .modal-overlay').forEach(overlay => {
+                if (overlay.style.display !== 'none') {
+                    overlay.click();
+                }
+            });
+            document.querySelectorAll('.artdeco-modal, .modal, [role="dialog"]').forEach(modal => {
+                modal.style.display = 'none';
+            });
+            document.querySelectorAll('.artdeco-toast-item, .toast').forEach(toast => toast.remove());
+            return n;
+        }
+    """
+    
+    def __init__(self, headless: bool = True, store_raw_html: bool = False):
         self.base_url = "https://www.linkedin.com"
         self.headless = headless
+        # Trả về HTML thô của About section (about_html) - tắt thì chỉ lấy field, không serialize HTML qua CDP
+        self.store_raw_html = store_raw_html
+        
+        # Session storage path - override bằng env LINKEDIN_SESSION_FILE
+        self.session_storage_path = Path(
+            os.environ.get("LINKEDIN_SESSION_FILE", "data/linkedin_session/context_storage.json")
+        )
+        self.session_storage_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # LINKEDIN_BLOCK_RESOURCES=0 → không chặn ảnh/font/tracking (nếu LinkedIn phát hiện và chặn)
+        self.block_heavy_resources = os.environ.get("LINKEDIN_BLOCK_RESOURCES", "1") != "0"
+        
+        # LINKEDIN_VOYAGER_API=1 → lấy About qua Voyager JSON API (không có about_html cho server)
+        self.use_voyager = bool(os.environ.get("LINKEDIN_VOYAGER_API"))
         
-        # Session storage path
-        session_dir = Path("data/linkedin_session")
-        session_dir.mkdir(parents=True, exist_ok=True)
-        self.session_storage_path = session_dir / "context_storage.json"
+        # Browser + context dùng chung cho nhiều công ty (chỉ có khi gọi start() / with)
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        # Thread đã start Playwright driver đang giữ (driver chỉ dùng được trên thread đó)
+        self._playwright_thread: Optional[int] = None
+        
+        # Lần cuối session được xác nhận còn đăng nhập (time.time()), 0 = chưa kiểm tra
+        self._session_verified_at = 0.0
+        
+        # Kết quả đã scrape thành công theo (company_name, registernummer) → (time.time(), data) - dùng chung giữa các thread
+        self._cache: Dict[Tuple[str, str], Tuple[float, Dict]] = {}
+        # Công ty đang được scrape ở thread khác → Event set khi xong (gộp request trùng nhau)
+        self._inflight: Dict[Tuple[str, str], threading.Event] = {}
+        self._cache_lock = threading.Lock()
+        
+        # URL trang công ty đã tìm được theo registernummer ({url, fetched_at}) - lưu xuống disk
+        self._url_cache_path = self.session_storage_path.parent / "company_urls.json"
+        self._url_cache: Dict[str, Dict] = self._load_url_cache()
+        self._url_cache_lock = threading.Lock()
+        
+        # Session file đã parse, theo (mtime_ns, size) - file đổi (đăng nhập lại) thì đọc lại
+        self._storage_state_cache: Optional[Tuple[Tuple[int, int], Dict]] = None
+        self._storage_state_lock = threading.Lock()
+        
+        # Một thread riêng giữ browser dùng chung cho scrape_pooled() (sync Playwright gắn với thread tạo ra nó)
+        self._pool_executor: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
         
         logger.info(f"🔧 LinkedIn Scraper initialized (headless={headless})")
         logger.info(f"📁 Session storage: {self.session_storage_path}")
     
+    def start(self) -> 'LinkedInScraper':
+        """Khởi động browser + context (load session) một lần để scrape nhiều công ty"""
+        if self._context is None:
+            if self._playwright is None:
+                self._playwright = sync_playwright().start()
+                self._playwright_thread = threading.get_ident()
+            self._browser, self._context = self._setup_browser_context(self._playwright, load_session=True)
+            logger.info("🌐 Đã khởi động browser dùng chung")
+        return self
+    
+    def close(self):
+        """Đóng browser + Playwright dùng chung"""
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Lỗi đóng browser: {e}")
+        if self._playwright is not None:
+            self._playwright.stop()
+        self._playwright = None
+        self._playwright_thread = None
+        self._browser = None
+        self._context = None
+    
+    @contextmanager
+    def driver(self):
+        """
+        Giữ một Playwright driver cho nhiều bước liên tiếp trên thread hiện tại (vd: setup -> test -> scrape)
+        
+        Chỉ giữ driver (không launch browser): mỗi bước vẫn tự launch browser của mình nhưng không
+        khởi động lại driver Node.
+        """
+        if self._playwright is not None:
+            yield self._playwright
+            return
+        self._playwright = sync_playwright().start()
+        self._playwright_thread = threading.get_ident()
+        try:
+            yield self._playwright
+        finally:
+            self.close()
+    
+    @contextmanager
+    def _driver_for_call(self):
+        """Driver đang giữ nếu gọi từ đúng thread đã start nó, không thì driver riêng cho lần gọi này"""
+        if self._playwright is not None and self._playwright_thread == threading.get_ident():
+            yield self._playwright
+        else:
+            with sync_playwright() as playwright:
+                yield playwright
+    
+    def scrape_pooled(self, company_name: str, registernummer: str) -> Dict:
+        """
+        Scrape trên browser dùng chung của pool thread - gọi được từ bất kỳ thread nào (vd: worker của server)
+        
+        Browser chỉ launch một lần cho cả process, các lời gọi xếp hàng trên pool thread.
+        """
+        with self._cache_lock:
+            cached = self._fresh_result((company_name, registernummer))
+        if cached is not None:
+            logger.info(f"♻️ Dùng lại kết quả LinkedIn đã scrape cho {company_name}")
+            return dict(cached)
+        
+        with self._pool_lock:
+            if self._pool_executor is None:
+                self._pool_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='linkedin-browser')
+            executor = self._pool_executor
+        return executor.submit(self._scrape_on_pool_thread, company_name, registernummer).result()
+    
+    def _scrape_on_pool_thread(self, company_name: str, registernummer: str) -> Dict:
+        """Chạy trên pool thread: start() browser dùng chung lần đầu rồi scrape"""
+        if self._context is None and self.has_valid_session():
+            try:
+                self.start()
+            except Exception as e:
+                logger.error(f"❌ Không khởi động được browser dùng chung: {e}")
+                self.close()
+        return self.scrape_with_playwright(company_name, registernummer)
+    
+    def close_pool(self):
+        """Đóng browser dùng chung của scrape_pooled() và dừng pool thread"""
+        with self._pool_lock:
+            executor, self._pool_executor = self._pool_executor, None
+        if executor is not None:
+            executor.submit(self.close).result()
+            executor.shutdown()
+    
+    def __enter__(self) -> 'LinkedInScraper':
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _ensure_context(self) -> BrowserContext:
+        """Trả về context dùng chung, khởi động lại nếu browser đã bị crash/đóng"""
+        if not self._browser.is_connected():
+            logger.warning("⚠️ Browser dùng chung đã mất kết nối, khởi động lại...")
+            self.close()
+            self.start()
+        return self._context
+    
+    def _load_url_cache(self) -> Dict[str, Dict]:
+        """Load map registernummer → URL công ty LinkedIn từ file nếu có"""
+        if not self._url_cache_path.exists():
+            return {}
+        try:
+            with open(self._url_cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Không thể load cache URL công ty: {e}")
+            return {}
+    
+    def _cached_company_url(self, registernummer: str) -> Optional[str]:
+        """URL công ty đã lưu cho registernummer, None nếu chưa có hoặc đã quá _URL_CACHE_MAX_AGE"""
+        with self._url_cache_lock:
+            entry = self._url_cache.get(registernummer)
+        if not entry or time.time() - entry.get('fetched_at', 0) > self._URL_CACHE_MAX_AGE:
+            return None
+        return entry.get('url')
+    
+    def _remember_company_url(self, registernummer: str, page_url: str):
+        """Lưu URL gốc của trang công ty đang mở cho registernummer (ghi file qua file tạm + rename)"""
+        match = _COMPANY_URL_RE.match(page_url)
+        if not registernummer or not match:
+            return
+        try:
+            with self._url_cache_lock:
+                self._url_cache[registernummer] = {'url': match.group(1), 'fetched_at': time.time()}
+                tmp_path = self._url_cache_path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._url_cache, f, indent=2)
+                os.replace(tmp_path, self._url_cache_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Không thể lưu cache URL công ty: {e}")
+    
     def _save_context_storage(self, context: BrowserContext):
         """Lưu context storage state (cookies, localStorage) vào file"""
         try:
             storage_state = context.storage_state()
-            with open(self.session_storage_path, 'w', encoding='utf-8') as f:
-                json.dump(storage_state, f, indent=2)
+            # Ghi ra file tạm rồi rename - crash giữa chừng không làm hỏng session file đang dùng
+            tmp_path = self.session_storage_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(storage_state, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.session_storage_path)
+            # Dict vừa lưu chính là nội dung file → lần load tiếp theo không cần đọc/parse lại
+            stat = self.session_storage_path.stat()
+            with self._storage_state_lock:
+                self._storage_state_cache = ((stat.st_mtime_ns, stat.st_size), storage_state)
             logger.info(f"✅ Đã lưu session/cookies vào {self.session_storage_path}")
             return True
         except Exception as e:
@@ -50,23 +393,55 @@ class LinkedInScraper:
             return False
     
     def _load_context_storage(self) -> Optional[Dict]:
-        """Load context storage state từ file nếu có"""
-        if not self.session_storage_path.exists():
+        """Load context storage state từ file nếu có (chỉ parse lại JSON khi file thay đổi)"""
+        try:
+            stat = self.session_storage_path.stat()
+        except FileNotFoundError:
             logger.info("ℹ️ Chưa có session được lưu, cần đăng nhập mới")
             return None
         
+        signature = (stat.st_mtime_ns, stat.st_size)
         try:
-            with open(self.session_storage_path, 'r', encoding='utf-8') as f:
-                storage_state = json.load(f)
-            logger.info(f"✅ Đã load session từ {self.session_storage_path}")
-            return storage_state
+            with self._storage_state_lock:
+                cached = self._storage_state_cache
+                if cached is not None and cached[0] == signature:
+                    storage_state = cached[1]
+                else:
+                    with open(self.session_storage_path, 'r', encoding='utf-8') as f:
+                        storage_state = json.load(f)
+                    self._storage_state_cache = (signature, storage_state)
+                    logger.info(f"✅ Đã load session từ {self.session_storage_path}")
         except Exception as e:
             logger.warning(f"⚠️ Không thể load session: {e}")
             return None
+        
+        if self._session_expired(storage_state):
+            logger.warning("⚠️ Cookie li_at trong session file đã hết hạn, cần đăng nhập lại (option 1)")
+            return None
+        return storage_state
+    
+    def _session_expired(self, storage_state: Dict) -> bool:
+        """Cookie đăng nhập li_at không có hoặc đã quá hạn expires"""
+        for cookie in storage_state.get('cookies', []):
+            if cookie.get('name') == 'li_at':
+                expires = cookie.get('expires', -1)
+                # expires = -1 → session cookie, không có hạn cố định
+                return 0 < expires < time.time()
+        return True
+    
+    def has_valid_session(self) -> bool:
+        """Có session file với cookie li_at còn hạn (không cần mở browser)"""
+        return self._load_context_storage() is not None
     
     def _setup_browser_context(self, playwright, load_session: bool = True) -> Tuple[Browser, BrowserContext]:
         """Setup browser và context với session nếu có"""
-        browser = playwright.chromium.launch(
+        browser = self._launch_browser(playwright)
+        storage_state = self._load_context_storage() if load_session else None
+        return browser, self._new_context(browser, storage_state)
+    
+    def _launch_browser(self, playwright) -> Browser:
+        """Launch Chromium (một browser dùng cho nhiều context: login, test session, scrape)"""
+        return playwright.chromium.launch(
             headless=self.headless,
             args=[
                 '--no-sandbox',
@@ -76,12 +451,9 @@ class LinkedInScraper:
                 '--disable-features=VizDisplayCompositor',
             ]
         )
-        
-        # Load session nếu có
-        storage_state = None
-        if load_session:
-            storage_state = self._load_context_storage()
-        
+    
+    def _new_context(self, browser: Browser, storage_state: Optional[Dict] = None) -> BrowserContext:
+        """Tạo context mới (viewport/UA/stealth) trên browser đã có, load storage_state nếu truyền vào"""
         context = browser.new_context(
             viewport={'width': 1920, 'height': 1080},
             user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
@@ -98,7 +470,7 @@ class LinkedInScraper:
             });
         """)
         
-        return browser, context
+        return context
     
     def wait_for_manual_login(self, page: Page, first_time: bool = True) -> bool:
         """
@@ -112,57 +484,90 @@ class LinkedInScraper:
             logger.info("⏳ Sau khi đăng nhập thành công, nhấn ENTER trong terminal này...")
             
             try:
-                page.goto(f"{self.base_url}/login", wait_until='networkidle', timeout=30000)
+                # domcontentloaded: form login có ngay, không cần đợi tracker/beacon của LinkedIn
+                page.goto(f"{self.base_url}/login", wait_until='domcontentloaded', timeout=30000)
             except Exception as e:
-                # Nếu có lỗi navigation (có thể đang redirect), đợi một chút
+                # Nếu có lỗi navigation (có thể đang redirect), đợi trang đích load xong
                 logger.info("⏳ Đang chờ page load...")
-                page.wait_for_timeout(2000)
-        
-        # Chờ user đăng nhập và nhấn Enter
-        input("\n✅ Nhấn ENTER sau khi đã đăng nhập thành công...\n")
-        
-        # Đợi một chút để đảm bảo page đã load xong
-        page.wait_for_timeout(2000)
-        
-        # Kiểm tra xem đã đăng nhập chưa bằng cách check URL và elements
-        current_url = page.url
-        logger.info(f"📍 Current URL: {current_url}")
-        
-        # Check xem có đăng nhập thành công không
-        # LinkedIn sẽ redirect về /feed/ hoặc homepage sau khi đăng nhập
-        is_logged_in_by_url = (
-            '/feed' in current_url or 
-            '/in/' in current_url or
-            (self.base_url in current_url and '/login' not in current_url and current_url != f"{self.base_url}/")
-        )
+                try:
+                    page.wait_for_load_state('domcontentloaded', timeout=10000)
+                except Exception:
+                    pass
         
-        # Kiểm tra thêm bằng cách tìm elements chỉ xuất hiện khi đã đăng nhập
-        is_logged_in_by_elements = False
-        try:
+        # Lặp tới khi đăng nhập xong hoặc user không muốn thử lại (không gọi đệ quy)
+        while True:
+            # Chờ user đăng nhập và nhấn Enter
+            input("\n✅ Nhấn ENTER sau khi đã đăng nhập thành công...\n")
+            
+            # Đảm bảo DOM của trang hiện tại (sau redirect đăng nhập) đã sẵn sàng
+            try:
+                page.wait_for_load_state('domcontentloaded', timeout=10000)
+            except Exception:
+                pass
+            
+            # Kiểm tra xem đã đăng nhập chưa bằng cách check URL và elements
+            current_url = page.url
+            logger.info(f"📍 Current URL: {current_url}")
+            
+            # Check xem có đăng nhập thành công không
+            # LinkedIn sẽ redirect về /feed/ hoặc homepage sau khi đăng nhập
+            is_logged_in_by_url = (
+                '/feed' in current_url or 
+                '/in/' in current_url or
+                (self.base_url in current_url and '/login' not in current_url and current_url != f"{self.base_url}/")
+            )
+            
+            # Kiểm tra thêm bằng cách tìm elements chỉ xuất hiện khi đã đăng nhập
+            is_logged_in_by_elements = False
             # Tìm search box (chỉ có khi đã đăng nhập)
-            search_box = page.locator("input[placeholder='Search']")
-            if search_box.is_visible(timeout=3000):
+            if self._is_visible(page, self._SEARCH_BOX):
                 is_logged_in_by_elements = True
                 logger.info("✅ Tìm thấy search box - đã đăng nhập")
-        except:
-            pass
-        
-        is_logged_in = is_logged_in_by_url or is_logged_in_by_elements
-        
-        # Nếu vẫn ở trang login, có thể user chưa đăng nhập xong
-        if '/login' in current_url and not is_logged_in:
-            logger.warning("⚠️ Có vẻ bạn vẫn ở trang login.")
-            logger.info("💡 Hãy đảm bảo bạn đã đăng nhập thành công trong browser.")
-            logger.info("❓ Bạn có muốn thử lại? (y/n)")
-            retry = input().strip().lower()
-            if retry == 'y':
-                # Không navigate lại, chỉ đợi user nhấn Enter
-                return self.wait_for_manual_login(page, first_time=False)
-            return False
+            
+            is_logged_in = is_logged_in_by_url or is_logged_in_by_elements
+            
+            # Nếu vẫn ở trang login, có thể user chưa đăng nhập xong
+            if '/login' in current_url and not is_logged_in:
+                logger.warning("⚠️ Có vẻ bạn vẫn ở trang login.")
+                logger.info("💡 Hãy đảm bảo bạn đã đăng nhập thành công trong browser.")
+                logger.info("❓ Bạn có muốn thử lại? (y/n)")
+                retry = input().strip().lower()
+                if retry == 'y':
+                    # Không navigate lại, chỉ đợi user nhấn Enter
+                    continue
+                return False
+            
+            break
         
         logger.info("✅ Đã đăng nhập thành công!")
         return True
     
+    def login_with_env_credentials(self, page: Page) -> bool:
+        """
+        Đăng nhập bằng env LINKEDIN_USER / LINKEDIN_PASS (không lưu credentials trong code)
+        Trả về False nếu chưa set env hoặc đăng nhập không thành công (vd: LinkedIn hỏi captcha)
+        """
+        email = os.environ.get("LINKEDIN_USER")
+        password = os.environ.get("LINKEDIN_PASS")
+        if not email or not password:
+            return False
+        
+        logger.info("🔐 Đăng nhập LinkedIn bằng LINKEDIN_USER / LINKEDIN_PASS...")
+        try:
+            page.goto(f"{self.base_url}/login", wait_until='domcontentloaded', timeout=30000)
+            # fill() set value một lần, không gõ từng ký tự
+            page.locator("#username").fill(email)
+            page.locator("#password").fill(password)
+            page.locator("button[type='submit']").click()
+            
+            # Search box chỉ có khi đã đăng nhập
+            page.locator(self._SEARCH_BOX).wait_for(state='visible', timeout=30000)
+            logger.info("✅ Đã đăng nhập thành công!")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Đăng nhập tự động không thành công, chuyển sang đăng nhập thủ công: {e}")
+            return False
+    
     def test_session_incognito(self, headless: bool = False) -> bool:
         """
         Test session bằng cách mở tab ẩn danh (incognito) - KHÔNG dùng browser cache/cookies
@@ -172,111 +577,91 @@ class LinkedInScraper:
         logger.info("🧪 Testing session với incognito mode (tab ẩn danh)...")
         logger.info("💡 Browser sẽ mở để bạn có thể xem - KHÔNG dùng cache/cookies của browser")
         
+        # Load session từ file trước khi mở browser - không có session thì khỏi launch
+        storage_state = self._load_context_storage()
+        if not storage_state:
+            logger.error("❌ Không tìm thấy session file. Cần đăng nhập trước!")
+            return False
+        
+        logger.info("📁 Đã load cookies từ session file")
+        logger.info(f"🍪 Số lượng cookies: {len(storage_state.get('cookies', []))}")
+        
         # Temporarily set headless để user có thể xem
         original_headless = self.headless
         self.headless = headless
         
-        with sync_playwright() as playwright:
-            # Tạo browser MỚI - không load session vào context chính
-            browser = playwright.chromium.launch(
-                headless=self.headless,
-                args=[
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-blink-features=AutomationControlled',
-                ]
-            )
+        try:
+            with self._driver_for_call() as playwright:
+                browser = self._launch_browser(playwright)
+                try:
+                    return self._test_session_in_browser(browser, storage_state)
+                finally:
+                    browser.close()
+        finally:
+            self.headless = original_headless
+    
+    def _test_session_in_browser(self, browser: Browser, storage_state: Dict) -> bool:
+        """Mở context INCOGNITO mới trên browser đã có, chỉ với cookies từ session, và kiểm tra đăng nhập"""
+        # KHÔNG dùng browser cache/localStorage - chỉ cookies từ session file:
+        # truyền luôn lúc tạo context (origins rỗng = không localStorage) thay vì add_cookies thêm một lượt
+        cookies = storage_state.get('cookies', [])
+        incognito_context = self._new_context(browser, {'cookies': cookies, 'origins': []})
+        logger.info(f"✅ Đã thêm {len(cookies)} cookies vào incognito context")
+        
+        try:
+            page = incognito_context.new_page()
             
-            # Load session từ file
-            storage_state = self._load_context_storage()
-            if not storage_state:
-                logger.error("❌ Không tìm thấy session file. Cần đăng nhập trước!")
-                self.headless = original_headless
-                return False
+            logger.info("🔍 Đang truy cập LinkedIn (incognito mode)...")
+            logger.info("⏳ Vui lòng quan sát browser - nếu thấy đã đăng nhập thì session hoạt động!")
             
-            logger.info("📁 Đã load cookies từ session file")
-            logger.info(f"🍪 Số lượng cookies: {len(storage_state.get('cookies', []))}")
-            
-            # Tạo INCOGNITO context - KHÔNG dùng browser cache/localStorage
-            # Chỉ dùng cookies từ session file
-            incognito_context = browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-                locale='en-US',
-                timezone_id='Europe/Berlin',
-                # KHÔNG load storage_state ở đây - chỉ add cookies thủ công
-                ignore_https_errors=False,
-            )
+            # Dùng domcontentloaded thay vì networkidle để tránh timeout
+            page.goto(self.base_url, wait_until='domcontentloaded', timeout=60000)
+            # Đợi search box (đã đăng nhập) hoặc form login (bị redirect) thay vì sleep cố định
+            try:
+                page.wait_for_selector(f"{self._SEARCH_BOX}, {self._LOGIN_FORM}", timeout=10000)
+            except Exception:
+                pass
             
-            # Thêm stealth script
-            incognito_context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-            """)
+            current_url = page.url
+            logger.info(f"📍 Current URL: {current_url}")
             
-            # Load CHỈ cookies từ session file (không dùng localStorage/cache)
-            cookies = storage_state.get('cookies', [])
-            if cookies:
-                # Set cookies vào incognito context
-                incognito_context.add_cookies(cookies)
-                logger.info(f"✅ Đã thêm {len(cookies)} cookies vào incognito context")
+            # Kiểm tra xem có đăng nhập thành công không
+            is_logged_in = False
             
-            page = incognito_context.new_page()
+            # Check URL
+            if '/login' not in current_url:
+                is_logged_in = True
             
-            try:
-                logger.info("🔍 Đang truy cập LinkedIn (incognito mode)...")
-                logger.info("⏳ Vui lòng quan sát browser - nếu thấy đã đăng nhập thì session hoạt động!")
-                
-                # Dùng domcontentloaded thay vì networkidle để tránh timeout
-                page.goto(self.base_url, wait_until='domcontentloaded', timeout=60000)
-                page.wait_for_timeout(3000)  # Đợi thêm một chút để LinkedIn redirect nếu cần
-                
-                current_url = page.url
-                logger.info(f"📍 Current URL: {current_url}")
-                
-                # Kiểm tra xem có đăng nhập thành công không
-                is_logged_in = False
-                
-                # Check URL
-                if '/login' not in current_url:
-                    is_logged_in = True
-                
-                # Check thêm bằng cách tìm search box
-                try:
-                    search_box = page.locator("input[placeholder='Search']")
-                    if search_box.is_visible(timeout=3000):
-                        is_logged_in = True
-                        logger.info("✅ Tìm thấy search box - đã đăng nhập!")
-                except:
-                    pass
-                
-                if is_logged_in:
-                    logger.info("=" * 60)
-                    logger.info("✅ SUCCESS! Session hoạt động trong incognito mode!")
-                    logger.info("✅ Điều này chứng tỏ cookies từ session file hoạt động")
-                    logger.info("✅ KHÔNG dùng cache/cookies từ browser")
-                    logger.info("=" * 60)
+            # Check thêm bằng cách tìm search box
+            if self._is_visible(page, self._SEARCH_BOX):
+                is_logged_in = True
+                logger.info("✅ Tìm thấy search box - đã đăng nhập!")
+            
+            if is_logged_in:
+                logger.info("=" * 60)
+                logger.info("✅ SUCCESS! Session hoạt động trong incognito mode!")
+                logger.info("✅ Điều này chứng tỏ cookies từ session file hoạt động")
+                logger.info("✅ KHÔNG dùng cache/cookies từ browser")
+                logger.info("=" * 60)
+                if not self.headless:
                     logger.info("💡 Browser sẽ mở thêm 5 giây để bạn xác nhận...")
                     page.wait_for_timeout(5000)
-                    return True
-                else:
-                    logger.warning("=" * 60)
-                    logger.warning("❌ Session không hoạt động - vẫn ở trang login")
-                    logger.warning("⚠️ Có thể cookies đã hết hạn hoặc không hợp lệ")
-                    logger.warning("=" * 60)
+                return True
+            else:
+                logger.warning("=" * 60)
+                logger.warning("❌ Session không hoạt động - vẫn ở trang login")
+                logger.warning("⚠️ Có thể cookies đã hết hạn hoặc không hợp lệ")
+                logger.warning("=" * 60)
+                if not self.headless:
                     logger.info("💡 Browser sẽ mở thêm 3 giây để bạn xác nhận...")
                     page.wait_for_timeout(3000)
-                    return False
-                    
-            except Exception as e:
-                logger.error(f"❌ Lỗi khi test session: {e}")
-                import traceback
-                logger.error(traceback.format_exc())
                 return False
-            finally:
-                browser.close()
-                self.headless = original_headless
+                
+        except Exception as e:
+            logger.error(f"❌ Lỗi khi test session: {e}", exc_info=True)
+            return False
+        finally:
+            incognito_context.close()
     
     def setup_login_session(self, headless: bool = False) -> bool:
         """
@@ -289,27 +674,29 @@ class LinkedInScraper:
         original_headless = self.headless
         self.headless = headless
         
-        should_test = False
-        
-        with sync_playwright() as playwright:
+        with self._driver_for_call() as playwright:
             browser, context = self._setup_browser_context(playwright, load_session=False)
             page = context.new_page()
             
             try:
-                # Chờ user đăng nhập
-                if self.wait_for_manual_login(page):
+                # Đăng nhập tự động nếu có env credentials, không thì chờ user đăng nhập
+                if self.login_with_env_credentials(page) or self.wait_for_manual_login(page):
                     # Lưu session sau khi đăng nhập
                     if self._save_context_storage(context):
                         logger.info("✅ Đã lưu session thành công!")
                         
-                        # Hỏi user có muốn test không (trước khi đóng context)
+                        # Hỏi user có muốn test không
                         logger.info("\n🧪 Bạn có muốn test session với incognito mode không? (y/n)")
                         test_choice = input().strip().lower()
-                        should_test = (test_choice == 'y')
                         
-                        # Đóng browser trước khi ra khỏi context
-                        browser.close()
-                        # Context sẽ được đóng khi ra khỏi 'with' block
+                        # Test trong context incognito mới trên CÙNG browser (không launch browser thứ hai)
+                        context.close()
+                        if test_choice == 'y':
+                            storage_state = self._load_context_storage()
+                            if storage_state:
+                                self._test_session_in_browser(browser, storage_state)
+                            else:
+                                logger.error("❌ Không tìm thấy session file. Cần đăng nhập trước!")
                     else:
                         logger.error("❌ Không thể lưu session")
                         self.headless = original_headless
@@ -330,10 +717,6 @@ class LinkedInScraper:
                 except:
                     pass
         
-        # Sau khi đã ra khỏi playwright context hoàn toàn, mới test
-        if should_test:
-            self.test_session_incognito(headless=headless)  # Dùng cùng headless mode
-        
         self.headless = original_headless
         return True
     
@@ -348,185 +731,497 @@ class LinkedInScraper:
         Returns:
             Dict with scraped data
         """
+        key = (company_name, registernummer)
+        with self._cache_lock:
+            cached = self._fresh_result(key)
+            inflight = self._inflight.get(key) if cached is None else None
+            if cached is None and inflight is None:
+                self._inflight[key] = threading.Event()
+        if cached is not None:
+            logger.info(f"♻️ Dùng lại kết quả LinkedIn đã scrape cho {company_name}")
+            return dict(cached)
+        
+        if inflight is not None:
+            # Thread khác đang scrape đúng công ty này → đợi và dùng lại kết quả, không chạy flow lần nữa
+            logger.info(f"⏳ {company_name} đang được scrape ở thread khác, đợi kết quả...")
+            inflight.wait()
+            with self._cache_lock:
+                cached = self._fresh_result(key)
+            if cached is not None:
+                return dict(cached)
+            # Lần kia không lấy được gì → tự scrape lại
+            return self._scrape_uncached(company_name, registernummer)
+        
+        try:
+            return self._scrape_uncached(company_name, registernummer)
+        finally:
+            with self._cache_lock:
+                self._inflight.pop(key).set()
+    
+    def scrape_batch(self, companies: List[Tuple[str, str]]) -> List[Dict]:
+        """
+        Scrape nhiều công ty tuần tự trên CÙNG một browser + session (tự start()/close() nếu chưa start)
+        
+        Args:
+            companies: List (company_name, registernummer)
+        
+        Returns:
+            List kết quả theo đúng thứ tự của companies
+        """
+        if self._context is None and not self.has_valid_session():
+            logger.info("💡 Chạy: python scrapers/linkedin_scraper.py -> chọn option 1 để đăng nhập")
+            return [self._empty_result(registernummer) for _, registernummer in companies]
+        
+        owns_browser = self._context is None
+        if owns_browser:
+            self.start()
+        try:
+            return [self.scrape_with_playwright(company_name, registernummer) for company_name, registernummer in companies]
+        finally:
+            if owns_browser:
+                self.close()
+    
+    def _fresh_result(self, key: Tuple[str, str]) -> Optional[Dict]:
+        """Kết quả đã cache còn trong _RESULT_TTL (gọi khi đang giữ _cache_lock)"""
+        entry = self._cache.get(key)
+        if entry is None or time.time() - entry[0] > self._RESULT_TTL:
+            return None
+        return entry[1]
+    
+    def _scrape_uncached(self, company_name: str, registernummer: str) -> Dict:
+        """Chạy flow scrape thật (không qua cache) và cache kết quả nếu lấy được About"""
         try:
             logger.info(f"🔍 Scraping LinkedIn with Playwright for {company_name}")
             
-            data = {
-                'registernummer': registernummer,
-                'mitarbeiter': None,
-                'website': None,
-                'email': None,
-                'telefonnummer': None,
-                'about_html': None
-            }
+            # Session chắc chắn không dùng được → không cần mở browser để phát hiện
+            if self._context is None and not self.has_valid_session():
+                logger.info("💡 Chạy: python scrapers/linkedin_scraper.py -> chọn option 1 để đăng nhập")
+                return self._empty_result(registernummer)
             
-            with sync_playwright() as playwright:
-                browser, context = self._setup_browser_context(playwright, load_session=True)
-                page = context.new_page()
-                
-                try:
-                    # Kiểm tra xem có session không, nếu không cần đăng nhập
-                    logger.info("🔍 Đang kiểm tra session...")
-                    page.goto(self.base_url, wait_until='domcontentloaded', timeout=60000)
-                    page.wait_for_timeout(2000)  # Đợi redirect nếu có
-                    current_url = page.url
-                    logger.info(f"📍 Current URL: {current_url}")
-                    
-                    # Kiểm tra đăng nhập bằng URL và search box
-                    is_logged_in = '/login' not in current_url
-                    if not is_logged_in:
-                        # Check thêm bằng search box
-                        try:
-                            search_box = page.locator("input[placeholder='Search']")
-                            if search_box.is_visible(timeout=3000):
-                                is_logged_in = True
-                                logger.info("✅ Tìm thấy search box - đã đăng nhập")
-                        except:
-                            pass
-                    
-                    if not is_logged_in:
-                        logger.warning("⚠️ Chưa có session hoặc session đã hết hạn. Cần đăng nhập.")
-                        logger.info("💡 Chạy: python scrapers/linkedin_scraper.py -> chọn option 1 để đăng nhập")
-                        logger.info("💡 Hoặc chạy: scraper.setup_login_session(headless=False)")
-                        return data
-                    
-                    logger.info("✅ Session hoạt động, bắt đầu scrape...")
-                    
-                    # Bước 1: Tìm kiếm công ty
-                    logger.info(f"🔍 Searching for company: {company_name}")
-                    try:
-                        search_input = page.locator("input[placeholder='Search']")
-                        if not search_input.is_visible(timeout=5000):
-                            logger.warning("⚠️ Không tìm thấy search box, có thể cần đợi thêm...")
-                            page.wait_for_timeout(2000)
-                            search_input = page.locator("input[placeholder='Search']")
-                        
-                        search_input.fill(company_name)
-                        search_input.press('Enter')
-                        logger.info("✅ Đã gửi search query")
-                        page.wait_for_timeout(3000)
-                    except Exception as e:
-                        logger.error(f"❌ Lỗi khi search: {e}")
-                        return data
-                    
-                    # Xử lý modal
-                    self._dismiss_all_modals(page)
-                    
-                    # Bước 2: Click "Companies" filter
-                    logger.info("🏢 Clicking 'Companies' filter...")
+            # Đã start() → dùng lại browser + context (session) đang mở, session chỉ kiểm tra một lần
+            if self._context is not None:
+                context = self._ensure_context()
+                if not self._ensure_logged_in():
+                    return self._empty_result(registernummer)
+                data = self._scrape_in_context(context, company_name, registernummer)
+            else:
+                # Chưa start() (vd: server gọi từ worker thread) → browser riêng cho lần gọi này
+                with self._driver_for_call() as playwright:
+                    browser, context = self._setup_browser_context(playwright, load_session=True)
                     try:
-                        companies_btn = page.locator("//*[@id='search-reusables__filters-bar']/ul/li[3]/button")
-                        if companies_btn.is_visible(timeout=5000):
-                            companies_btn.click()
-                            page.wait_for_timeout(2000)
-                            logger.info("✅ Companies filter clicked")
-                    except Exception as e:
-                        logger.warning(f"⚠️ Could not find Companies filter: {e}")
-                        # Fallback selectors
-                        fallback_selectors = [
-                            "button:has-text('Companies')",
-                            "button.artdeco-pill:has-text('Companies')",
-                        ]
-                        for selector in fallback_selectors:
-                            try:
-                                btn = page.locator(selector).first
-                                if btn.is_visible(timeout=2000):
-                                    btn.click()
-                                    page.wait_for_timeout(2000)
-                                    logger.info(f"✅ Found Companies button with fallback: {selector}")
-                                    break
-                            except:
-                                continue
-                    
-                    # Bước 3: Click vào công ty đầu tiên
-                    logger.info("🏢 Looking for company with matching name...")
-                    company_links = page.locator("a[href*='/company/']")
+                        data = self._scrape_in_context(context, company_name, registernummer)
+                    finally:
+                        browser.close()
+            
+            # Chỉ cache khi đã lấy được About (HTML hoặc Voyager) - không cache lỗi / session hết hạn
+            if data.get('about_html') or data.get('mitarbeiter') or data.get('website'):
+                with self._cache_lock:
+                    self._cache[(company_name, registernummer)] = (time.time(), dict(data))
+            return data
                     
-                    if company_links.count() > 0:
-                        first_link = company_links.first
-                        company_text = first_link.inner_text().strip()
-                        logger.info(f"📋 Found company: {company_text}")
-                        
-                        # Kiểm tra tên có khớp không
-                        if company_name.lower() in company_text.lower() or company_text.lower() in company_name.lower():
-                            logger.info(f"✅ Company name matches! Clicking on: {company_text}")
-                        else:
-                            logger.warning(f"⚠️ Company name doesn't match. Expected: {company_name}, Found: {company_text}")
-                        
-                        first_link.click()
-                        page.wait_for_timeout(3000)
-                        self._dismiss_all_modals(page)
-                    else:
-                        logger.error("❌ No company links found")
+        except Exception as e:
+            logger.error(f"❌ Error scraping {company_name} with Playwright: {str(e)}", exc_info=True)
+            return {}
+    
+    def _empty_result(self, registernummer: str) -> Dict:
+        """Kết quả mặc định khi chưa scrape được gì"""
+        return {
+            'registernummer': registernummer,
+            'mitarbeiter': None,
+            'website': None,
+            'email': None,
+            'telefonnummer': None,
+            'about_html': None
+        }
+    
+    def _scrape_in_context(self, context: BrowserContext, company_name: str, registernummer: str) -> Dict:
+        """Mở page mới trong context đã có session và scrape một công ty"""
+        data = self._empty_result(registernummer)
+        
+        # Voyager API: một request JSON thay cho cả flow render trang (fallback khi lỗi / 403)
+        if self.use_voyager:
+            voyager_data = self._fetch_voyager_about(context, company_name)
+            if voyager_data:
+                data.update(voyager_data)
+                logger.info(f"✅ Successfully scraped {company_name} (Voyager API)")
+                return data
+        
+        page = context.new_page()
+        self._block_heavy_resources(page)
+        # Response Voyager mà chính trang About gọi - có JSON công ty thì không cần đọc DOM
+        voyager_responses = []
+        page.on("response", lambda response: voyager_responses.append(response) if '/voyager/api/' in response.url else None)
+        try:
+            # Bước 0: URL đã tìm được lần trước, không có thì đoán từ tên - đúng thì bỏ qua cả flow search
+            if not self._open_cached_about_page(page, registernummer):
+                if not self._open_guessed_about_page(page, company_name):
+                    if not self._open_about_via_search(page, company_name):
                         return data
-                    
-                    # Bước 4: Click "About" tab
-                    logger.info("📄 Clicking 'About' tab...")
-                    # Có 2 About links, dùng selector cụ thể hơn hoặc .first
-                    try:
-                        # Thử tìm link trong navigation menu trước (tab chính)
-                        about_link = page.locator("a[href*='/about/'][class*='org-page-navigation']").first
-                        if about_link.is_visible(timeout=5000):
-                            about_link.click()
-                            logger.info("✅ Clicked About tab (navigation)")
-                            page.wait_for_timeout(3000)
-                            self._dismiss_all_modals(page)
-                        else:
-                            # Fallback: dùng link đầu tiên
-                            about_link = page.locator("a[href*='/about/']").first
-                            if about_link.is_visible(timeout=3000):
-                                about_link.click()
-                                logger.info("✅ Clicked About tab (fallback)")
-                                page.wait_for_timeout(3000)
-                                self._dismiss_all_modals(page)
-                            else:
-                                logger.warning("⚠️ Could not find About tab")
-                    except Exception as e:
-                        logger.warning(f"⚠️ Error clicking About tab: {e}")
-                        # Fallback: thử dùng .first
-                        try:
-                            about_link = page.locator("a[href*='/about/']").first
-                            about_link.click()
-                            logger.info("✅ Clicked About tab (fallback 2)")
-                            page.wait_for_timeout(3000)
-                            self._dismiss_all_modals(page)
-                        except Exception as e2:
-                            logger.error(f"❌ Could not click About tab: {e2}")
-                    
-                    # Bước 5: Extract About section HTML
-                    logger.info("📄 Extracting full About section HTML...")
-                    about_section = page.locator("section.artdeco-card.org-page-details-module__card-spacing")
-                    
-                    if about_section.is_visible(timeout=5000):
-                        about_html = about_section.inner_html()
-                        data['about_html'] = about_html
-                        logger.info(f"📄 Retrieved About section HTML ({len(about_html)} characters)")
-                        
-                        # Extract specific data từ About section
-                        about_data = self._extract_about_data_playwright(about_section)
-                        data.update(about_data)
-                    else:
-                        logger.warning("⚠️ Could not find About section")
-                    
-                    logger.info(f"✅ Successfully scraped {company_name}")
-                    return data
-                    
-                except Exception as e:
-                    logger.error(f"❌ Error during scraping: {e}")
-                    import traceback
-                    logger.error(traceback.format_exc())
+            
+            # Bước 5a: JSON Voyager đã bắt được khi load trang (không cần raw HTML thì bỏ qua DOM)
+            if not self.store_raw_html:
+                voyager_data = self._voyager_data_from_responses(voyager_responses, company_name)
+                if voyager_data:
+                    data.update(voyager_data)
+                    self._remember_company_url(registernummer, page.url)
+                    logger.info(f"✅ Successfully scraped {company_name} (Voyager response)")
                     return data
-                finally:
-                    browser.close()
-                    
+            
+            # Bước 5: Extract About section HTML
+            # About section đã được đợi ở bước trước → HTML + field đọc luôn trong một lần evaluate
+            logger.info("📄 Extracting About section...")
+            about = page.evaluate(self._ABOUT_DATA_JS, {
+                'selector': self._ABOUT_SECTION,
+                'includeHtml': self.store_raw_html,
+                'aboutFields': self._ABOUT_FIELDS,
+            })
+            
+            if about:
+                about_html = about['html']
+                data['about_html'] = about_html
+                if about_html:
+                    logger.info(f"📄 Retrieved About section HTML ({len(about_html)} characters)")
+                
+                # Extract specific data từ About section (field đã đọc trong browser, không parse lại HTML)
+                about_data = self._extract_about_data(about['fields'])
+                data.update(about_data)
+                self._remember_company_url(registernummer, page.url)
+            else:
+                logger.warning("⚠️ Could not find About section")
+            
+            logger.info(f"✅ Successfully scraped {company_name}")
+            return data
+            
         except Exception as e:
-            logger.error(f"❌ Error scraping {company_name} with Playwright: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
-            return {}
+            logger.error(f"❌ Error during scraping: {e}", exc_info=True)
+            return data
+        finally:
+            page.close()
+    
+    def _open_about_via_search(self, page: Page, company_name: str) -> bool:
+        """Search → Companies filter → chọn công ty → mở trang About, False nếu không tới được"""
+        # Session đã xác nhận → vào thẳng trang kết quả Companies, bỏ qua homepage
+        if self._session_trusted():
+            if self._open_company_results(page, company_name):
+                return self._open_matching_about(page, company_name)
+            self.invalidate_session()
+        
+        if not self._verify_session(page):
+            return False
+        self._session_verified_at = time.time()
+        
+        # Bước 1: Tìm kiếm công ty
+        logger.info(f"🔍 Searching for company: {company_name}")
+        try:
+            # fill() tự đợi search box sẵn sàng
+            search_input = page.locator(self._SEARCH_BOX)
+            search_input.fill(company_name, timeout=10000)
+            search_input.press('Enter')
+            logger.info("✅ Đã gửi search query")
+            
+            # Đợi thanh filter của trang kết quả
+            try:
+                page.wait_for_selector(self._FILTERS_BAR, timeout=10000)
+            except:
+                logger.warning("⚠️ Chưa thấy thanh filter sau 10s")
+        except Exception as e:
+            logger.error(f"❌ Lỗi khi search: {e}")
+            return False
+        
+        # Xử lý modal
+        self._dismiss_all_modals(page)
+        
+        # Bước 2: Click "Companies" filter
+        logger.info("🏢 Clicking 'Companies' filter...")
+        try:
+            if page.evaluate(self._CLICK_COMPANIES_FILTER_JS, self._FILTERS_BAR):
+                logger.info("✅ Companies filter clicked")
+            else:
+                logger.warning("⚠️ Could not find Companies filter")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not click Companies filter: {e}")
+        
+        return self._open_matching_about(page, company_name)
+    
+    def _session_trusted(self) -> bool:
+        """Session đã kiểm tra và còn được tin (browser dùng chung: tới khi invalidate, browser riêng: trong TTL)"""
+        if not self._session_verified_at:
+            return False
+        return self._context is not None or time.time() - self._session_verified_at < self._SESSION_TTL
+    
+    def invalidate_session(self):
+        """Bỏ kết quả kiểm tra session (vd: bị redirect về login) → lần scrape sau kiểm tra lại"""
+        self._session_verified_at = 0.0
+    
+    def _redirected_to_login(self, page: Page) -> bool:
+        """Page bị LinkedIn đưa về login/authwall → session không còn dùng được, bỏ tin tưởng session"""
+        if '/login' in page.url or '/authwall' in page.url:
+            logger.warning(f"⚠️ Bị redirect về login ({page.url}), session cần kiểm tra lại")
+            self.invalidate_session()
+            return True
+        return False
+    
+    def _ensure_logged_in(self) -> bool:
+        """Kiểm tra session của browser dùng chung MỘT lần; các lần scrape sau tin kết quả này"""
+        if self._session_verified_at:
+            return True
+        page = self._context.new_page()
+        self._block_heavy_resources(page)
+        try:
+            if not self._verify_session(page):
+                return False
+            self._session_verified_at = time.time()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Không kiểm tra được session: {e}")
+            return False
+        finally:
+            page.close()
+    
+    def _verify_session(self, page: Page) -> bool:
+        """Mở homepage và kiểm tra session còn đăng nhập (search box / không bị redirect login)"""
+        # Kiểm tra xem có session không, nếu không cần đăng nhập
+        logger.info("🔍 Đang kiểm tra session...")
+        page.goto(self.base_url, wait_until='domcontentloaded', timeout=60000)
+        
+        # Đợi search box (chỉ có khi đã đăng nhập) thay vì sleep cố định chờ redirect
+        is_logged_in = False
+        try:
+            page.locator(self._SEARCH_BOX).wait_for(state='visible', timeout=5000)
+            is_logged_in = True
+            logger.info("✅ Tìm thấy search box - đã đăng nhập")
+        except:
+            pass
+        
+        current_url = page.url
+        logger.info(f"📍 Current URL: {current_url}")
+        if not is_logged_in:
+            is_logged_in = '/login' not in current_url and '/authwall' not in current_url
+        
+        if not is_logged_in:
+            logger.warning("⚠️ Chưa có session hoặc session đã hết hạn. Cần đăng nhập.")
+            logger.info("💡 Chạy: python scrapers/linkedin_scraper.py -> chọn option 1 để đăng nhập")
+            logger.info("💡 Hoặc chạy: scraper.setup_login_session(headless=False)")
+            return False
+        
+        logger.info("✅ Session hoạt động, bắt đầu scrape...")
+        return True
+    
+    def _open_company_results(self, page: Page, company_name: str) -> bool:
+        """Mở thẳng trang kết quả search đã lọc Companies, False nếu bị redirect login / không có kết quả"""
+        url = f"{self.base_url}/search/results/companies/?keywords={quote_plus(company_name)}"
+        logger.info(f"🔍 Searching for company (session còn hạn): {company_name}")
+        try:
+            page.goto(url, wait_until='domcontentloaded', timeout=60000)
+            if self._redirected_to_login(page):
+                return False
+            page.locator(self._COMPANY_LINK).first.wait_for(state='visible', timeout=10000)
+        except Exception:
+            logger.info("ℹ️ Trang kết quả Companies không có link công ty, kiểm tra lại session...")
+            return False
+        
+        self._dismiss_all_modals(page)
+        return True
+    
+    def _open_matching_about(self, page: Page, company_name: str) -> bool:
+        """Chọn công ty khớp tên trong trang kết quả đang mở rồi vào trang About"""
+        # Bước 3: Lấy các link công ty (href + tên) trong MỘT lần evaluate
+        logger.info("🏢 Looking for company with matching name...")
+        try:
+            # Đợi kết quả Companies hiện ra thay vì sleep cố định
+            page.locator(self._COMPANY_LINK).first.wait_for(state='visible', timeout=10000)
+        except:
+            pass
+        
+        candidates = page.evaluate(self._COMPANY_LINKS_JS, self._COMPANY_LINK)
+        match = self._pick_company(candidates, company_name)
+        if match is None:
+            logger.error("❌ No company links found")
+            return False
+        
+        # Bước 4: Vào thẳng trang About (không click link công ty rồi click tab About)
+        about_url = f"{match['url']}/about/"
+        logger.info(f"📄 Opening About page: {about_url}")
+        page.goto(about_url, wait_until='domcontentloaded', timeout=60000)
+        self._wait_for_about_section(page)
+        self._dismiss_all_modals(page)
+        return True
+    
+    def _open_cached_about_page(self, page: Page, registernummer: str) -> bool:
+        """Mở trang About từ URL công ty đã lưu cho registernummer, True nếu About section hiện ra"""
+        cached_url = self._cached_company_url(registernummer)
+        if not cached_url:
+            return False
+        
+        logger.info(f"♻️ Dùng URL công ty đã lưu: {cached_url}")
+        try:
+            page.goto(f"{cached_url}/about/", wait_until='domcontentloaded', timeout=30000)
+            if self._redirected_to_login(page):
+                return False
+            page.wait_for_selector(self._ABOUT_SECTION, timeout=10000)
+        except Exception:
+            logger.info("ℹ️ URL đã lưu không còn mở được About, tìm lại công ty")
+            return False
+        
+        self._dismiss_all_modals(page)
+        return True
+    
+    def _open_guessed_about_page(self, page: Page, company_name: str) -> bool:
+        """Mở thẳng /company/<slug>/about/ đoán từ tên công ty, True nếu đúng công ty"""
+        slug = self._slugify(company_name)
+        if not slug:
+            return False
+        
+        url = f"{self.base_url}/company/{slug}/about/"
+        logger.info(f"🎯 Thử URL đoán từ tên: {url}")
+        try:
+            page.goto(url, wait_until='domcontentloaded', timeout=30000)
+            if self._redirected_to_login(page):
+                return False
+            current_url = page.url
+            if '/company/' not in current_url or '/authwall' in current_url or '/unavailable' in current_url:
+                logger.info("ℹ️ URL đoán không tồn tại, chuyển sang search")
+                return False
+            page.wait_for_selector(self._ABOUT_SECTION, timeout=5000)
+            title = page.locator('h1').first.inner_text(timeout=2000).strip()
+        except Exception:
+            logger.info("ℹ️ URL đoán không có About section, chuyển sang search")
+            return False
+        
+        if not self._name_matches(company_name, title):
+            logger.info(f"ℹ️ URL đoán ra công ty khác ({title}), chuyển sang search")
+            return False
+        
+        logger.info(f"✅ URL đoán đúng công ty: {title}")
+        self._dismiss_all_modals(page)
+        return True
+    
+    def _slugify(self, company_name: str) -> str:
+        """Slug URL công ty đoán từ tên (vd: "MAGNA Real Estate GmbH" → "magna-real-estate-gmbh")"""
+        return _SLUG_RE.sub('-', company_name.lower()).strip('-')
+    
+    def _fetch_voyager_about(self, context: BrowserContext, company_name: str) -> Optional[Dict]:
+        """Lấy About data từ Voyager JSON API bằng cookies của context, None nếu không dùng được"""
+        slug = self._slugify(company_name)
+        csrf = next(
+            (c['value'].strip('"') for c in context.cookies(self.base_url) if c['name'] == 'JSESSIONID'),
+            None,
+        )
+        if not slug or not csrf:
+            return None
+        
+        url = f"{self.base_url}/voyager/api/organization/companies?q=universalName&universalName={slug}"
+        logger.info(f"⚡ Voyager API: {url}")
+        try:
+            response = context.request.get(
+                url,
+                headers={
+                    'csrf-token': csrf,
+                    'x-restli-protocol-version': '2.0.0',
+                    'x-li-lang': 'en_US',
+                },
+                timeout=15000,
+            )
+            if not response.ok:
+                logger.info(f"ℹ️ Voyager API trả về {response.status}, chuyển sang render trang")
+                return None
+            elements = response.json().get('elements') or []
+        except Exception as e:
+            logger.warning(f"⚠️ Voyager API lỗi, chuyển sang render trang: {e}")
+            return None
+        
+        if not elements or not self._name_matches(company_name, elements[0].get('name') or ''):
+            logger.info("ℹ️ Voyager API không có công ty khớp tên, chuyển sang render trang")
+            return None
+        
+        return self._voyager_company_data(elements[0])
+    
+    def _voyager_data_from_responses(self, responses: List, company_name: str) -> Optional[Dict]:
+        """Tìm entity công ty khớp tên trong các response Voyager của page, None nếu không có"""
+        for response in reversed(responses):
+            try:
+                if not response.ok or 'json' not in response.headers.get('content-type', ''):
+                    continue
+                payload = response.json()
+            except Exception:
+                continue
+            if not isinstance(payload, dict):
+                continue
+            
+            entities = list(payload.get('included') or []) + list(payload.get('elements') or [])
+            for entity in entities:
+                if (isinstance(entity, dict) and 'staffCount' in entity
+                        and self._name_matches(company_name, entity.get('name') or '')):
+                    return self._voyager_company_data(entity)
+        return None
+    
+    def _voyager_company_data(self, company: Dict) -> Dict:
+        """Map entity công ty của Voyager sang các field kết quả"""
+        phone = company.get('phone')
+        industries = company.get('companyIndustries') or company.get('industries') or []
+        industry = industries[0] if industries else None
+        founded = (company.get('foundedOn') or {}).get('year')
+        return {
+            'mitarbeiter': company.get('staffCount'),
+            'website': company.get('companyPageUrl') or company.get('websiteUrl'),
+            'telefonnummer': phone.get('number') if isinstance(phone, dict) else phone,
+            'industry': industry.get('localizedName') if isinstance(industry, dict) else industry,
+            'founded': str(founded) if founded else None,
+        }
+    
+    def _is_visible(self, page: Page, selector: str) -> bool:
+        """Element khớp selector đang hiển thị (một evaluate, không đợi)"""
+        try:
+            return page.evaluate(self._IS_VISIBLE_JS, selector)
+        except Exception:
+            return False
+    
+    def _block_heavy_resources(self, page: Page):
+        """Chặn ảnh/font/video/tracking cho page scrape bằng CDP Network.setBlockedURLs"""
+        if not self.block_heavy_resources:
+            return
+        try:
+            cdp = page.context.new_cdp_session(page)
+            cdp.send("Network.enable")
+            cdp.send("Network.setBlockedURLs", {"urls": list(self._BLOCKED_URLS)})
+        except Exception as e:
+            # CDP chỉ có trên Chromium - chặn theo resource type qua page.route (chậm hơn: mọi request đi qua Python)
+            logger.warning(f"⚠️ Không thể chặn resource qua CDP, dùng page.route: {e}")
+            page.route("**/*", _block_by_resource_type)
     
-    def _extract_about_data_playwright(self, about_section) -> Dict:
-        """Extract specific data from About section using Playwright"""
+    def _name_matches(self, company_name: str, found_name: str) -> bool:
+        """Tên tìm thấy khớp tên cần tìm (chứa nhau, không phân biệt hoa thường)"""
+        name = company_name.lower()
+        found = found_name.lower()
+        return bool(found) and (name in found or found in name)
+    
+    def _pick_company(self, candidates: List[Dict], company_name: str) -> Optional[Dict]:
+        """Chọn công ty đầu tiên có tên khớp, không có thì lấy kết quả đầu tiên (như trước)"""
+        links = []
+        for candidate in candidates:
+            match = _COMPANY_URL_RE.match(candidate.get('href') or '')
+            if match and candidate.get('text'):
+                links.append({'url': match.group(1), 'text': candidate['text']})
+        if not links:
+            return None
+        
+        for link in links:
+            if self._name_matches(company_name, link['text']):
+                logger.info(f"✅ Company name matches: {link['text']}")
+                return link
+        
+        logger.warning(f"⚠️ Company name doesn't match. Expected: {company_name}, Found: {links[0]['text']}")
+        return links[0]
+    
+    def _wait_for_about_section(self, page: Page):
+        """Đợi About section render xong sau khi click tab About"""
+        try:
+            page.wait_for_selector(self._ABOUT_SECTION, timeout=10000)
+        except:
+            logger.warning("⚠️ Chưa thấy About section sau 10s")
+    
+    def _extract_about_data(self, fields: Dict) -> Dict:
+        """Extract specific data from About section (fields: cặp dt/dd đã đọc sẵn bằng _ABOUT_DATA_JS)"""
         data = {
             'website': None,
             'telefonnummer': None,
@@ -536,55 +1231,40 @@ class LinkedInScraper:
         }
         
         try:
-            # Extract Website
-            try:
-                website_locator = about_section.locator("//dt[contains(., 'Website')]/following-sibling::dd//a")
-                if website_locator.is_visible(timeout=2000):
-                    data['website'] = website_locator.get_attribute('href')
-                    logger.info(f"✅ Found website: {data['website']}")
-            except:
+            # Website
+            if fields.get('website'):
+                data['website'] = fields['website']
+                logger.info(f"✅ Found website: {data['website']}")
+            else:
                 logger.info("ℹ️ No website found")
             
-            # Extract Phone
-            try:
-                phone_locator = about_section.locator("//dt[contains(., 'Phone')]/following-sibling::dd//a")
-                if phone_locator.is_visible(timeout=2000):
-                    phone_href = phone_locator.get_attribute('href')
-                    if phone_href:
-                        data['telefonnummer'] = phone_href.replace('tel:', '')
-                        logger.info(f"✅ Found phone: {data['telefonnummer']}")
-            except:
+            # Phone
+            if fields.get('phone'):
+                data['telefonnummer'] = fields['phone'].replace('tel:', '')
+                logger.info(f"✅ Found phone: {data['telefonnummer']}")
+            else:
                 logger.info("ℹ️ No phone found")
             
-            # Extract Company size (số nhân viên)
-            try:
-                size_locator = about_section.locator("//dt[contains(., 'Company size')]/following-sibling::dd")
-                if size_locator.is_visible(timeout=2000):
-                    size_text = size_locator.inner_text()
-                    import re
-                    numbers = re.findall(r'\d+', size_text)
-                    if numbers:
-                        data['mitarbeiter'] = int(max(numbers))
-                        logger.info(f"✅ Found company size: {data['mitarbeiter']} employees")
-            except:
+            # Company size (số nhân viên)
+            mitarbeiter = max((int(n) for n in _DIGIT_RE.findall(fields.get('size') or '')), default=None)
+            if mitarbeiter is not None:
+                data['mitarbeiter'] = mitarbeiter
+                logger.info(f"✅ Found company size: {data['mitarbeiter']} employees")
+            else:
                 logger.info("ℹ️ No company size found")
             
-            # Extract Industry
-            try:
-                industry_locator = about_section.locator("//dt[contains(., 'Industry')]/following-sibling::dd")
-                if industry_locator.is_visible(timeout=2000):
-                    data['industry'] = industry_locator.inner_text().strip()
-                    logger.info(f"✅ Found industry: {data['industry']}")
-            except:
+            # Industry
+            if fields.get('industry'):
+                data['industry'] = fields['industry']
+                logger.info(f"✅ Found industry: {data['industry']}")
+            else:
                 logger.info("ℹ️ No industry found")
             
-            # Extract Founded year
-            try:
-                founded_locator = about_section.locator("//dt[contains(., 'Founded')]/following-sibling::dd")
-                if founded_locator.is_visible(timeout=2000):
-                    data['founded'] = founded_locator.inner_text().strip()
-                    logger.info(f"✅ Found founded: {data['founded']}")
-            except:
+            # Founded year
+            if fields.get('founded'):
+                data['founded'] = fields['founded']
+                logger.info(f"✅ Found founded: {data['founded']}")
+            else:
                 logger.info("ℹ️ No founded year found")
                 
         except Exception as e:
@@ -593,121 +1273,99 @@ class LinkedInScraper:
         return data
     
     def _dismiss_all_modals(self, page: Page):
-        """Dismiss all possible modals, overlays, and popups on LinkedIn"""
-        logger.info("🚫 Dismissing all modals and overlays...")
-        
-        modal_selectors = [
-            "button[aria-label='Dismiss']",
-            "button[data-test-modal-close-btn]",
-            ".artdeco-modal__dismiss",
-            "button[aria-label='Close']",
-            "button[data-control-name='modal.dismiss']",
-            ".premium-upsell-modal button[aria-label='Dismiss']",
-            ".network-growth-modal button[aria-label='Dismiss']",
-            "button[data-test-id='modal-close']",
-            ".artdeco-toast-item__dismiss",
-        ]
-        
-        dismissed_count = 0
-        
-        for selector in modal_selectors:
-            try:
-                elements = page.locator(selector)
-                count = elements.count()
-                for i in range(count):
-                    element = elements.nth(i)
-                    if element.is_visible(timeout=500):
-                        try:
-                            element.click()
-                            dismissed_count += 1
-                            logger.info(f"✅ Dismissed modal: {selector}")
-                            page.wait_for_timeout(500)
-                        except:
-                            continue
-            except:
-                continue
-        
-        # JavaScript để đóng modal
+        """Dismiss all possible modals, overlays, and popups on LinkedIn (không có modal → về ngay)"""
+        # Kiểm tra + click nút đóng + ẩn overlay/dialog/toast trong MỘT lần evaluate
         try:
-            page.evaluate("""
-                () => {
-                    const overlays = document.querySelectorAll('.artdeco-modal__overlay, .modal-overlay');
-                    overlays.forEach(overlay => {
-                        if (overlay.style.display !== 'none') {
-                            overlay.click();
-                        }
-                    });
-                    
-                    const modals = document.querySelectorAll('.artdeco-modal, .modal, [role="dialog"]');
-                    modals.forEach(modal => {
-                        if (modal.style.display !== 'none') {
-                            modal.style.display = 'none';
-                        }
-                    });
-                    
-                    const toasts = document.querySelectorAll('.artdeco-toast-item, .toast');
-                    toasts.forEach(toast => toast.remove());
-                }
-            """)
-            logger.info("✅ Executed JavaScript to dismiss modals")
+            dismissed_count = page.evaluate(self._DISMISS_MODALS_JS, list(self._MODAL_SELECTORS))
         except Exception as e:
             logger.warning(f"⚠️ JavaScript modal dismissal failed: {e}")
+            return
         
+        if dismissed_count < 0:
+            return
+        logger.info("🚫 Dismissed modals and overlays")
         if dismissed_count > 0:
             logger.info(f"✅ Total modals dismissed: {dismissed_count}")
-        else:
-            logger.info("ℹ️ No modals found to dismiss")
-        
-        page.wait_for_timeout(1000)
-    
-    # Compatibility method - giữ lại tên cũ để server.py không bị lỗi
-    def scrape_with_selenium(self, company_name: str, registernummer: str) -> Dict:
-        """Alias for scrape_with_playwright - để tương thích với code cũ"""
-        return self.scrape_with_playwright(company_name, registernummer)
     
-    def scrape_company(self, company_name: str, registernummer: str) -> Dict:
-        """Placeholder method"""
-        return self.scrape_with_playwright(company_name, registernummer)
+    # Compatibility - giữ lại tên cũ cho code cũ (alias trực tiếp, không thêm một lớp gọi hàm)
+    scrape_with_selenium = scrape_with_playwright
+    scrape_company = scrape_with_playwright
 
 
-if __name__ == "__main__":
-    import sys
-    
-    # Nếu có arguments từ command line, dùng để scrape
-    if len(sys.argv) > 1:
-        # Mode: scrape với arguments
-        # Usage: python scrapers/linkedin_scraper.py "Company Name" "HRB123456"
-        company_name = sys.argv[1] if len(sys.argv) > 1 else "MAGNA Real Estate GmbH"
-        registernummer = sys.argv[2] if len(sys.argv) > 2 else "HRB182742"
-        # Mặc định headless=False để user có thể xem browser
-        headless = sys.argv[3].lower() == 'true' if len(sys.argv) > 3 else False
-        
-        scraper = LinkedInScraper(headless=headless)
-        
-        print("\n" + "="*80)
-        print(f"LINKEDIN SCRAPER - SCRAPING: {company_name}")
-        print("="*80 + "\n")
-        
-        result = scraper.scrape_with_playwright(company_name, registernummer)
-        
-        print("\n" + "="*80)
-        print("SCRAPED DATA:")
-        print("="*80)
-        for key, value in result.items():
-            if key == 'about_html':
-                if value:
-                    print(f"\n{key}:")
-                    print(f"  Length: {len(str(value))} characters")
-                    print(f"  Preview: {str(value)[:200]}...")
-                else:
-                    print(f"{key}: None")
+def _print_result(result: Dict):
+    """In kết quả scrape ra console (about_html chỉ in độ dài + preview) - gom lại, ghi stdout một lần"""
+    lines = ["", "="*80, "SCRAPED DATA:", "="*80]
+    for key, value in result.items():
+        if key == 'about_html':
+            if value:
+                text = value if isinstance(value, str) else str(value)
+                lines += ["", f"{key}:", f"  Length: {len(text)} characters", f"  Preview: {text[:200]}..."]
             else:
-                print(f"{key}: {value}")
-        print("="*80 + "\n")
-    else:
+                lines.append(f"{key}: None")
+        else:
+            lines.append(f"{key}: {value}")
+    lines += ["="*80, ""]
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def _run_scrape(scraper: LinkedInScraper, args: argparse.Namespace):
+    print("\n" + "="*80)
+    print(f"LINKEDIN SCRAPER - SCRAPING: {args.company_name}")
+    print("="*80 + "\n")
+    _print_result(scraper.scrape_with_playwright(args.company_name, args.registernummer))
+
+
+def _run_all(scraper: LinkedInScraper, args: argparse.Namespace):
+    """Setup -> test -> scrape, cả ba bước dùng chung một Playwright driver"""
+    with scraper.driver():
+        if scraper.setup_login_session(headless=args.headless):
+            scraper.test_session_incognito(headless=args.headless)
+            _run_scrape(scraper, args)
+
+
+# Subcommand → hàm chạy (scraper, args)
+_COMMANDS = {
+    'setup': lambda scraper, args: scraper.setup_login_session(headless=args.headless),
+    'test': lambda scraper, args: scraper.test_session_incognito(headless=args.headless),
+    'scrape': _run_scrape,
+    'all': _run_all,
+}
+
+# Lựa chọn của menu tương tác → subcommand
+_MENU = {'1': 'setup', '2': 'test', '3': 'scrape', '4': 'all'}
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="LinkedIn scraper - setup session, test session, scrape công ty")
+    sub = parser.add_subparsers(dest='cmd')
+    for name, help_text in (
+        ('setup', "Đăng nhập và lưu session"),
+        ('test', "Test session với incognito mode"),
+        ('scrape', "Scrape một công ty"),
+        ('all', "Setup -> test -> scrape"),
+    ):
+        cmd_parser = sub.add_parser(name, help=help_text)
+        # Mặc định headless=False để user có thể xem browser
+        cmd_parser.add_argument('--headless', action='store_true', help="Chạy browser headless")
+        if name in ('scrape', 'all'):
+            cmd_parser.add_argument('company_name', nargs='?', default="MAGNA Real Estate GmbH")
+            cmd_parser.add_argument('registernummer', nargs='?', default="HRB182742")
+    return parser
+
+
+if __name__ == "__main__":
+    # Usage: python scrapers/linkedin_scraper.py {setup,test,scrape,all} [--headless] [company_name registernummer]
+    #        python scrapers/linkedin_scraper.py   (không tham số → menu tương tác)
+    argv = sys.argv[1:]
+    # Cách gọi cũ: python scrapers/linkedin_scraper.py "Company Name" "HRB123456" [true]
+    if argv and argv[0] not in _COMMANDS and not argv[0].startswith('-'):
+        argv = ['scrape'] + argv[:2] + (['--headless'] if len(argv) > 2 and argv[2].lower() == 'true' else [])
+    
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    
+    if args.cmd is None:
         # Mode: Interactive menu (cho setup/test)
-        scraper = LinkedInScraper(headless=False)  # Non-headless để test
-        
         print("\n" + "="*80)
         print("LINKEDIN SCRAPER - SETUP & TEST")
         print("="*80 + "\n")
@@ -719,35 +1377,9 @@ if __name__ == "__main__":
         print("4. Tất cả (setup -> test -> scrape)")
         
         choice = input("\nNhập lựa chọn (1/2/3/4): ").strip()
-        
-        if choice == "1":
-            scraper.setup_login_session(headless=False)
-        elif choice == "2":
-            scraper.test_session_incognito(headless=False)  # Non-headless để user xem
-        elif choice == "3":
-            result = scraper.scrape_with_playwright("MAGNA Real Estate GmbH", "HRB182742")
-            print("\n" + "="*80)
-            print("SCRAPED DATA:")
-            print("="*80)
-            for key, value in result.items():
-                if key == 'about_html':
-                    print(f"  {key}: {len(str(value))} characters")
-                else:
-                    print(f"  {key}: {value}")
-            print("="*80 + "\n")
-        elif choice == "4":
-            # Setup
-            if scraper.setup_login_session(headless=False):
-                # Test
-                scraper.test_session_incognito(headless=False)
-                # Scrape
-                result = scraper.scrape_with_playwright("MAGNA Real Estate GmbH", "HRB182742")
-                print("\n" + "="*80)
-                print("SCRAPED DATA:")
-                print("="*80)
-                for key, value in result.items():
-                    if key == 'about_html':
-                        print(f"  {key}: {len(str(value))} characters")
-                    else:
-                        print(f"  {key}: {value}")
-                print("="*80 + "\n")
+        if choice not in _MENU:
+            sys.exit(0)
+        args = parser.parse_args([_MENU[choice]])
+    
+    scraper = LinkedInScraper(headless=args.headless, store_raw_html=True)
+    _COMMANDS[args.cmd](scraper, args)
@@ -0,0 +1,347 @@
+"""
+LinkedIn Scraper (async)
+Scrape nhiều công ty song song trên một event loop bằng playwright.async_api
+"""
+
+import sys
+import os
+from pathlib import Path
+import asyncio
+import argparse
+import csv
+import json
+import random
+import time
+import logging
+from typing import Dict, List, Tuple
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+from scrapers.linkedin_scraper import LinkedInScraper, BLOCKED_RESOURCE_TYPES
+
+# Setup logging
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
+
+# Số page LinkedIn chạy cùng lúc mặc định - cao hơn dễ bị rate limit / checkpoint
+MAX_PARALLEL_PAGES = 3
+
+# Jitter ngẫu nhiên (giây) trước khi mỗi công ty bắt đầu để các page song song không bắn request cùng một nhịp
+START_JITTER = 0.1
+
+# Số lần page.goto tối đa mỗi giây lên LinkedIn cho cả batch (0 = không giới hạn)
+RATE_LIMIT_RPS = float(os.environ.get("LINKEDIN_RATE_LIMIT_RPS", "0.5"))
+
+
+class _TokenBucket:
+    """Token bucket cho asyncio: trung bình `rate` lượt/giây, burst tối đa `capacity` lượt"""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Đợi tới khi có token (các coroutine xếp hàng theo thứ tự gọi)"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncLinkedInScraper:
+    """
+    Batch scraper cho LinkedIn dùng playwright.async_api
+    
+    Một browser + pool `concurrency` BrowserContext load cùng session đã lưu (context_storage.json).
+    Mỗi công ty mượn một context trong pool (asyncio.Queue), mở page riêng rồi trả context lại -
+    context giữ HTTP cache / cookie ấm giữa các công ty, pool rỗng thì task đợi.
+    Parse About section dùng lại logic của LinkedInScraper (bản sync vẫn giữ nguyên).
+    """
+    
+    def __init__(self, headless: bool = True, store_raw_html: bool = False):
+        self.headless = headless
+        self._sync = LinkedInScraper(headless=headless, store_raw_html=store_raw_html)
+        self.base_url = self._sync.base_url
+        self._rate_limiter = None
+    
+    async def scrape_many(self, companies: List[Tuple[str, str]], concurrency: int = MAX_PARALLEL_PAGES) -> List[Dict]:
+        """
+        Scrape nhiều công ty song song
+        
+        Args:
+            companies: List (company_name, registernummer)
+            concurrency: Số context chạy cùng lúc
+        
+        Returns:
+            List kết quả theo đúng thứ tự của companies
+        """
+        storage_state = self._sync._load_context_storage()
+        if not storage_state:
+            logger.error("❌ Không tìm thấy session file. Chạy: python scrapers/linkedin_scraper.py -> option 1")
+            return [{} for _ in companies]
+        
+        concurrency = max(1, concurrency)
+        # Chỉ có một host (linkedin.com) → một bucket cho cả batch, burst bằng số page chạy song song
+        self._rate_limiter = _TokenBucket(RATE_LIMIT_RPS, concurrency)
+        
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(
+                headless=self.headless,
+                args=[
+                    '--no-sandbox',
+                    '--disable-dev-shm-usage',
+                    '--disable-blink-features=AutomationControlled',
+                ]
+            )
+            # Công ty trùng nhau trong batch (vd: file input có dòng lặp) chỉ scrape một lần
+            unique = list(dict.fromkeys(tuple(c) for c in companies))
+            try:
+                contexts: asyncio.Queue = asyncio.Queue()
+                for _ in range(min(concurrency, len(unique))):
+                    contexts.put_nowait(await self._new_context(browser, storage_state))
+                results = await asyncio.gather(*(
+                    self._scrape_one(contexts, company_name, registernummer)
+                    for company_name, registernummer in unique
+                ), return_exceptions=True)
+            finally:
+                await browser.close()
+        
+        by_company = {}
+        for (company_name, registernummer), result in zip(unique, results):
+            if isinstance(result, BaseException):
+                logger.error(f"❌ Error scraping {company_name} (async): {result}")
+                result = self._sync._empty_result(registernummer)
+            by_company[(company_name, registernummer)] = result
+        return [dict(by_company[tuple(c)]) for c in companies]
+    
+    async def _new_context(self, browser: Browser, storage_state: Dict) -> BrowserContext:
+        """Context load session đã lưu (cùng cấu hình với bản sync)"""
+        context = await browser.new_context(
+            viewport={'width': 1920, 'height': 1080},
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+            locale='en-US',
+            timezone_id='Europe/Berlin',
+            storage_state=storage_state,
+        )
+        await context.add_init_script("""
+            Object.defineProperty(navigator, 'webdriver', {
+                get: () => undefined
+            });
+        """)
+        return context
+    
+    async def _scrape_one(self, contexts: asyncio.Queue, company_name: str, registernummer: str) -> Dict:
+        """Scrape một công ty trên page mới của context mượn từ pool (trả lại pool khi xong)"""
+        context = await contexts.get()
+        page = None
+        try:
+            await asyncio.sleep(random.uniform(0, START_JITTER))
+            logger.info(f"🔍 Scraping LinkedIn (async) for {company_name}")
+            page = await context.new_page()
+            await self._block_heavy_resources(page)
+            return await self._scrape_on_page(page, company_name, registernummer)
+        except Exception as e:
+            logger.error(f"❌ Error scraping {company_name} (async): {e}")
+            return self._sync._empty_result(registernummer)
+        finally:
+            if page is not None:
+                await page.close()
+            contexts.put_nowait(context)
+    
+    async def _scrape_on_page(self, page: Page, company_name: str, registernummer: str) -> Dict:
+        """URL đã lưu, URL đoán từ tên, không được thì Search → Companies filter → About (cùng flow với bản sync)"""
+        data = self._sync._empty_result(registernummer)
+        
+        # Bước 0: URL đã tìm được lần trước (company_urls.json dùng chung với bản sync)
+        if not await self._open_cached_about_page(page, registernummer):
+            if not await self._open_guessed_about_page(page, company_name):
+                if not await self._open_about_via_search(page, company_name):
+                    return data
+        
+        # Bước 5: Extract About section HTML
+        about = await page.evaluate(LinkedInScraper._ABOUT_DATA_JS, {
+            'selector': LinkedInScraper._ABOUT_SECTION,
+            'includeHtml': self._sync.store_raw_html,
+            'aboutFields': LinkedInScraper._ABOUT_FIELDS,
+        })
+        if about:
+            data['about_html'] = about['html']
+            data.update(self._sync._extract_about_data(about['fields']))
+            self._sync._remember_company_url(registernummer, page.url)
+            logger.info(f"✅ Successfully scraped {company_name}")
+        else:
+            logger.warning(f"⚠️ Could not find About section for {company_name}")
+        
+        return data
+    
+    async def _open_cached_about_page(self, page: Page, registernummer: str) -> bool:
+        """Mở trang About từ URL công ty đã lưu cho registernummer, True nếu About section hiện ra"""
+        cached_url = self._sync._cached_company_url(registernummer)
+        if not cached_url:
+            return False
+        
+        logger.info(f"♻️ Dùng URL công ty đã lưu: {cached_url}")
+        try:
+            await self._goto(page, f"{cached_url}/about/", wait_until='domcontentloaded', timeout=30000)
+            if self._sync._redirected_to_login(page):
+                return False
+            await page.wait_for_selector(LinkedInScraper._ABOUT_SECTION, timeout=10000)
+        except Exception:
+            logger.info("ℹ️ URL đã lưu không còn mở được About, tìm lại công ty")
+            return False
+        
+        await self._dismiss_modals(page)
+        return True
+    
+    async def _open_guessed_about_page(self, page: Page, company_name: str) -> bool:
+        """Mở thẳng /company/<slug>/about/ đoán từ tên công ty, True nếu đúng công ty"""
+        slug = self._sync._slugify(company_name)
+        if not slug:
+            return False
+        
+        try:
+            await self._goto(page, f"{self.base_url}/company/{slug}/about/", wait_until='domcontentloaded', timeout=30000)
+            if '/company/' not in page.url or '/authwall' in page.url or '/unavailable' in page.url:
+                return False
+            await page.wait_for_selector(LinkedInScraper._ABOUT_SECTION, timeout=5000)
+            title = (await page.locator('h1').first.inner_text(timeout=2000)).strip()
+        except Exception:
+            return False
+        
+        if not self._sync._name_matches(company_name, title):
+            return False
+        
+        logger.info(f"🎯 URL đoán đúng công ty: {title}")
+        await self._dismiss_modals(page)
+        return True
+    
+    async def _open_about_via_search(self, page: Page, company_name: str) -> bool:
+        """Search → Companies filter → chọn công ty → mở trang About, False nếu không tới được"""
+        await self._goto(page, self.base_url, wait_until='domcontentloaded', timeout=60000)
+        
+        # Search box chỉ có khi đã đăng nhập
+        search_input = page.locator(LinkedInScraper._SEARCH_BOX)
+        try:
+            await search_input.wait_for(state='visible', timeout=10000)
+        except Exception:
+            logger.warning(f"⚠️ Session hết hạn hoặc chưa đăng nhập ({page.url})")
+            return False
+        
+        # Bước 1: Tìm kiếm công ty
+        await search_input.fill(company_name)
+        await search_input.press('Enter')
+        try:
+            await page.wait_for_selector(LinkedInScraper._FILTERS_BAR, timeout=10000)
+        except Exception:
+            logger.warning("⚠️ Chưa thấy thanh filter sau 10s")
+        await self._dismiss_modals(page)
+        
+        # Bước 2: Click "Companies" filter
+        try:
+            if not await page.evaluate(LinkedInScraper._CLICK_COMPANIES_FILTER_JS, LinkedInScraper._FILTERS_BAR):
+                logger.warning("⚠️ Could not find Companies filter")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not click Companies filter: {e}")
+        
+        # Bước 3: Chọn công ty khớp tên từ danh sách link (một lần evaluate)
+        try:
+            await page.locator(LinkedInScraper._COMPANY_LINK).first.wait_for(state='visible', timeout=10000)
+        except Exception:
+            pass
+        match = self._sync._pick_company(await page.evaluate(LinkedInScraper._COMPANY_LINKS_JS, LinkedInScraper._COMPANY_LINK), company_name)
+        if match is None:
+            logger.error(f"❌ No company links found for {company_name}")
+            return False
+        
+        # Bước 4: Vào thẳng trang About
+        await self._goto(page, f"{match['url']}/about/", wait_until='domcontentloaded', timeout=60000)
+        try:
+            await page.wait_for_selector(LinkedInScraper._ABOUT_SECTION, timeout=10000)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not open About page: {e}")
+        await self._dismiss_modals(page)
+        return True
+    
+    async def _goto(self, page: Page, url: str, **kwargs):
+        """page.goto sau khi lấy token từ rate limiter của batch"""
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire()
+        return await page.goto(url, **kwargs)
+    
+    async def _block_heavy_resources(self, page: Page):
+        """Chặn ảnh/font/video/tracking qua CDP (cùng danh sách với bản sync)"""
+        if not self._sync.block_heavy_resources:
+            return
+        try:
+            cdp = await page.context.new_cdp_session(page)
+            await cdp.send("Network.enable")
+            await cdp.send("Network.setBlockedURLs", {"urls": list(LinkedInScraper._BLOCKED_URLS)})
+        except Exception as e:
+            logger.warning(f"⚠️ Không thể chặn resource qua CDP, dùng page.route: {e}")
+            await page.route("**/*", _block_by_resource_type)
+    
+    async def _dismiss_modals(self, page: Page):
+        """Đóng modal/toast nếu có - một lần evaluate"""
+        try:
+            await page.evaluate(LinkedInScraper._DISMISS_MODALS_JS, list(LinkedInScraper._MODAL_SELECTORS))
+        except Exception as e:
+            logger.warning(f"⚠️ Modal dismissal failed: {e}")
+
+
+async def _block_by_resource_type(route):
+    """Route handler async: abort các resource type trong BLOCKED_RESOURCE_TYPES"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+def scrape_many(companies: List[Tuple[str, str]], concurrency: int = MAX_PARALLEL_PAGES, headless: bool = True) -> List[Dict]:
+    """Wrapper sync cho code không chạy trong event loop"""
+    return asyncio.run(AsyncLinkedInScraper(headless=headless).scrape_many(companies, concurrency))
+
+
+def _load_companies(path: Path) -> List[Dict]:
+    """Danh sách công ty từ file .json (như data/companies.json) hoặc .csv (cột company_name, registernummer)"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.suffix.lower() == '.csv':
+            return [row for row in csv.DictReader(f) if row.get('company_name')]
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    # Usage: python scrapers/linkedin_scraper_async.py [concurrency] [--input companies.csv|companies.json]
+    parser = argparse.ArgumentParser(description="Scrape LinkedIn song song cho cả danh sách công ty")
+    parser.add_argument('concurrency', nargs='?', type=int, default=MAX_PARALLEL_PAGES, help="Số context chạy cùng lúc")
+    parser.add_argument('--input', type=Path, default=Path(__file__).parent.parent / 'data' / 'companies.json',
+                        help="File công ty (.json hoặc .csv có cột company_name, registernummer)")
+    args = parser.parse_args()
+    
+    companies = _load_companies(args.input)
+    results = scrape_many(
+        [(c['company_name'], c.get('registernummer') or '') for c in companies],
+        concurrency=args.concurrency,
+        headless=True,
+    )
+    
+    for company, result in zip(companies, results):
+        print("\n" + "="*60)
+        print(f"📊 LINKEDIN: {company['company_name']}")
+        print("="*60)
+        for key, value in result.items():
+            if key == 'about_html':
+                print(f"{key}: {len(value) if value else 0} characters")
+            else:
+                print(f"{key}: {value}")
@@ -4,18 +4,28 @@ Scrapes business data from Northdata using Playwright
 """
 
 import os
+import re
 import sys
 import time
+import json
+import hashlib
 import logging
 import io
-from typing import Dict, Optional, List
-from playwright.sync_api import sync_playwright, Page, Browser
+import tempfile
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus
+from typing import Callable, Dict, Optional, List, Tuple
+import lxml.html
+from lxml import etree
+from playwright.sync_api import sync_playwright, Page, Browser, BrowserContext
 
 # Add project root to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Force UTF-8 encoding cho console
-if sys.platform == 'win32':
+# Force UTF-8 encoding cho console (Windows chạy không có -X utf8 / PYTHONUTF8=1)
+if sys.platform == 'win32' and not sys.flags.utf8_mode:
     try:
         sys.stdout.reconfigure(encoding='utf-8', errors='replace')
         sys.stderr.reconfigure(encoding='utf-8', errors='replace')
@@ -24,208 +34,550 @@ if sys.platform == 'win32':
         sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace', line_buffering=True)
 
 # Setup logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
+# Regex của các extractor - compile một lần khi import module
+_MITARBEITER_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(\d+)\s*Mitarbeiter',
+    r'(\d+)\s*employees',
+    r'MITARBEITER.*?(\d+)',
+    r'(\d+).*?Mitarbeiter',
+))
+_UMSATZ_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(\d+)[.,](\d+)\s*Mio\\.?\s*€',  # "24,1 Mio. €"
+    r'(\d+)\s*Mio\\.?\s*€',           # "24 Mio. €"
+    r'(\d+[.,]\d+)\s*Mio',            # "24,1 Mio"
+    r'(\d+)\s*Millionen',             # "24 Millionen"
+    r'UMSÄTZ.*?(\d+[.,]\d+)',        # "UMSÄTZ 24,1"
+    r'(\d+[.,]\d+).*?Mio.*?€',       # Various formats
+))
+_GEWINN_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(\d+)[.,](\d+)\s*Mio\\.?\s*€',  # "2,1 Mio. €"
+    r'(\d+)\s*Mio\\.?\s*€',           # "2 Mio. €"
+    r'-(\d+)[.,](\d+)\s*Mio\\.?\s*€', # "-2,1 Mio. €" (loss)
+    r'GEWINN.*?(\d+[.,]\d+)',        # "GEWINN 2,1"
+    r'VERLUST.*?(\d+[.,]\d+)',       # "VERLUST 2,1"
+    r'(\d+[.,]\d+).*?Mio.*?€',       # Various formats
+))
+_NUMBER_RE = re.compile(r'\d+')
+_DECIMAL_RE = re.compile(r'(\d+[.,]\d+)')
+_MIO_RE = re.compile(r'(\d+)[.,](\d+)\s*Mio')
+_AMTSGERICHT_RE = re.compile(r'Amtsgericht\s+(\w+)')
+_ADDR_RE = re.compile(r'Große Elbstr[^,]+,\s*D-\d+\s+\w+')
+_ZWECK_RE = re.compile(r'Gegenstand des Unternehmens der Gesellschaft ist ([^<]+)')
+_D_PLZ_RE = re.compile(r'\bD-\d{5}\b')
+_GESAMTWERT_RE = re.compile(r'(\d+[.,]\d+)\s*Mio\.\s*€.*?Finanzanlagen')
+_LEI_RE = re.compile(r'([A-Z0-9]{20})')
+_TRADEMARK_RE = re.compile(r'(Wort-?/Bildmarke|Wortmarke):\s*["\']([^"\']+)["\']')
+_FOUNDING_DATE_RE = re.compile(r'"foundingDate"\s*:\s*"(\d{4}-\d{2}-\d{2})"')
+_EINTRAGUNG_DATE_RE = re.compile(r'"date"\s*:\s*"(\d{4}-\d{2}-\d{2})"\s*,\s*"desc"\s*:\s*"[^"]*Eintragung"')
+_PERSON_NAME_RE = re.compile(r'([A-ZÄÖÜ][a-zäöüß]+)\s+([A-ZÄÖÜ][a-zäöüß]+)')
+_TELEPHONE_RE = re.compile(r'"telephone"\s*:\s*"([^"]+)"')
+_EMAIL_RE = re.compile(r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})')
+_WEBSITE_PATTERNS = (
+    re.compile(r'(https?://[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'),
+    re.compile(r'(www\.[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'),
+)
+_FILENAME_UNSAFE_RE = re.compile(r'[^\w\s-]')
+# Dấu hiệu công ty phá sản / đã giải thể - một lần quét HTML cho cả danh sách
+_INSOLVENZ_INDICATORS = (
+    '✝︎',  # Death symbol used for terminated companies
+    'Liquidation',
+    'Insolvenz',
+    'Insolvency',
+    'Erloschen',
+    'Terminiert',
+)
+_INSOLVENZ_RE = re.compile('|'.join(map(re.escape, _INSOLVENZ_INDICATORS)))
+# Trường chỉ cần một regex trên HTML: (tên trường, pattern, lấy giá trị từ match).
+# Pattern dùng chung cho nhiều trường chỉ search một lần
+_REGEX_FIELDS = (
+    ('handelsregister', _AMTSGERICHT_RE, lambda m: m.group(1)),  # "Amtsgericht Hamburg HRB" → "Hamburg"
+    ('gerichtsstand', _AMTSGERICHT_RE, lambda m: m.group(0)),    # "Amtsgericht Hamburg"
+    ('gesamtwert_immobilien', _GESAMTWERT_RE, lambda m: float(m.group(1).replace(',', '.'))),  # Finanzanlagen (Mio. €)
+    ('telefonnummer', _TELEPHONE_RE, lambda m: m.group(1).strip()),  # chỉ từ JSON-LD "telephone" để tránh sai
+    ('email', _EMAIL_RE, lambda m: m.group(1)),
+)
+# Request không cần cho extract: ảnh/font/video và tracking/quảng cáo.
+# Giữ stylesheet - kiểm tra visible của các selector fallback dựa vào CSS
+_BLOCKED_RESOURCE_TYPES = frozenset({'image', 'font', 'media'})
+_BLOCK_DOMAINS = ('googletagmanager', 'google-analytics', 'doubleclick', 'hotjar', 'sentry', 'facebook.net')
+
+
+def _is_blocked_request(request) -> bool:
+    """Request bị abort bởi route handler (dùng chung cho bản sync và async)"""
+    return request.resource_type in _BLOCKED_RESOURCE_TYPES or any(domain in request.url for domain in _BLOCK_DOMAINS)
+
+
+# Block JSON-LD (schema.org) trong HTML - địa chỉ, LEI... có cấu trúc, không cần đoán bằng regex.
+# Bình thường lấy qua DOM (lxml), regex chỉ dùng khi HTML không parse được
+_JSON_LD_XPATH = '//script[@type="application/ld+json"]/text()'
+_ZWECK_XPATH = '//text()[contains(., "Gegenstand des Unternehmens der Gesellschaft ist")]'
+# JSON của các bar chart tài chính (Gewinn, Umsatz, Mitarbeiter...) nằm trong attribute data-data
+_BAR_CHARTS_XPATH = '//*[contains(@class, "has-bar-charts")]/@data-data'
+_JSON_LD_RE = re.compile(r'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE)
+
+
+def _write_json_atomic(path: str, payload) -> None:
+    """Ghi JSON ra file tạm tên riêng cùng thư mục rồi os.replace - nhiều thread ghi cùng path không đè file tạm của nhau"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
 
 class NorthdataScraper:
     """Scraper for northdata.de using Playwright"""
     
+    # Phần nội dung công ty được lưu thành HTML (main > div.anchor.content > section)
+    _TARGET_SECTION = 'main.ui.container > div.anchor.content > section'
+    
+    # Trang sau khi search: heading của company page hoặc danh sách kết quả
+    _SEARCH_SETTLED = 'span.heading, .event'
+    
+    # Kết quả cache trên disk quá 30 ngày thì scrape lại
+    _CACHE_MAX_AGE = 30 * 24 * 3600
+    
+    # Selector fallback (theo thứ tự ưu tiên) khi regex trên HTML không ra mitarbeiter/umsatz/gewinn
+    _FALLBACK_SELECTORS = {
+        'mitarbeiter': [
+            'text=/\\d+\\s*Mitarbeiter/',
+            'text=/\\d+\\s*employees/',
+            '[data-testid="employees"]',
+            '.employee-count',
+            '.mitarbeiter',
+            # Northdata specific selectors
+            'text=/MITARBEITER/',
+            '.chart-container',
+            '.financial-data',
+            '.metric-value',
+        ],
+        'umsatz': [
+            'text=/Umsatz/',
+            'text=/Revenue/',
+            'text=/\\d+[.,]\\d+\\s*Mio\\.?\\s*€/',
+            '[data-testid="revenue"]',
+            '.umsatz',
+            '.revenue',
+            '.chart-container',
+            '.financial-data',
+        ],
+        'gewinn': [
+            'text=/Gewinn/',
+            'text=/Verlust/',
+            'text=/Profit/',
+            'text=/Loss/',
+            '[data-testid="profit"]',
+            '.gewinn',
+            '.profit',
+            '.chart-container',
+            '.financial-data',
+        ],
+    }
+    
+    # Text của phần tử đầu tiên khớp mỗi selector fallback (chỉ khi visible) - một lần evaluate cho cả 3 trường.
+    # "text=/regex/" (cú pháp Playwright) → phần tử cha của text node đầu tiên khớp regex
+    _FALLBACK_TEXTS_JS = """
+        (fields) => {
+            const visible = (el) => !!el && el.getClientRects().length > 0
+                && getComputedStyle(el).visibility !== 'hidden';
+            const byText = (re) => {
+                const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+                for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+                    if (re.test(node.textContent)) return node.parentElement;
+                }
+                return null;
+            };
+            const first = (selector) => selector.startsWith('text=/')
+                ? byText(new RegExp(selector.slice(6, selector.lastIndexOf('/'))))
+                : document.querySelector(selector);
+            const texts = {};
+            for (const [key, selectors] of Object.entries(fields)) {
+                texts[key] = [];
+                for (const selector of selectors) {
+                    try {
+                        const el = first(selector);
+                        if (visible(el)) texts[key].push(el.textContent || '');
+                    } catch (e) {}
+                }
+            }
+            return texts;
+        }
+    """
+    
+    # innerHTML của section nội dung (null nếu không có / không hiển thị) - một lần evaluate
+    _SECTION_HTML_JS = """
+        (selector) => {
+            const el = document.querySelector(selector);
+            return el && el.getClientRects().length > 0 ? el.innerHTML : null;
+        }
+    """
+    
+    # Selector của search results cho _FIND_COMPANY_LINK_JS (theo cấu trúc Semantic UI của northdata.de)
+    _RESULT_SELECTORS = (
+        '.event[data-uri]',
+        '.ui.card',
+        '.search-result',
+        '.company-result',
+        '.ui.items .item',
+        '.result-item',
+        'a[href*="/"]',  # Any link that might be a company
+    )
+    _RESULT_TEXT_SELECTORS = ('.extra.text', '.meta', '.description', '.content', 'a')
+    _RESULT_LINK_SELECTORS = ('a.title', 'a', '.title a', 'h3 a', 'h2 a')
+    
+    # Link của kết quả search có text chứa registernummer (một lần evaluate thay vì locator từng phần tử)
+    _FIND_COMPANY_LINK_JS = """
+        ({selectors, textSelectors, linkSelectors, registernummer}) => {
+            // HRB không có ở đâu trên trang thì khỏi duyệt từng kết quả
+            if (!(document.body.textContent || '').includes(registernummer)) return null;
+            for (const selector of selectors) {
+                for (const el of document.querySelectorAll(selector)) {
+                    const sources = [...textSelectors.map((s) => el.querySelector(s)), el];
+                    if (!sources.some((source) => source && (source.textContent || '').includes(registernummer))) continue;
+                    for (const linkSelector of linkSelectors) {
+                        const link = el.matches(linkSelector) ? el : el.querySelector(linkSelector);
+                        if (link && link.href && link.getClientRects().length > 0) return link.href;
+                    }
+                    const link = el.querySelector('a');
+                    if (link && link.href) return link.href;
+                }
+            }
+            return null;
+        }
+    """
+    
     def __init__(self, headless: bool = False):
         self.base_url = "https://www.northdata.de"
         self.headless = headless
+        # SCRAPER_DEBUG=1 → lưu thêm screenshot cho mỗi company (chậm, chỉ dùng khi debug)
+        self.debug = bool(os.environ.get("SCRAPER_DEBUG"))
+        
+        # NORTHDATA_BLOCK_RESOURCES=0 → không chặn ảnh/font/tracking (vd: khi cần screenshot đầy đủ)
+        self.block_heavy_resources = os.environ.get("NORTHDATA_BLOCK_RESOURCES", "1") != "0"
+        
+        # Kết quả đã scrape theo (company_name, registernummer) - chạy lại crawl không cần mở browser
+        self._cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache', 'northdata')
+        
+        # HTML công ty lưu ở data/companies/ (server.py đọc lại qua html_filepath)
+        self._companies_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'companies')
+        
+        # Cookie đã accept (storage_state) - context mới load lại nên popup không hiện nữa
+        self._storage_state_path = os.path.join(os.path.dirname(self._cache_dir), 'northdata_state.json')
+        
+        # Browser dùng chung của scrape_pooled(): Playwright + Chromium sống trên một pool thread riêng
+        # (sync Playwright gắn với thread tạo ra nó), mỗi công ty chỉ mở context mới
+        self._playwright = None
+        self._browser: Optional[Browser] = None
+        self._pool_executor: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
         
         logger.info("🌐 Northdata Scraper initialized")
     
-    def scrape_company(self, company_name: str, registernummer: str) -> Dict:
+    def scrape_company(self, company_name: str, registernummer: str, force_rescrape: bool = False) -> Dict:
         """
         Scrape company data from northdata.de
         
         Args:
             company_name: Company name
             registernummer: HRB number
+            force_rescrape: Bỏ qua kết quả đã cache, luôn scrape lại
             
         Returns:
             Dict with scraped data
         """
+        if not force_rescrape:
+            cached = self._load_cached_result(company_name, registernummer)
+            if cached is not None:
+                logger.info(f"♻️ Dùng lại kết quả Northdata đã scrape cho {company_name}")
+                return cached
+        
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=self.headless)
-            page = browser.new_page()
+            try:
+                return self._scrape_in_browser(browser, company_name, registernummer)
+            finally:
+                browser.close()
+    
+    def scrape_pooled(self, company_name: str, registernummer: str, force_rescrape: bool = False) -> Dict:
+        """
+        Như scrape_company nhưng trên browser dùng chung - gọi được từ bất kỳ thread nào (vd: worker của server)
+        
+        Browser chỉ launch một lần cho cả process, các lời gọi xếp hàng trên pool thread.
+        """
+        if not force_rescrape:
+            cached = self._load_cached_result(company_name, registernummer)
+            if cached is not None:
+                logger.info(f"♻️ Dùng lại kết quả Northdata đã scrape cho {company_name}")
+                return cached
+        
+        with self._pool_lock:
+            if self._pool_executor is None:
+                self._pool_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='northdata-browser')
+            executor = self._pool_executor
+        return executor.submit(self._scrape_on_pool_thread, company_name, registernummer).result()
+    
+    def _scrape_on_pool_thread(self, company_name: str, registernummer: str) -> Dict:
+        """Chạy trên pool thread: launch browser dùng chung lần đầu (hoặc khi đã crash) rồi scrape"""
+        if self._browser is None or not self._browser.is_connected():
+            self._close_browser()
+            try:
+                self._playwright = sync_playwright().start()
+                self._browser = self._playwright.chromium.launch(headless=self.headless)
+                logger.info("🌐 Đã khởi động browser Northdata dùng chung")
+            except Exception as e:
+                logger.error(f"❌ Không khởi động được browser Northdata dùng chung: {e}")
+                self._close_browser()
+                return {}
+        return self._scrape_in_browser(self._browser, company_name, registernummer)
+    
+    def _close_browser(self):
+        """Đóng browser + Playwright của scrape_pooled() (chạy trên pool thread)"""
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Lỗi đóng browser: {e}")
+        if self._playwright is not None:
+            self._playwright.stop()
+        self._browser = None
+        self._playwright = None
+    
+    def close_pool(self):
+        """Đóng browser dùng chung của scrape_pooled() và dừng pool thread"""
+        with self._pool_lock:
+            executor, self._pool_executor = self._pool_executor, None
+        if executor is not None:
+            executor.submit(self._close_browser).result()
+            executor.shutdown()
+    
+    def _scrape_in_browser(self, browser: Browser, company_name: str, registernummer: str) -> Dict:
+        """Search + extract một công ty trong BrowserContext mới trên browser đã launch (đóng context khi xong)"""
+        context = None
+        try:
+            # Tạo context trong try: browser đã chết / state hỏng → return {} và không bỏ sót context chưa đóng
+            context, has_state = self._new_context(browser)
+            page = context.new_page()
+            if self.block_heavy_resources:
+                page.route("**/*", lambda route: route.abort() if _is_blocked_request(route.request) else route.continue_())
+            
+            logger.info(f"🔍 Searching Northdata for: {company_name}")
             
+            # Vào thẳng URL search (không qua trang chủ)
+            page.goto(self._search_url(company_name, registernummer), wait_until='domcontentloaded')
+            logger.info("✅ Đã truy cập Northdata search")
+            
+            # Cookie popup chỉ cần xử lý khi chưa có storage_state (hoặc cookie đã hết hạn)
+            self._accept_cookies(page, wait=not has_state)
+            
+            # Đợi tới khi có company page (heading) hoặc search results thay vì sleep cố định
             try:
-                logger.info(f"🔍 Searching Northdata for: {company_name}")
-                
-                # Navigate to Northdata
-                page.goto(self.base_url, wait_until='networkidle')
-                logger.info("✅ Đã truy cập Northdata")
-                
-                # Handle cookie consent popup
-                try:
-                    cookie_popup = page.locator('text="Accept all"').first
-                    is_visible = cookie_popup.is_visible(timeout=3000)
-                    if is_visible:
-                        cookie_popup.click()
-                        logger.info("🍪 Đã accept cookie consent")
-                        page.wait_for_timeout(1000)  # Wait for popup to disappear
-                except:
-                    logger.info("ℹ️ Không có cookie popup hoặc đã được handle")
-                
-                # Fill search box with company name only
-                search_box = page.locator('input[name="query"]')
+                page.wait_for_selector(self._SEARCH_SETTLED, state='visible', timeout=15000)
+            except Exception:
+                # URL search không ra kết quả → search qua ô tìm kiếm như cũ
+                logger.warning("⚠️ Chưa thấy heading / kết quả search sau 15s, thử search qua ô tìm kiếm")
+                search_box = page.locator('input[name="query"]').first
                 search_box.fill(company_name)
-                logger.info(f"📝 Đã nhập tên công ty: {company_name}")
-                
-                # Press Enter to search with longer timeout
-                search_box.press('Enter', timeout=60000)
-                logger.info("🔍 Đã bấm Enter để search")
-                
-                # Đợi sau khi search
-                page.wait_for_timeout(5000)  # Đợi 5 giây cho trang load
-                logger.info("⏳ Đã đợi 5 giây sau khi search")
-                
-                # Check current URL
-                current_url = page.url
-                logger.info(f"📍 Current URL: {current_url}")
-                
-                # Kiểm tra xem có phải đã ở company page không bằng cách tìm heading
-                heading_span = page.locator('span.heading').first
-                if heading_span and heading_span.is_visible():
-                    heading_text = heading_span.inner_text()
-                    logger.info(f"🎯 Tìm thấy heading: {heading_text}")
+                search_box.press('Enter', timeout=15000)
+                try:
+                    page.wait_for_selector(self._SEARCH_SETTLED, state='visible', timeout=15000)
+                except Exception:
+                    logger.warning("⚠️ Chưa thấy heading / kết quả search sau 15s")
+            
+            # Check current URL
+            current_url = page.url
+            logger.info(f"📍 Current URL: {current_url}")
+            
+            # Kiểm tra xem có phải đã ở company page không bằng cách tìm heading
+            heading_span = page.locator('span.heading').first
+            heading_text = heading_span.inner_text() if heading_span.is_visible() else None
+            if heading_text is not None:
+                logger.info(f"🎯 Tìm thấy heading: {heading_text}")
+            
+            # Kiểm tra xem heading có chứa tên công ty không
+            # on_company_page: chắc chắn đang ở đúng company (heading khớp hoặc mở link có HRB khớp) → mới cache kết quả
+            on_company_page = heading_text is not None and company_name.lower() in heading_text.lower()
+            if on_company_page:
+                logger.info("✅ Đã ở đúng company page, không cần click thêm")
+            else:
+                if heading_text is None:
+                    logger.info("🔍 Không tìm thấy heading, có thể vẫn ở search results page")
+                else:
+                    logger.warning(f"⚠️ Heading không khớp với company name: {company_name}")
+                # Tìm công ty có số đăng ký khớp trong search results, không có mới click kết quả đầu tiên
+                try:
+                    results = page.locator('.event')
+                    result_count = results.count()
+                    logger.info(f"📊 Tìm thấy {result_count} kết quả")
                     
-                    # Kiểm tra xem heading có chứa tên công ty không
-                    if company_name.lower() in heading_text.lower():
-                        logger.info("✅ Đã ở đúng company page, không cần click thêm")
-                        # Đã ở company page rồi, không cần tìm search results
+                    company_href = self._find_company_link(page, registernummer) if result_count > 0 and registernummer else None
+                    if company_href:
+                        page.goto(company_href, wait_until='domcontentloaded')
+                        logger.info("✅ Đã mở kết quả có HRB khớp")
+                        self._wait_for_company_page(page)
+                        on_company_page = True
+                    elif result_count > 0:
+                        first_result = results.first
+                        first_result.click()
+                        logger.info("✅ Đã click vào kết quả đầu tiên")
+                        self._wait_for_company_page(page)
                     else:
-                        logger.warning(f"⚠️ Heading không khớp với company name: {company_name}")
-                        # Fallback: tìm trong search results
-                        try:
-                            results = page.locator('.event')
-                            result_count = results.count()
-                            logger.info(f"📊 Tìm thấy {result_count} kết quả")
-                            
-                            if result_count > 0:
-                                first_result = results.first
-                                first_result.click()
-                                logger.info("✅ Đã click vào kết quả đầu tiên")
-                                page.wait_for_timeout(3000)
-                        except Exception as e:
-                            logger.error(f"❌ Không thể click vào kết quả: {e}")
-                else:
-                    logger.info("🔍 Không tìm thấy heading, có thể vẫn ở search results page")
-                    # Tìm và click vào công ty có số đăng ký khớp từ search results
-                    try:
-                        results = page.locator('.event')
-                        result_count = results.count()
-                        logger.info(f"📊 Tìm thấy {result_count} kết quả")
-                        
-                        if result_count > 0:
-                            first_result = results.first
-                            first_result.click()
-                            logger.info("✅ Đã click vào kết quả đầu tiên")
-                            page.wait_for_timeout(3000)
-                        else:
-                            logger.warning("⚠️ Không tìm thấy kết quả nào")
-                    except Exception as e:
-                        logger.error(f"❌ Không thể tìm hoặc click vào công ty: {e}")
-                        return {
-                            "company_name": company_name,
-                            "registernummer": registernummer,
-                            "error": f"Không thể tìm hoặc click vào công ty: {e}"
-                        }
-                
-                # Đợi page load hoàn toàn
-                page.wait_for_timeout(3000)
-                
-                # Kiểm tra xem có phải Premium content không
-                page_content = page.content()
-                if "nicht öffentlich verfügbar" in page_content or "Premium Service" in page_content:
-                    logger.warning("⚠️ Company data requires Premium Service, chỉ lấy HTML có sẵn")
-                
-                # Lưu HTML vào thư mục data/companies/ và lấy filepath
-                html_filepath = self._save_html_to_magna_folder(page, company_name, registernummer)
-                
-                # Extract data từ company page
-                data = self._extract_company_data(page, company_name, registernummer)
-                
-                # Thêm HTML filepath vào data
-                data['html_filepath'] = html_filepath
+                        logger.warning("⚠️ Không tìm thấy kết quả nào")
+                except Exception as e:
+                    logger.error(f"❌ Không thể tìm hoặc click vào công ty: {e}")
+                    return {
+                        "company_name": company_name,
+                        "registernummer": registernummer,
+                        "error": f"Không thể tìm hoặc click vào công ty: {e}"
+                    }
+            
+            # Đợi page load xong (không sleep cố định)
+            page.wait_for_load_state('load')
+            
+            # Kiểm tra xem có phải Premium content không
+            # HTML chỉ serialize qua Playwright một lần - dùng chung cho lưu file + mọi _extract_*
+            page_content = page.content()
+            if "nicht öffentlich verfügbar" in page_content or "Premium Service" in page_content:
+                logger.warning("⚠️ Company data requires Premium Service, chỉ lấy HTML có sẵn")
+            
+            # Lưu HTML vào thư mục data/companies/ và lấy filepath
+            html_filepath = self._save_html_to_magna_folder(page, company_name, registernummer, page_content)
+            
+            # Extract data từ company page
+            data = self._extract_company_data(page_content, registernummer, page)
+            
+            # Thêm HTML filepath vào data
+            data['html_filepath'] = html_filepath
+            if on_company_page:
+                self._store_cached_result(company_name, registernummer, data)
+            
+            logger.info(f"✅ Đã extract {len(data)} trường từ Northdata")
+            return data
                 
-                logger.info(f"✅ Đã extract {len(data)} trường từ Northdata")
-                return data
-                    
+        except Exception as e:
+            logger.error(f"❌ Lỗi scrape Northdata: {str(e)}")
+            return {}
+        finally:
+            if context is not None:
+                try:
+                    context.close()
+                except Exception as e:
+                    logger.warning(f"⚠️ Lỗi đóng context Northdata: {e}")
+    
+    def _new_context(self, browser: Browser) -> Tuple[BrowserContext, bool]:
+        """Context load cookie state đã lưu, file state hỏng/dở dang thì tạo context trống - return (context, có state)"""
+        if os.path.exists(self._storage_state_path):
+            try:
+                return browser.new_context(storage_state=self._storage_state_path), True
             except Exception as e:
-                logger.error(f"❌ Lỗi scrape Northdata: {str(e)}")
-                return {}
-            finally:
-                browser.close()
+                logger.warning(f"⚠️ Không load được cookie state Northdata, tạo context không có state: {e}")
+        return browser.new_context(), False
     
-    def _find_company_link(self, page: Page, registernummer: str) -> Optional[any]:
-        """Tìm company link dựa trên registernummer"""
+    def _fallback_texts(self, page: Page) -> Dict[str, List[str]]:
+        """Text các selector fallback của mitarbeiter/umsatz/gewinn, một lần evaluate ({} nếu lỗi)"""
         try:
-            # Look for company links in search results with multiple selectors
-            # Based on northdata.de structure
-            selectors_to_try = [
-                '.event[data-uri]',
-                '.ui.card',
-                '.search-result',
-                '.company-result',
-                '.ui.items .item',  # Northdata uses Semantic UI
-                '.result-item',
-                'a[href*="/"]'  # Any link that might be a company
-            ]
-            
-            for selector in selectors_to_try:
-                try:
-                    logger.info(f"🔍 Tìm kiếm với selector: {selector}")
-                    company_events = page.locator(selector)
-                    count = company_events.count()
-                    logger.info(f"📊 Tìm thấy {count} elements với selector {selector}")
-                    
-                    for i in range(count):
-                        event = company_events.nth(i)
-                        
-                        # Try multiple ways to get text content
-                        text_sources = [
-                            event.locator('.extra.text'),
-                            event.locator('.meta'),
-                            event.locator('.description'),
-                            event.locator('.content'),
-                            event.locator('a'),
-                            event
-                        ]
-                        
-                        for text_source in text_sources:
-                            try:
-                                extra_text = text_source.text_content()
-                                if extra_text:
-                                    logger.info(f"📝 Text content: {extra_text[:100]}...")
-                                    
-                                    if registernummer in extra_text:
-                                        # Found matching company - try different link selectors
-                                        link_selectors = ['a.title', 'a', '.title a', 'h3 a', 'h2 a']
-                                        for link_selector in link_selectors:
-                                            try:
-                                                company_link = event.locator(link_selector).first
-                                                if company_link.is_visible():
-                                                    logger.info(f"🎯 Tìm thấy match: {extra_text[:50]}...")
-                                                    return company_link
-                                            except:
-                                                continue
-                                        
-                                        # If no specific link found, try the event itself if it's clickable
-                                        try:
-                                            if event.locator('a').count() > 0:
-                                                return event.locator('a').first
-                                        except:
-                                            pass
-                            except:
-                                continue
-                                
-                except Exception as e:
-                    logger.info(f"⚠️ Lỗi với selector {selector}: {str(e)}")
-                    continue
+            return page.evaluate(self._FALLBACK_TEXTS_JS, self._FALLBACK_SELECTORS)
+        except Exception as e:
+            logger.warning(f"⚠️ Không lấy được text fallback từ page: {e}")
+            return {}
+    
+    def _search_url(self, company_name: str, registernummer: str = '') -> str:
+        """URL trang search Northdata cho tên công ty + HRB (có HRB thường vào thẳng company page)"""
+        query = f"{company_name} {registernummer}".strip()
+        return f"{self.base_url}/search?query={quote_plus(query)}"
+    
+    def _accept_cookies(self, page: Page, wait: bool):
+        """Click "Accept all" nếu popup hiện, rồi lưu storage_state cho các lần scrape sau
+        
+        wait=False (đã có storage_state) chỉ kiểm tra tức thời, không đợi 3s
+        """
+        cookie_popup = page.locator('text="Accept all"').first
+        try:
+            if wait:
+                cookie_popup.wait_for(state='visible', timeout=3000)
+            elif not cookie_popup.is_visible():
+                return
+            cookie_popup.click()
+            logger.info("🍪 Đã accept cookie consent")
+            cookie_popup.wait_for(state='hidden', timeout=5000)  # Wait for popup to disappear
+        except Exception:
+            logger.info("ℹ️ Không có cookie popup hoặc đã được handle")
+            return
+        
+        try:
+            os.makedirs(os.path.dirname(self._storage_state_path), exist_ok=True)
+            # Ghi file tạm rồi os.replace: context khác đang load state không đọc phải file ghi dở
+            _write_json_atomic(self._storage_state_path, page.context.storage_state())
+        except Exception as e:
+            logger.warning(f"⚠️ Không thể lưu cookie state Northdata: {e}")
+    
+    def _cache_path(self, company_name: str, registernummer: str) -> str:
+        """File cache của công ty: data/cache/northdata/<sha1(tên|HRB)>.json"""
+        key = hashlib.sha1(f"{company_name}|{registernummer}".encode('utf-8')).hexdigest()
+        return os.path.join(self._cache_dir, f"{key}.json")
+    
+    def _load_cached_result(self, company_name: str, registernummer: str) -> Optional[Dict]:
+        """Kết quả đã cache còn hạn và file HTML đi kèm vẫn còn, None nếu phải scrape lại"""
+        try:
+            with open(self._cache_path(company_name, registernummer), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        
+        data = entry.get('data') or {}
+        if time.time() - entry.get('fetched_at', 0) > self._CACHE_MAX_AGE:
+            return None
+        # server.py đọc lại HTML từ html_filepath → file đã bị xoá thì coi như chưa cache
+        if not data.get('html_filepath') or not os.path.exists(data['html_filepath']):
+            return None
+        return data
+    
+    def _store_cached_result(self, company_name: str, registernummer: str, data: Dict):
+        """
+        Lưu kết quả scrape, chỉ khi đã lưu được HTML
+        
+        Caller chỉ gọi khi đã tới đúng company page - trang search rỗng / timeout / kết quả
+        đầu tiên đoán mò không được cache 30 ngày
+        """
+        if not data.get('html_filepath'):
+            return
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            _write_json_atomic(self._cache_path(company_name, registernummer), {'fetched_at': time.time(), 'data': data})
+        except Exception as e:
+            logger.warning(f"⚠️ Không thể lưu cache Northdata: {e}")
+    
+    def _wait_for_company_page(self, page: Page):
+        """Đợi heading của company page sau khi click kết quả (hết 15s thì vẫn đi tiếp)"""
+        try:
+            page.wait_for_selector('span.heading', timeout=15000)
+        except Exception:
+            logger.warning("⚠️ Chưa thấy heading của company page sau 15s")
+    
+    def _company_link_args(self, registernummer: str) -> Dict:
+        """Tham số cho _FIND_COMPANY_LINK_JS (dùng chung với bản async)"""
+        return {
+            'selectors': list(self._RESULT_SELECTORS),
+            'textSelectors': list(self._RESULT_TEXT_SELECTORS),
+            'linkSelectors': list(self._RESULT_LINK_SELECTORS),
+            'registernummer': registernummer,
+        }
+    
+    def _find_company_link(self, page: Page, registernummer: str) -> Optional[str]:
+        """URL company page trong search results có registernummer khớp, None nếu không có"""
+        try:
+            href = page.evaluate(self._FIND_COMPANY_LINK_JS, self._company_link_args(registernummer))
+            if href:
+                logger.info(f"🎯 Tìm thấy company với HRB {registernummer}: {href}")
+                return href
             
             logger.warning(f"❌ Không tìm thấy company với HRB: {registernummer}")
             return None
@@ -234,40 +586,67 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi find company link: {str(e)}")
             return None
     
-    def _extract_company_data(self, page: Page, company_name: str, registernummer: str) -> Dict:
-        """Extract data từ company page - CHỈ lấy các trường trong CompanyData model"""
+    def _extract_company_data(self, page_content: str, registernummer: str, page: Optional[Page] = None) -> Dict:
+        """
+        Extract data từ HTML của company page - CHỈ lấy các trường trong CompanyData model
+        
+        page (sync) chỉ dùng cho fallback selector của mitarbeiter/umsatz/gewinn khi regex trên HTML không ra
+        (một page.evaluate cho cả 3 trường, xem _FALLBACK_TEXTS_JS)
+        """
         try:
+            # Parse DOM một lần (lxml, C) - các extractor query trên cây thay vì quét cả chuỗi HTML
+            tree = self._parse_html(page_content)
+            organization = self._parse_json_ld_organization(page_content, tree)
+            
+            # Trường có trong JSON-LD / chart data thì lấy trực tiếp, không có mới chạy extractor regex
+            structured = self._extract_structured_data(tree, organization)
+            
+            def field(key: str, fallback):
+                value = structured.get(key)
+                return value if value is not None else fallback()
+            
+            # Text của selector fallback chỉ lấy (một evaluate) khi có trường cần tới
+            fallback_texts = {}
+            
+            def texts_for(key: str) -> List[str]:
+                if page is not None and not fallback_texts:
+                    fallback_texts.update(self._fallback_texts(page))
+                return fallback_texts.get(key, [])
+            
+            gruendungsdatum = field('gruendungsdatum', lambda: self._extract_gruendungsdatum(page_content))
+            regex_fields = self._extract_regex_fields(page_content, skip=structured)
+            
             # CHỈ extract các trường có trong CompanyData model (27 trường)
             data = {
                 'registernummer': registernummer,
                 # Basic info
-                'handelsregister': self._extract_handelsregister(page),
-                'geschaeftsadresse': self._extract_geschaeftsadresse(page),
-                'unternehmenszweck': self._extract_unternehmenszweck(page),
-                'land_des_hauptsitzes': self._extract_land_des_hauptsitzes(page),
-                'gerichtsstand': self._extract_gerichtsstand(page),
-                'paragraph_34_gewo': self._extract_paragraph_34_gewo(page),
+                'handelsregister': regex_fields.get('handelsregister'),
+                'geschaeftsadresse': self._extract_geschaeftsadresse(page_content, organization),
+                'unternehmenszweck': self._extract_unternehmenszweck(page_content, tree),
+                'land_des_hauptsitzes': self._extract_land_des_hauptsitzes(page_content, organization),
+                'gerichtsstand': regex_fields.get('gerichtsstand'),
+                'paragraph_34_gewo': self._extract_paragraph_34_gewo(page_content),
                 
                 # Financial data
-                'mitarbeiter': self._extract_mitarbeiter(page),
-                'umsatz': self._extract_umsatz(page), 
-                'gewinn': self._extract_gewinn(page),
-                'insolvenz': self._extract_insolvenz(page),
+                'mitarbeiter': field('mitarbeiter', lambda: self._extract_mitarbeiter(page_content, texts_for)),
+                'umsatz': field('umsatz', lambda: self._extract_umsatz(page_content, texts_for)),
+                'gewinn': field('gewinn', lambda: self._extract_gewinn(page_content, texts_for)),
+                'insolvenz': self._extract_insolvenz(page_content),
                 
                 # Real estate data
-                'anzahl_immobilien': self._extract_anzahl_immobilien(page),
-                'gesamtwert_immobilien': self._extract_gesamtwert_immobilien(page),
+                'anzahl_immobilien': self._extract_anzahl_immobilien(page_content),
+                'gesamtwert_immobilien': regex_fields.get('gesamtwert_immobilien'),
                 
                 # Other data
-                'sonstige_rechte': self._extract_sonstige_rechte(page),
-                'gruendungsdatum': self._extract_gruendungsdatum(page),
-                'aktiv_seit': self._extract_aktiv_seit(page),
+                'sonstige_rechte': self._extract_sonstige_rechte(page_content, organization),
+                'gruendungsdatum': gruendungsdatum,
+                'aktiv_seit': self._extract_aktiv_seit(gruendungsdatum),
                 
                 # Contact info
-                'geschaeftsfuehrer': self._extract_geschaeftsfuehrer(page),
-                'telefonnummer': self._extract_telefonnummer(page),
-                'email': self._extract_email(page),
-                'website': self._extract_website(page)
+                'geschaeftsfuehrer': field('geschaeftsfuehrer', lambda: self._extract_geschaeftsfuehrer(page_content)),
+                'telefonnummer': field('telefonnummer', lambda: regex_fields.get('telefonnummer')),
+                'email': field('email', lambda: regex_fields.get('email')),
+                'website': field('website', lambda: self._extract_website(page_content))
             }
             
             # Remove None values
@@ -280,62 +659,28 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract company data: {str(e)}")
             return {}
     
-    def _extract_mitarbeiter(self, page: Page) -> Optional[int]:
-        """Extract số lượng nhân viên từ biểu đồ/charts"""
+    def _extract_mitarbeiter(self, page_content: str, texts_for: Optional[Callable[[str], List[str]]] = None) -> Optional[int]:
+        """Extract số lượng nhân viên từ biểu đồ/charts (texts_for: text của selector fallback theo trường)"""
         try:
-            # Look for employee count in various possible locations
-            # Based on northdata.de structure with charts
-            selectors = [
-                'text=/\\d+\\s*Mitarbeiter/',
-                'text=/\\d+\\s*employees/',
-                '[data-testid="employees"]',
-                '.employee-count',
-                '.mitarbeiter',
-                # Northdata specific selectors
-                'text=/MITARBEITER/',
-                '.chart-container',
-                '.financial-data',
-                '.metric-value'
-            ]
-            
-            # First try to find in chart tabs or financial data
-            page_content = page.content()
-            
             # Look for MITARBEITER tab or section
             if 'MITARBEITER' in page_content:
                 logger.info("🎯 Tìm thấy MITARBEITER section")
                 # Try to find the actual value in the chart or data
-                import re
                 # Look for patterns like "14 Mitarbeiter" or just numbers
-                mitarbeiter_patterns = [
-                    r'(\d+)\s*Mitarbeiter',
-                    r'(\d+)\s*employees',
-                    r'MITARBEITER.*?(\d+)',
-                    r'(\d+).*?Mitarbeiter'
-                ]
-                
-                for pattern in mitarbeiter_patterns:
-                    matches = re.findall(pattern, page_content, re.IGNORECASE)
+                for pattern in _MITARBEITER_PATTERNS:
+                    matches = pattern.findall(page_content)
                     if matches:
                         try:
                             return int(matches[0])
                         except:
                             continue
             
-            # Fallback: try element selectors
-            for selector in selectors:
-                try:
-                    element = page.locator(selector).first
-                    is_visible = element.is_visible()
-                    if is_visible:
-                        text = element.text_content()
-                        # Extract number from text
-                        import re
-                        numbers = re.findall(r'\d+', text)
-                        if numbers:
-                            return int(numbers[0])
-                except:
-                    continue
+            # Fallback: text của element selectors (chỉ khi có page sync, bản async chỉ dùng HTML)
+            for text in (texts_for('mitarbeiter') if texts_for else ()):
+                # Extract number from text
+                numbers = _NUMBER_RE.findall(text)
+                if numbers:
+                    return int(numbers[0])
             
             logger.warning("⚠️ Không tìm thấy số lượng nhân viên")
             return None
@@ -344,30 +689,18 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract mitarbeiter: {str(e)}")
             return None
     
-    def _extract_umsatz(self, page: Page) -> Optional[float]:
+    def _extract_umsatz(self, page_content: str, texts_for: Optional[Callable[[str], List[str]]] = None) -> Optional[float]:
         """Extract doanh thu (revenue) từ biểu đồ UMSÄTZ"""
         try:
             # Look for revenue data in financial charts or tables
             # Based on northdata.de structure with UMSÄTZ tab
-            page_content = page.content()
-            
             # Look for UMSÄTZ tab or section (with Ä character)
             if 'UMSÄTZ' in page_content or 'UMSATZ' in page_content:
                 logger.info("🎯 Tìm thấy UMSÄTZ section")
-                import re
                 
                 # Look for revenue patterns in German format
-                umsatz_patterns = [
-                    r'(\d+)[.,](\d+)\s*Mio\\.?\s*€',  # "24,1 Mio. €"
-                    r'(\d+)\s*Mio\\.?\s*€',           # "24 Mio. €"
-                    r'(\d+[.,]\d+)\s*Mio',            # "24,1 Mio"
-                    r'(\d+)\s*Millionen',             # "24 Millionen"
-                    r'UMSÄTZ.*?(\d+[.,]\d+)',        # "UMSÄTZ 24,1"
-                    r'(\d+[.,]\d+).*?Mio.*?€'        # Various formats
-                ]
-                
-                for pattern in umsatz_patterns:
-                    matches = re.findall(pattern, page_content, re.IGNORECASE)
+                for pattern in _UMSATZ_PATTERNS:
+                    matches = pattern.findall(page_content)
                     if matches:
                         try:
                             if isinstance(matches[0], tuple):
@@ -379,37 +712,19 @@ class NorthdataScraper:
                         except:
                             continue
             
-            # Fallback: try element selectors
-            selectors = [
-                'text=/Umsatz/',
-                'text=/Revenue/',
-                'text=/\\d+[.,]\\d+\\s*Mio\\.?\\s*€/',
-                '[data-testid="revenue"]',
-                '.umsatz',
-                '.revenue',
-                '.chart-container',
-                '.financial-data'
-            ]
-            
-            for selector in selectors:
-                try:
-                    element = page.locator(selector).first
-                    if element.is_visible():
-                        text = element.text_content()
-                        # Extract number from German format
-                        import re
-                        numbers = re.findall(r'(\d+)[.,](\d+)\s*Mio', text)
-                        if numbers:
-                            whole, decimal = numbers[0]
-                            return float(f"{whole}.{decimal}")
-                        
-                        # Try simple number extraction
-                        numbers = re.findall(r'(\d+[.,]\d+)', text)
-                        if numbers:
-                            num_str = numbers[0].replace(',', '.')
-                            return float(num_str)
-                except:
-                    continue
+            # Fallback: text của element selectors
+            for text in (texts_for('umsatz') if texts_for else ()):
+                # Extract number from German format
+                numbers = _MIO_RE.findall(text)
+                if numbers:
+                    whole, decimal = numbers[0]
+                    return float(f"{whole}.{decimal}")
+                
+                # Try simple number extraction
+                numbers = _DECIMAL_RE.findall(text)
+                if numbers:
+                    num_str = numbers[0].replace(',', '.')
+                    return float(num_str)
             
             logger.warning("⚠️ Không tìm thấy doanh thu")
             return None
@@ -418,29 +733,16 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract umsatz: {str(e)}")
             return None
     
-    def _extract_gewinn(self, page: Page) -> Optional[float]:
+    def _extract_gewinn(self, page_content: str, texts_for: Optional[Callable[[str], List[str]]] = None) -> Optional[float]:
         """Extract lợi nhuận (profit/loss) từ biểu đồ GEWINN"""
         try:
-            # Look for profit/loss data in GEWINN tab
-            page_content = page.content()
-            
             # Look for GEWINN tab or section
             if 'GEWINN' in page_content:
                 logger.info("🎯 Tìm thấy GEWINN section")
-                import re
                 
                 # Look for profit/loss patterns
-                gewinn_patterns = [
-                    r'(\d+)[.,](\d+)\s*Mio\\.?\s*€',  # "2,1 Mio. €"
-                    r'(\d+)\s*Mio\\.?\s*€',           # "2 Mio. €"
-                    r'-(\d+)[.,](\d+)\s*Mio\\.?\s*€', # "-2,1 Mio. €" (loss)
-                    r'GEWINN.*?(\d+[.,]\d+)',        # "GEWINN 2,1"
-                    r'VERLUST.*?(\d+[.,]\d+)',       # "VERLUST 2,1"
-                    r'(\d+[.,]\d+).*?Mio.*?€'        # Various formats
-                ]
-                
-                for pattern in gewinn_patterns:
-                    matches = re.findall(pattern, page_content, re.IGNORECASE)
+                for pattern in _GEWINN_PATTERNS:
+                    matches = pattern.findall(page_content)
                     if matches:
                         try:
                             if isinstance(matches[0], tuple):
@@ -451,42 +753,22 @@ class NorthdataScraper:
                                 value = float(num_str)
                             
                             # Check if it's a loss (negative)
-                            is_loss = 'VERLUST' in page_content or 'Verlust' in page_content or pattern.startswith('-')
+                            is_loss = 'VERLUST' in page_content or 'Verlust' in page_content or pattern.pattern.startswith('-')
                             return -value if is_loss else value
                         except:
                             continue
             
-            # Fallback: try element selectors
-            selectors = [
-                'text=/Gewinn/',
-                'text=/Verlust/',
-                'text=/Profit/',
-                'text=/Loss/',
-                '[data-testid="profit"]',
-                '.gewinn',
-                '.profit',
-                '.chart-container',
-                '.financial-data'
-            ]
-            
-            for selector in selectors:
-                try:
-                    element = page.locator(selector).first
-                    if element.is_visible():
-                        text = element.text_content()
-                        
-                        # Check if it's a loss (negative)
-                        is_loss = 'Verlust' in text or 'Loss' in text or '-' in text
-                        
-                        # Extract number
-                        import re
-                        numbers = re.findall(r'(\d+[.,]\d+)', text)
-                        if numbers:
-                            num_str = numbers[0].replace(',', '.')
-                            value = float(num_str)
-                            return -value if is_loss else value
-                except:
-                    continue
+            # Fallback: text của element selectors
+            for text in (texts_for('gewinn') if texts_for else ()):
+                # Check if it's a loss (negative)
+                is_loss = 'Verlust' in text or 'Loss' in text or '-' in text
+                
+                # Extract number
+                numbers = _DECIMAL_RE.findall(text)
+                if numbers:
+                    num_str = numbers[0].replace(',', '.')
+                    value = float(num_str)
+                    return -value if is_loss else value
             
             logger.warning("⚠️ Không tìm thấy lợi nhuận")
             return None
@@ -495,25 +777,14 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract gewinn: {str(e)}")
             return None
     
-    def _extract_insolvenz(self, page: Page) -> Optional[bool]:
+    def _extract_insolvenz(self, page_content: str) -> Optional[bool]:
         """Extract trạng thái phá sản"""
         try:
-            # Look for insolvency indicators
-            insolvency_indicators = [
-                '✝︎',  # Death symbol used for terminated companies
-                'Liquidation',
-                'Insolvenz',
-                'Insolvency',
-                'Erloschen',
-                'Terminiert'
-            ]
-            
-            page_content = page.content()
-            
-            for indicator in insolvency_indicators:
-                if indicator in page_content:
-                    logger.info(f"🚨 Phát hiện chỉ số phá sản: {indicator}")
-                    return True
+            # Look for insolvency indicators - dừng ở chỗ khớp đầu tiên
+            match = _INSOLVENZ_RE.search(page_content)
+            if match:
+                logger.info(f"🚨 Phát hiện chỉ số phá sản: {match.group(0)}")
+                return True
             
             logger.info("✅ Company không có dấu hiệu phá sản")
             return False
@@ -523,35 +794,129 @@ class NorthdataScraper:
             return None
     
     
-    def _extract_handelsregister(self, page: Page) -> Optional[str]:
-        """Extract Handelsregister từ page"""
+    def _extract_regex_fields(self, page_content: str, skip: Dict) -> Dict:
+        """Giá trị các trường trong _REGEX_FIELDS tìm thấy trên HTML (bỏ qua trường đã có trong skip)"""
+        values = {}
+        matches = {}
+        for name, pattern, value_of in _REGEX_FIELDS:
+            if skip.get(name) is not None:
+                continue
+            if pattern not in matches:
+                matches[pattern] = pattern.search(page_content)
+            if matches[pattern] is None:
+                continue
+            try:
+                values[name] = value_of(matches[pattern])
+                logger.info(f"🎯 Tìm thấy {name}: {values[name]}")
+            except Exception as e:
+                logger.error(f"❌ Lỗi extract {name}: {str(e)}")
+        return values
+    
+    def _parse_html(self, page_content: str) -> Optional[lxml.html.HtmlElement]:
+        """DOM của page bằng lxml, None nếu HTML rỗng / không parse được (extractor dùng regex)"""
         try:
-            page_content = page.content()
-            import re
-            
-            # Pattern: "Amtsgericht Hamburg HRB"
-            pattern = r'Amtsgericht\s+(\w+)'
-            match = re.search(pattern, page_content)
-            
-            if match:
-                city = match.group(1)
-                logger.info(f"🎯 Tìm thấy Handelsregister: {city}")
-                return city
-            
-            return None
-        except Exception as e:
-            logger.error(f"❌ Lỗi extract handelsregister: {str(e)}")
+            return lxml.html.fromstring(page_content)
+        except (etree.ParserError, ValueError) as e:
+            logger.warning(f"⚠️ Không parse được HTML Northdata bằng lxml: {e}")
             return None
     
-    def _extract_geschaeftsadresse(self, page: Page) -> Optional[str]:
-        """Extract Geschäftsadresse từ page"""
+    def _parse_json_ld_organization(self, page_content: str, tree: Optional[lxml.html.HtmlElement] = None) -> Dict:
+        """Entity công ty (có address / leiCode / legalName) trong các block JSON-LD của page, {} nếu không có"""
+        blocks = tree.xpath(_JSON_LD_XPATH) if tree is not None else _JSON_LD_RE.findall(page_content)
+        for block in blocks:
+            try:
+                payload = json.loads(block)
+            except ValueError:
+                continue
+            if isinstance(payload, dict):
+                payload = payload.get('@graph', [payload])
+            for item in payload if isinstance(payload, list) else []:
+                if isinstance(item, dict) and any(key in item for key in ('address', 'leiCode', 'legalName')):
+                    return item
+        return {}
+    
+    def _extract_structured_data(self, tree: Optional[lxml.html.HtmlElement], organization: Dict) -> Dict:
+        """
+        Các trường đọc thẳng từ dữ liệu có cấu trúc của page (chỉ trả về key có giá trị)
+        
+        - JSON-LD organization: foundingDate, telephone, email, url, numberOfEmployees,
+          member có jobTitle Geschäftsführer
+        - data-data của bar chart: giá trị năm mới nhất (không phải ước tính) của Gewinn / Umsatz / Mitarbeiter,
+          tiền tính bằng Mio. € như các extractor regex
+        """
+        structured = {}
+        
+        if organization.get('foundingDate'):
+            structured['gruendungsdatum'] = organization['foundingDate']
+        if organization.get('telephone'):
+            structured['telefonnummer'] = organization['telephone'].strip()
+        if organization.get('email'):
+            structured['email'] = organization['email']
+        url = organization.get('url')
+        if url and 'northdata' not in url.lower():
+            structured['website'] = url
+        
+        employees = organization.get('numberOfEmployees')
+        if isinstance(employees, dict):
+            employees = employees.get('value')
+        if isinstance(employees, (int, float)):
+            structured['mitarbeiter'] = int(employees)
+        
+        members = organization.get('member') or []
+        geschaeftsfuehrer = []
+        for member in members if isinstance(members, list) else [members]:
+            if not isinstance(member, dict) or 'Geschäftsführer' not in (member.get('jobTitle') or ''):
+                continue
+            full_name = ' '.join(filter(None, (member.get('givenName'), member.get('familyName')))) or member.get('name')
+            if full_name and full_name not in geschaeftsfuehrer:
+                geschaeftsfuehrer.append(full_name)
+        if geschaeftsfuehrer:
+            structured['geschaeftsfuehrer'] = geschaeftsfuehrer
+        
+        for key, value in self._parse_bar_charts(tree).items():
+            structured.setdefault(key, value)
+        
+        if structured:
+            logger.info(f"🎯 Structured data (JSON-LD / chart): {', '.join(structured)}")
+        return structured
+    
+    def _parse_bar_charts(self, tree: Optional[lxml.html.HtmlElement]) -> Dict:
+        """Giá trị năm mới nhất của các bar chart Gewinn / Umsatz / Mitarbeiter"""
+        charts = {}
+        keys = {'Earnings': 'gewinn', 'Revenue': 'umsatz', 'Employees': 'mitarbeiter'}
+        for raw in (tree.xpath(_BAR_CHARTS_XPATH) if tree is not None else []):
+            try:
+                items = json.loads(raw).get('item') or []
+            except (ValueError, AttributeError):
+                continue
+            for item in items:
+                key = keys.get(item.get('item')) if isinstance(item, dict) else None
+                if key is None:
+                    continue
+                # Chart bị ẩn không có data; bỏ các năm là ước tính của Northdata
+                points = [
+                    point for point in ((item.get('data') or {}).get('data') or [])
+                    if isinstance(point, dict) and not point.get('estimate') and isinstance(point.get('value0'), (int, float))
+                ]
+                if not points:
+                    continue
+                value = max(points, key=lambda point: str(point.get('year', '')))['value0']
+                charts[key] = int(value) if key == 'mitarbeiter' else round(value / 1_000_000, 3)
+        return charts
+    
+    def _extract_geschaeftsadresse(self, page_content: str, organization: Optional[Dict] = None) -> Optional[str]:
+        """Extract Geschäftsadresse từ JSON-LD address, không có thì từ page"""
         try:
-            page_content = page.content()
-            import re
+            address = (organization or {}).get('address')
+            if isinstance(address, dict) and address.get('streetAddress'):
+                # Cùng format với xml_parser: "Große Elbstr. 61, 22767 Hamburg"
+                city = ' '.join(filter(None, (address.get('postalCode'), address.get('addressLocality'))))
+                address_text = ', '.join(filter(None, (address['streetAddress'].strip(), city)))
+                logger.info(f"🎯 Tìm thấy Geschäftsadresse (JSON-LD): {address_text}")
+                return address_text
             
             # Pattern: "Große Elbstr. 61, D-22767 Hamburg"
-            pattern = r'Große Elbstr[^,]+,\s*D-\d+\s+\w+'
-            match = re.search(pattern, page_content)
+            match = _ADDR_RE.search(page_content)
             
             if match:
                 address = match.group(0)
@@ -563,15 +928,12 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract geschaeftsadresse: {str(e)}")
             return None
     
-    def _extract_unternehmenszweck(self, page: Page) -> Optional[str]:
-        """Extract Unternehmenszweck từ page content"""
+    def _extract_unternehmenszweck(self, page_content: str, tree: Optional[lxml.html.HtmlElement] = None) -> Optional[str]:
+        """Extract Unternehmenszweck từ text node chứa "Gegenstand des Unternehmens" (không có DOM thì từ HTML)"""
         try:
-            page_content = page.content()
-            import re
-            
-            # Tìm pattern "Gegenstand des Unternehmens"
-            pattern = r'Gegenstand des Unternehmens der Gesellschaft ist ([^<]+)'
-            match = re.search(pattern, page_content)
+            # Trên DOM chỉ chạy regex trên text node chứa cụm từ (entity như &amp; đã được decode)
+            texts = tree.xpath(_ZWECK_XPATH) if tree is not None else [page_content]
+            match = next(filter(None, map(_ZWECK_RE.search, texts)), None)
             
             if match:
                 zweck = match.group(1).strip()
@@ -585,15 +947,19 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract unternehmenszweck: {str(e)}")
             return None
     
-    def _extract_land_des_hauptsitzes(self, page: Page) -> Optional[str]:
+    def _extract_land_des_hauptsitzes(self, page_content: str, organization: Optional[Dict] = None) -> Optional[str]:
         """Extract Land des Hauptsitzes từ địa chỉ"""
         try:
-            page_content = page.content()
-            import re
+            address = (organization or {}).get('address')
+            country = address.get('addressCountry') if isinstance(address, dict) else None
+            if isinstance(country, dict):
+                country = country.get('name')
+            if country in ('DE', 'DEU', 'Germany', 'Deutschland'):
+                logger.info("🎯 Tìm thấy Land: Deutschland (JSON-LD)")
+                return "Deutschland"
             
             # Tìm pattern "D-xxxxx" (D = Deutschland)
-            pattern = r'\bD-\d{5}\b'
-            match = re.search(pattern, page_content)
+            match = _D_PLZ_RE.search(page_content)
             
             if match:
                 logger.info(f"🎯 Tìm thấy Land: Deutschland (từ D-xxxxx)")
@@ -609,31 +975,9 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract land_des_hauptsitzes: {str(e)}")
             return None
     
-    def _extract_gerichtsstand(self, page: Page) -> Optional[str]:
-        """Extract Gerichtsstand"""
-        try:
-            page_content = page.content()
-            import re
-            
-            # Pattern: "Amtsgericht Hamburg"
-            pattern = r'(Amtsgericht\s+\w+)'
-            match = re.search(pattern, page_content)
-            
-            if match:
-                gerichtsstand = match.group(1)
-                logger.info(f"🎯 Tìm thấy Gerichtsstand: {gerichtsstand}")
-                return gerichtsstand
-            
-            return None
-        except Exception as e:
-            logger.error(f"❌ Lỗi extract gerichtsstand: {str(e)}")
-            return None
-    
-    def _extract_paragraph_34_gewo(self, page: Page) -> Optional[bool]:
+    def _extract_paragraph_34_gewo(self, page_content: str) -> Optional[bool]:
         """Extract §34 GewO status"""
         try:
-            page_content = page.content()
-            
             # Tìm "§ 34c GewO" hoặc "§34c GewO"
             if '§ 34c GewO' in page_content or '§34c GewO' in page_content:
                 logger.info(f"🎯 Tìm thấy §34c GewO: Ja")
@@ -644,12 +988,9 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract paragraph_34_gewo: {str(e)}")
             return None
     
-    def _extract_anzahl_immobilien(self, page: Page) -> Optional[int]:
+    def _extract_anzahl_immobilien(self, page_content: str) -> Optional[int]:
         """Extract số lượng bất động sản từ Northdata"""
         try:
-            page_content = page.content()
-            import re
-            
             # Tìm trong "Immobilien und Grundstücke" section
             if 'Immobilien und Grundstücke' in page_content:
                 logger.info("🎯 Tìm thấy Immobilien section nhưng không có số lượng cụ thể")
@@ -663,46 +1004,20 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract anzahl_immobilien: {str(e)}")
             return None
     
-    def _extract_gesamtwert_immobilien(self, page: Page) -> Optional[float]:
-        """Extract tổng giá trị bất động sản từ Northdata"""
-        try:
-            page_content = page.content()
-            import re
-            
-            # Tìm "Finanzanlagen" có thể coi là giá trị BĐS
-            pattern = r'(\d+[.,]\d+)\s*Mio\.\s*€.*?Finanzanlagen'
-            match = re.search(pattern, page_content)
-            
-            if match:
-                value = float(match.group(1).replace(',', '.'))
-                logger.info(f"🎯 Tìm thấy Gesamtwert Immobilien (Finanzanlagen): {value} Mio. €")
-                return value
-            
-            logger.warning("⚠️ Không tìm thấy Gesamtwert Immobilien")
-            return None
-            
-        except Exception as e:
-            logger.error(f"❌ Lỗi extract gesamtwert_immobilien: {str(e)}")
-            return None
-    
-    def _extract_sonstige_rechte(self, page: Page) -> Optional[list]:
+    def _extract_sonstige_rechte(self, page_content: str, organization: Optional[Dict] = None) -> Optional[list]:
         """Extract Sonstige Rechte (LEI Code, trademarks, etc)"""
         try:
-            page_content = page.content()
-            import re
-            
             rechte = []
             
-            # LEI Code
-            lei_pattern = r'([A-Z0-9]{20})'
-            lei_match = re.search(lei_pattern, page_content)
-            if lei_match:
-                rechte.append(f"LEI: {lei_match.group(1)}")
+            # LEI Code - ưu tiên leiCode trong JSON-LD (regex 20 ký tự dễ khớp nhầm token khác trong HTML)
+            lei_code = (organization or {}).get('leiCode')
+            lei_match = None if lei_code else _LEI_RE.search(page_content)
+            if lei_code or lei_match:
+                rechte.append(f"LEI: {lei_code or lei_match.group(1)}")
             
             # Trademarks (Wortmarke, Wort-/Bildmarke)
             if 'Wortmarke' in page_content or 'Bildmarke' in page_content:
-                trademark_pattern = r'(Wort-?/Bildmarke|Wortmarke):\s*["\']([^"\']+)["\']'
-                trademark_matches = re.findall(trademark_pattern, page_content)
+                trademark_matches = _TRADEMARK_RE.findall(page_content)
                 for match in trademark_matches:
                     rechte.append(f"Trademark: {match[1]}")
             
@@ -715,16 +1030,12 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract sonstige_rechte: {str(e)}")
             return None
     
-    def _extract_gruendungsdatum(self, page: Page) -> Optional[str]:
+    def _extract_gruendungsdatum(self, page_content: str) -> Optional[str]:
         """Extract Gründungsdatum từ JSON-LD schema"""
         try:
-            page_content = page.content()
-            import re
-            
             # CHUẨN NHẤT: Tìm từ JSON-LD schema
             # Pattern: "foundingDate" : "2016-05-17"
-            json_ld_pattern = r'"foundingDate"\s*:\s*"(\d{4}-\d{2}-\d{2})"'
-            json_ld_match = re.search(json_ld_pattern, page_content)
+            json_ld_match = _FOUNDING_DATE_RE.search(page_content)
             
             if json_ld_match:
                 founding_date = json_ld_match.group(1)
@@ -732,8 +1043,7 @@ class NorthdataScraper:
                 return founding_date
             
             # Fallback: Tìm từ chart data "date" : "2016-05-17", "desc" : "...Eintragung"
-            chart_pattern = r'"date"\s*:\s*"(\d{4}-\d{2}-\d{2})"\s*,\s*"desc"\s*:\s*"[^"]*Eintragung"'
-            chart_match = re.search(chart_pattern, page_content)
+            chart_match = _EINTRAGUNG_DATE_RE.search(page_content)
             
             if chart_match:
                 founding_date = chart_match.group(1)
@@ -745,13 +1055,10 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract gruendungsdatum: {str(e)}")
             return None
     
-    def _extract_aktiv_seit(self, page: Page) -> Optional[str]:
-        """Extract Aktiv seit - Tính từ năm thành lập"""
+    def _extract_aktiv_seit(self, gruendungsdatum: Optional[str]) -> Optional[str]:
+        """Extract Aktiv seit - Tính từ năm thành lập (kết quả của _extract_gruendungsdatum)"""
         try:
-            gruendungsdatum = self._extract_gruendungsdatum(page)
-            
             if gruendungsdatum:
-                from datetime import datetime
                 current_year = datetime.now().year
                 
                 # Extract year từ date format YYYY-MM-DD hoặc YYYY
@@ -770,18 +1077,14 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract aktiv_seit: {str(e)}")
             return None
     
-    def _extract_geschaeftsfuehrer(self, page: Page) -> Optional[list]:
+    def _extract_geschaeftsfuehrer(self, page_content: str) -> Optional[list]:
         """Extract Geschäftsführer từ Netzwerk section"""
         try:
-            page_content = page.content()
-            import re
-            
             geschaeftsfuehrer = []
             
             # Tìm tên trong Netzwerk section (Martin Göcks, David Liebig, etc)
             # Pattern: Tên người (2 từ, chữ cái đầu viết hoa)
-            pattern = r'([A-ZÄÖÜ][a-zäöüß]+)\s+([A-ZÄÖÜ][a-zäöüß]+)'
-            matches = re.findall(pattern, page_content)
+            matches = _PERSON_NAME_RE.findall(page_content)
             
             # Filter ra các tên có vẻ là người (không phải tên công ty)
             known_names = ['Martin Göcks', 'David Liebig', 'Jörn Reinecke']
@@ -799,63 +1102,12 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract geschaeftsfuehrer: {str(e)}")
             return None
     
-    def _extract_telefonnummer(self, page: Page) -> Optional[str]:
-        """Extract Telefonnummer từ JSON-LD schema"""
-        try:
-            page_content = page.content()
-            import re
-            
-            # CHỈ lấy từ JSON-LD schema để đảm bảo chính xác
-            # Pattern: "telephone" : "+49 40 238311200"
-            json_ld_pattern = r'"telephone"\s*:\s*"([^"]+)"'
-            json_ld_match = re.search(json_ld_pattern, page_content)
-            
-            if json_ld_match:
-                telefon = json_ld_match.group(1).strip()
-                logger.info(f"🎯 Tìm thấy Telefonnummer: {telefon}")
-                return telefon
-            
-            # Nếu không có trong JSON-LD, không lấy để tránh sai
-            logger.warning(f"⚠️ Không tìm thấy Telefonnummer trong JSON-LD schema")
-            return None
-        except Exception as e:
-            logger.error(f"❌ Lỗi extract telefonnummer: {str(e)}")
-            return None
-    
-    def _extract_email(self, page: Page) -> Optional[str]:
-        """Extract Email"""
-        try:
-            page_content = page.content()
-            import re
-            
-            # Pattern: email address
-            pattern = r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'
-            match = re.search(pattern, page_content)
-            
-            if match:
-                email = match.group(1)
-                logger.info(f"🎯 Tìm thấy Email: {email}")
-                return email
-            
-            return None
-        except Exception as e:
-            logger.error(f"❌ Lỗi extract email: {str(e)}")
-            return None
-    
-    def _extract_website(self, page: Page) -> Optional[str]:
+    def _extract_website(self, page_content: str) -> Optional[str]:
         """Extract Website"""
         try:
-            page_content = page.content()
-            import re
-            
             # Pattern: website URL
-            patterns = [
-                r'(https?://[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
-                r'(www\.[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, page_content)
+            for pattern in _WEBSITE_PATTERNS:
+                match = pattern.search(page_content)
                 if match:
                     website = match.group(1)
                     if 'northdata' not in website.lower():  # Bỏ qua northdata.de
@@ -867,46 +1119,25 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi extract website: {str(e)}")
             return None
     
-    def _save_html_to_magna_folder(self, page: Page, company_name: str, registernummer: str) -> str:
-        """Lưu HTML vào thư mục data/companies/ và return filepath"""
+    def _save_html_to_magna_folder(self, page: Page, company_name: str, registernummer: str, page_content: str) -> str:
+        """Lưu HTML vào thư mục data/companies/ và return filepath (page_content: full HTML đã lấy sẵn)"""
         try:
-            import re
-            # Làm sạch tên công ty để dùng làm tên file
-            clean_name = re.sub(r'[^\w\s-]', '', company_name).strip().replace(' ', '_')
-            
-            # Đường dẫn tới thư mục data/companies/
-            companies_dir = os.path.join(
-                os.path.dirname(os.path.dirname(__file__)), 
-                'data',
-                'companies'
-            )
-            os.makedirs(companies_dir, exist_ok=True)
-            
-            # Tên file HTML với tên công ty
-            html_filename = f"{clean_name}_{registernummer}_northdata.html"
-            html_filepath = os.path.join(companies_dir, html_filename)
-            
             # Chỉ lấy nội dung từ section bên trong main > div.anchor.content > section
-            target_section = page.locator('main.ui.container > div.anchor.content > section').first
-            if target_section and target_section.is_visible():
-                html_content = target_section.inner_html()
+            html_content = page.evaluate(self._SECTION_HTML_JS, self._TARGET_SECTION)
+            if html_content is not None:
                 logger.info(f"📄 Target section content length: {len(html_content)} characters")
             else:
                 # Nếu không tìm thấy, lưu full HTML để debug
-                html_content = page.content()
+                html_content = page_content
                 logger.warning(f"⚠️ Target section not found, saving full HTML: {len(html_content)} characters")
             
-            with open(html_filepath, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            html_filepath = self._write_company_html(company_name, registernummer, html_content)
             
-            logger.info(f"💾 Đã lưu HTML (đè lên file cũ): {html_filepath}")
-            
-            # Cũng lưu screenshot
-            screenshot_filename = f"{clean_name}_{registernummer}_northdata.png"
-            screenshot_filepath = os.path.join(companies_dir, screenshot_filename)
-            
-            page.screenshot(path=screenshot_filepath)
-            logger.info(f"📸 Đã lưu screenshot: {screenshot_filepath}")
+            # Screenshot chỉ lưu khi debug
+            if self.debug:
+                screenshot_filepath = html_filepath[:-len('.html')] + '.png'
+                page.screenshot(path=screenshot_filepath)
+                logger.info(f"📸 Đã lưu screenshot: {screenshot_filepath}")
             
             return html_filepath
             
@@ -914,6 +1145,38 @@ class NorthdataScraper:
             logger.error(f"❌ Lỗi save HTML to data folder: {str(e)}")
             return None
     
+    def _write_company_html(self, company_name: str, registernummer: str, html_content: str) -> str:
+        """Ghi HTML công ty vào data/companies/<tên>_<HRB>_northdata.html (đè file cũ), return filepath
+        
+        File cũ có nội dung y hệt thì không ghi lại (scrape lại công ty chưa đổi gì)
+        """
+        # Làm sạch tên công ty để dùng làm tên file
+        clean_name = _FILENAME_UNSAFE_RE.sub('', company_name).strip().replace(' ', '_')
+        
+        # Tên file HTML với tên công ty
+        html_filename = f"{clean_name}_{registernummer}_northdata.html"
+        html_filepath = os.path.join(self._companies_dir, html_filename)
+        html_bytes = html_content.encode('utf-8')
+        
+        unchanged = False
+        try:
+            # Chỉ đọc file cũ khi cùng kích thước
+            if os.path.getsize(html_filepath) == len(html_bytes):
+                with open(html_filepath, 'rb') as f:
+                    unchanged = f.read() == html_bytes
+        except OSError:
+            pass
+        if unchanged:
+            logger.info(f"♻️ HTML không đổi, giữ file cũ: {html_filepath}")
+            return html_filepath
+        
+        os.makedirs(self._companies_dir, exist_ok=True)
+        with open(html_filepath, 'wb') as f:
+            f.write(html_bytes)
+        
+        logger.info(f"💾 Đã lưu HTML (đè lên file cũ): {html_filepath}")
+        return html_filepath
+    
     def _save_html_debug(self, page: Page, company_name: str, registernummer: str, is_search_page: bool = False):
         """Lưu HTML để debug và phân tích"""
         try:
@@ -963,8 +1226,6 @@ class NorthdataScraper:
 
 
 if __name__ == "__main__":
-    import json
-    
     # Load companies từ companies.json
     companies_file = os.path.join(
         os.path.dirname(os.path.dirname(__file__)), 
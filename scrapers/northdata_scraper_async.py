@@ -0,0 +1,284 @@
+"""
+Northdata.de Scraper (async)
+Scrape nhiều công ty song song trên một browser dùng chung bằng playwright.async_api
+"""
+
+import sys
+import os
+from pathlib import Path
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+from scrapers.northdata_scraper import NorthdataScraper, _is_blocked_request, _write_json_atomic
+
+# Setup logging
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
+
+# Số công ty chạy cùng lúc mặc định
+MAX_CONCURRENCY = 5
+
+
+class AsyncNorthdataScraper:
+    """
+    Batch scraper cho Northdata dùng playwright.async_api
+    
+    Browser launch một lần trong __aenter__, mỗi công ty một BrowserContext + Page riêng,
+    số context chạy cùng lúc giới hạn bởi Semaphore. Extract dùng lại logic của NorthdataScraper
+    trên HTML của trang (bản sync vẫn giữ nguyên cho server.py).
+    
+    Usage:
+        async with AsyncNorthdataScraper() as scraper:
+            results = await scraper.scrape_many(jobs)
+    """
+    
+    def __init__(self, headless: bool = True):
+        self.headless = headless
+        self._sync = NorthdataScraper(headless=headless)
+        self.base_url = self._sync.base_url
+        self._playwright = None
+        self._browser: Optional[Browser] = None
+        # Giới hạn số context mở cùng lúc (chỉ phần dùng browser, extract chạy ngoài giới hạn này)
+        self._page_slots: Optional[asyncio.Semaphore] = None
+    
+    async def __aenter__(self) -> 'AsyncNorthdataScraper':
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        logger.info("🌐 Đã khởi động browser Northdata dùng chung")
+        self._page_slots = asyncio.Semaphore(MAX_CONCURRENCY)
+        if not os.path.exists(self._sync._storage_state_path):
+            await self._prime_cookie_state()
+        return self
+    
+    async def _prime_cookie_state(self):
+        """Accept cookie một lần trước batch → mọi context sau load storage_state, không gặp popup"""
+        context = await self._browser.new_context()
+        try:
+            page = await context.new_page()
+            await page.goto(self.base_url, wait_until='domcontentloaded')
+            await self._accept_cookies(page, wait=True)
+        except Exception as e:
+            logger.warning(f"⚠️ Không thể accept cookie Northdata trước batch: {e}")
+        finally:
+            await context.close()
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Lỗi đóng browser: {e}")
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._browser = None
+        self._playwright = None
+    
+    async def scrape_many(self, jobs: List[Tuple[str, str]], max_concurrency: int = MAX_CONCURRENCY) -> List[Dict]:
+        """
+        Scrape nhiều công ty song song
+        
+        Args:
+            jobs: List (company_name, registernummer)
+            max_concurrency: Số context chạy cùng lúc
+        
+        Returns:
+            List kết quả theo đúng thứ tự của jobs
+        """
+        self._page_slots = asyncio.Semaphore(max(1, max_concurrency))
+        
+        tasks = [asyncio.create_task(self.scrape_company_async(company_name, registernummer)) for company_name, registernummer in jobs]
+        return await asyncio.gather(*tasks)
+    
+    async def scrape_company_async(self, company_name: str, registernummer: str, force_rescrape: bool = False) -> Dict:
+        """Scrape một công ty trong BrowserContext riêng trên browser dùng chung (dùng chung disk cache với bản sync)"""
+        if not force_rescrape:
+            cached = self._sync._load_cached_result(company_name, registernummer)
+            if cached is not None:
+                logger.info(f"♻️ Dùng lại kết quả Northdata đã scrape cho {company_name}")
+                return cached
+        
+        async with self._page_slots:
+            context = None
+            try:
+                context = await self._new_context()
+                page = await context.new_page()
+                if self._sync.block_heavy_resources:
+                    await page.route("**/*", _block_heavy_request)
+                page_content, html_content, on_company_page = await self._fetch_on_page(page, company_name, registernummer)
+            except Exception as e:
+                logger.error(f"❌ Lỗi scrape Northdata (async) {company_name}: {e}")
+                return {}
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        logger.warning(f"⚠️ Lỗi đóng context Northdata (async): {e}")
+        
+        # Ghi file + regex/lxml trên HTML chạy trên thread: event loop tiếp tục điều khiển các page khác
+        # trong lúc extract, slot context đã nhả cho công ty tiếp theo
+        return await asyncio.to_thread(self._extract_and_store, company_name, registernummer, page_content, html_content, on_company_page)
+    
+    async def _new_context(self) -> BrowserContext:
+        """Context load cookie state đã lưu, file state hỏng thì tạo context không có state (như bản sync)"""
+        state_path = self._sync._storage_state_path
+        if os.path.exists(state_path):
+            try:
+                return await self._browser.new_context(storage_state=state_path)
+            except Exception as e:
+                logger.warning(f"⚠️ Không load được cookie state Northdata, tạo context không có state: {e}")
+        return await self._browser.new_context()
+    
+    async def _fetch_on_page(self, page: Page, company_name: str, registernummer: str) -> Tuple[str, str, bool]:
+        """
+        Search → mở company page (cùng flow với bản sync)
+        
+        Return (HTML cả page, HTML section cần lưu, True nếu chắc chắn đã tới đúng company page)
+        """
+        logger.info(f"🔍 Searching Northdata (async) for: {company_name}")
+        await page.goto(self._sync._search_url(company_name, registernummer), wait_until='domcontentloaded')
+        
+        # Cookie đã accept trong storage_state → chỉ kiểm tra tức thời (cookie hết hạn)
+        await self._accept_cookies(page, wait=False)
+        
+        try:
+            await page.wait_for_selector(NorthdataScraper._SEARCH_SETTLED, state='visible', timeout=15000)
+        except Exception:
+            # URL search không ra kết quả → search qua ô tìm kiếm như bản sync
+            logger.warning("⚠️ Chưa thấy heading / kết quả search sau 15s, thử search qua ô tìm kiếm")
+            search_box = page.locator('input[name="query"]').first
+            await search_box.fill(company_name)
+            await search_box.press('Enter', timeout=15000)
+            try:
+                await page.wait_for_selector(NorthdataScraper._SEARCH_SETTLED, state='visible', timeout=15000)
+            except Exception:
+                logger.warning("⚠️ Chưa thấy heading / kết quả search sau 15s")
+        
+        # Đã ở đúng company page (heading khớp tên) thì không cần click kết quả
+        heading_span = page.locator('span.heading').first
+        on_company_page = False
+        if await heading_span.is_visible():
+            heading_text = await heading_span.inner_text()
+            on_company_page = company_name.lower() in heading_text.lower()
+        
+        if not on_company_page:
+            # Ưu tiên kết quả có HRB khớp (như bản sync), không có mới lấy kết quả đầu tiên
+            results = page.locator('.event')
+            if await results.count() > 0:
+                company_href = await self._find_company_link(page, registernummer) if registernummer else None
+                if company_href:
+                    await page.goto(company_href, wait_until='domcontentloaded')
+                    logger.info("✅ Đã mở kết quả có HRB khớp")
+                    on_company_page = True
+                else:
+                    await results.first.click()
+                    logger.info("✅ Đã click vào kết quả đầu tiên")
+                try:
+                    await page.wait_for_selector('span.heading', timeout=15000)
+                except Exception:
+                    logger.warning("⚠️ Chưa thấy heading của company page sau 15s")
+            else:
+                logger.warning(f"⚠️ Không tìm thấy kết quả nào cho {company_name}")
+        
+        await page.wait_for_load_state('load')
+        
+        # HTML cần lưu: section nội dung, không có thì full page
+        page_content = await page.content()
+        html_content = await page.evaluate(NorthdataScraper._SECTION_HTML_JS, NorthdataScraper._TARGET_SECTION)
+        if html_content is None:
+            logger.warning(f"⚠️ Target section not found, saving full HTML: {len(page_content)} characters")
+            html_content = page_content
+        return page_content, html_content, on_company_page
+    
+    async def _find_company_link(self, page: Page, registernummer: str) -> Optional[str]:
+        """URL kết quả search có registernummer khớp (cùng script với bản sync), None nếu không có"""
+        try:
+            href = await page.evaluate(NorthdataScraper._FIND_COMPANY_LINK_JS, self._sync._company_link_args(registernummer))
+        except Exception as e:
+            logger.error(f"❌ Lỗi find company link: {e}")
+            return None
+        if href:
+            logger.info(f"🎯 Tìm thấy company với HRB {registernummer}: {href}")
+        return href
+    
+    def _extract_and_store(self, company_name: str, registernummer: str, page_content: str, html_content: str,
+                           on_company_page: bool) -> Dict:
+        """Lưu HTML vào data/companies/ + extract + cache kết quả nếu đã tới đúng company page (chạy trên thread)"""
+        try:
+            html_filepath = self._sync._write_company_html(company_name, registernummer, html_content)
+        except Exception as e:
+            logger.error(f"❌ Lỗi save HTML to data folder: {e}")
+            html_filepath = None
+        
+        # Extract trên HTML (không có fallback selector như bản sync)
+        data = self._sync._extract_company_data(page_content, registernummer)
+        data['html_filepath'] = html_filepath
+        if on_company_page:
+            self._sync._store_cached_result(company_name, registernummer, data)
+        
+        logger.info(f"✅ Đã extract {len(data)} trường từ Northdata cho {company_name}")
+        return data
+    
+    async def _accept_cookies(self, page: Page, wait: bool):
+        """Click "Accept all" nếu popup hiện rồi lưu storage_state (cùng file với bản sync)"""
+        cookie_popup = page.locator('text="Accept all"').first
+        try:
+            if wait:
+                await cookie_popup.wait_for(state='visible', timeout=3000)
+            elif not await cookie_popup.is_visible():
+                return
+            await cookie_popup.click()
+            logger.info("🍪 Đã accept cookie consent")
+            await cookie_popup.wait_for(state='hidden', timeout=5000)
+        except Exception:
+            logger.info("ℹ️ Không có cookie popup hoặc đã được handle")
+            return
+        
+        try:
+            os.makedirs(os.path.dirname(self._sync._storage_state_path), exist_ok=True)
+            # Nhiều context có thể cùng gặp cookie hết hạn → ghi atomic, các context khác vẫn đọc được file cũ trọn vẹn
+            state = await page.context.storage_state()
+            await asyncio.to_thread(_write_json_atomic, self._sync._storage_state_path, state)
+        except Exception as e:
+            logger.warning(f"⚠️ Không thể lưu cookie state Northdata: {e}")
+
+
+async def _block_heavy_request(route):
+    """Route handler async: abort ảnh/font/video/tracking, còn lại cho qua"""
+    if _is_blocked_request(route.request):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+def scrape_many(jobs: List[Tuple[str, str]], max_concurrency: int = MAX_CONCURRENCY, headless: bool = True) -> List[Dict]:
+    """Wrapper sync cho code không chạy trong event loop"""
+    async def run() -> List[Dict]:
+        async with AsyncNorthdataScraper(headless=headless) as scraper:
+            return await scraper.scrape_many(jobs, max_concurrency)
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    # Usage: python scrapers/northdata_scraper_async.py [max_concurrency]
+    companies_file = Path(__file__).parent.parent / 'data' / 'companies.json'
+    with open(companies_file, 'r', encoding='utf-8') as f:
+        companies = json.load(f)
+    
+    max_concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else MAX_CONCURRENCY
+    results = scrape_many(
+        [(c['company_name'], c['registernummer']) for c in companies],
+        max_concurrency=max_concurrency,
+    )
+    
+    for company, result in zip(companies, results):
+        print(f"\n{'='*80}")
+        print(f"NORTHDATA: {company['company_name']}")
+        print(f"{'='*80}")
+        print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -10,33 +10,59 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 from typing import Dict, Optional, List
 import time
 import logging
-# from models.company_model import CompanyData  # Removed - not needed
-import PyPDF2
 import pdfplumber
 from playwright.sync_api import sync_playwright, Page, Browser
 import asyncio
 import os
-import os
 
 # Setup logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 
 class UnternehmensregisterScraper:
     """Scraper for unternehmensregister.de"""
     
+    # Page "yên": có phần tử cần đợi (nếu có) và không có resource mới nào load xong trong quietMs.
+    # Trạng thái giữ trên window theo token của lần đợi (mỗi lần gọi _wait_quiet đếm lại từ đầu)
+    _QUIET_JS = """
+        ({selector, quietMs, token}) => {
+            let state = window.__quietWait;
+            if (!state || state.token !== token) {
+                state = window.__quietWait = {token, count: -1, since: 0};
+            }
+            const count = performance.getEntriesByType('resource').length;
+            if (count !== state.count) {
+                state.count = count;
+                state.since = Date.now();
+            }
+            return (!selector || !!document.querySelector(selector)) && Date.now() - state.since >= quietMs;
+        }
+    """
+    
     def __init__(self, headless: bool = True):
         self.base_url = "https://unternehmensregister.de/de"
         self.headless = headless
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Connection': 'keep-alive',
+            'Accept-Encoding': 'gzip, deflate',
         })
+        # Pool kết nối keep-alive dùng chung (server gọi từ nhiều thread) + retry lỗi tạm thời
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.download_dir = Path("data/downloads")
         self.download_dir.mkdir(parents=True, exist_ok=True)
     
@@ -160,9 +186,8 @@ class UnternehmensregisterScraper:
                         advanced_search_btn.click()
                         logger.info(f"✅ Clicked 'Erweiterte Suche' (attempt {attempt + 1})")
                         
-                        # Human-like wait (3-5 giây)
-                        wait_time = random.uniform(3, 5)
-                        page.wait_for_timeout(int(wait_time * 1000))
+                        # Đợi form tìm kiếm mở ra (tối đa 5 giây như delay cũ)
+                        self._wait_quiet(page, 'input#companyName', max_ms=5000)
                         
                         # Kiểm tra cookie banner sau khi click Erweiterte Suche
                         logger.info("🍪 Checking for cookie banner after Erweiterte Suche...")
@@ -245,10 +270,9 @@ class UnternehmensregisterScraper:
                 page.wait_for_timeout(int(delay * 1000))
                 search_btn.click()
                 
-                # Đợi kết quả tìm kiếm với human-like delay
+                # Đợi bảng kết quả tìm kiếm (tối đa 7 giây như delay cũ)
                 logger.info("⏳ Waiting for search results...")
-                wait_time = random.uniform(4, 7)
-                page.wait_for_timeout(int(wait_time * 1000))
+                self._wait_quiet(page, '[class*="searchResultTable_tableContainer"]', max_ms=7000)
                 
                 # Xử lý cookie banner một lần nữa sau khi search (có thể xuất hiện lại)
                 logger.info("🍪 Checking for cookie banner after search...")
@@ -268,33 +292,6 @@ class UnternehmensregisterScraper:
             traceback.print_exc()
             return {}
     
-    def _extract_mitarbeiter_from_jahresabschluss(self, company_name: str, registernummer: str) -> Optional[int]:
-        """Extract số nhân viên từ Jahresabschluss data đã có"""
-        # Dựa trên dữ liệu đã phân tích trước đó
-        if "MAGNA" in company_name.upper():
-            return 7  # "waren durchschnittlich 7 Mitarbeiter"
-        elif "FINANZINVEST" in company_name.upper():
-            return 7  # "6 Aushilfen + 1 Teilzeitangestellte"
-        return None
-    
-    def _extract_umsatz_from_jahresabschluss(self, company_name: str, registernummer: str) -> Optional[float]:
-        """Extract doanh thu từ Jahresabschluss data đã có"""
-        # Dựa trên dữ liệu đã phân tích trước đó
-        if "MAGNA" in company_name.upper():
-            return None  # MAGNA có verkürzte GuV, không có Umsatz
-        elif "FINANZINVEST" in company_name.upper():
-            return 2323941.45  # "Provisionserträge 2.323.941,45 EUR"
-        return None
-    
-    def _extract_gewinn_from_jahresabschluss(self, company_name: str, registernummer: str) -> Optional[float]:
-        """Extract lợi nhuận/lỗ từ Jahresabschluss data đã có"""
-        # Dựa trên dữ liệu đã phân tích trước đó
-        if "MAGNA" in company_name.upper():
-            return -1835850.57  # "Jahresfehlbetrag 1.835.850,57 EUR" (lỗ)
-        elif "FINANZINVEST" in company_name.upper():
-            return 9447.58  # "Jahresüberschuss 9.447,58 EUR" (lãi)
-        return None
-    
     def parse_pdf_document(self, pdf_url: str) -> Dict:
         """
         Parse PDF document from unternehmensregister
@@ -387,10 +384,9 @@ class UnternehmensregisterScraper:
                 page.wait_for_timeout(int(delay * 1000))
                 first_jahresabschluss['element'].click()
                 
-                # Đợi trang load với human-like delay
-                wait_time = random.uniform(3, 5)
-                logger.info(f"⏳ Waiting {wait_time:.1f}s for Jahresabschluss page to load...")
-                page.wait_for_timeout(int(wait_time * 1000))
+                # Đợi table#begin_pub của trang Jahresabschluss (tối đa 5 giây như delay cũ)
+                logger.info("⏳ Waiting for Jahresabschluss page to load...")
+                self._wait_quiet(page, 'table#begin_pub', max_ms=5000)
                 
                 # Kiểm tra cookie banner sau khi click Jahresabschluss
                 logger.info("🍪 Checking for cookie banner after clicking Jahresabschluss...")
@@ -532,6 +528,29 @@ class UnternehmensregisterScraper:
         
         return data
     
+    def _wait_quiet(self, page: Page, selector: Optional[str] = None, quiet_ms: int = 500, max_ms: int = 5000):
+        """
+        Đợi tới khi page yên (có selector nếu truyền vào + không có request mới trong quiet_ms), tối đa max_ms
+        
+        Thay cho sleep cố định: page nhanh thì đi tiếp ngay, page chậm thì đợi không quá max_ms như trước
+        """
+        try:
+            page.wait_for_function(
+                self._QUIET_JS,
+                arg={'selector': selector, 'quietMs': quiet_ms, 'token': time.monotonic_ns()},
+                timeout=max_ms,
+                polling=100,
+            )
+        except Exception:
+            logger.debug(f"⏳ Page chưa yên sau {max_ms}ms (selector={selector}), đi tiếp")
+    
+    def _wait_hidden(self, locator, timeout: int):
+        """Đợi phần tử (vd: cookie banner) biến mất, hết timeout thì đi tiếp"""
+        try:
+            locator.wait_for(state='hidden', timeout=timeout)
+        except Exception:
+            pass
+    
     def _handle_cookie_banner(self, page):
         """
         Handle cookie consent banner with enhanced strategies
@@ -539,9 +558,9 @@ class UnternehmensregisterScraper:
         try:
             logger.info("🍪 Checking for cookie consent popup...")
             
-            # Đợi một chút để banner load
+            # Đợi script của banner load xong (tối đa 2 giây)
             import random
-            page.wait_for_timeout(random.randint(1000, 2000))
+            self._wait_quiet(page, max_ms=2000)
             
             # Strategy 1: Tìm button "Allen zustimmen" với timeout dài hơn
             cookie_selectors = [
@@ -585,8 +604,8 @@ class UnternehmensregisterScraper:
                             cookie_button.click(force=True)
                             logger.info("✅ Successfully clicked cookie consent button (force click)")
                         
-                        # Đợi banner biến mất với timeout dài hơn
-                        page.wait_for_timeout(random.randint(2000, 3000))
+                        # Đợi banner biến mất (tối đa 3 giây)
+                        self._wait_hidden(cookie_button, timeout=3000)
                         cookie_clicked = True
                         break
                     else:
@@ -625,7 +644,7 @@ class UnternehmensregisterScraper:
                                         button.click(force=True)
                                         logger.info("✅ Successfully clicked cookie button via wrapper (force click)")
                                     
-                                    page.wait_for_timeout(random.randint(2000, 3000))
+                                    self._wait_hidden(button, timeout=3000)
                                     cookie_clicked = True
                                     break
                             except Exception as e:
@@ -22,7 +22,8 @@ from scrapers.linkedin_scraper import LinkedInScraper
 from scrapers.unternehmensregister_scraper import UnternehmensregisterScraper
 
 # Setup logging
-logging.basicConfig(level=logging.INFO)
+# LOG_LEVEL=WARNING để batch/production bỏ log INFO (mặc định INFO)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 # FastAPI app
@@ -55,7 +56,7 @@ is_production = True  # Always headless on cloud
 
 handelsregister_scraper = HandelsregisterScraper(headless=is_production, language='FR')
 northdata_scraper = NorthdataScraper(headless=is_production)
-linkedin_scraper = LinkedInScraper(headless=is_production)  # Headless trong production
+linkedin_scraper = LinkedInScraper(headless=is_production, store_raw_html=True)  # Headless trong production, API trả về about_html
 unternehmensregister_scraper = UnternehmensregisterScraper(headless=is_production)  # Headless trong production
 
 def load_companies_data():
@@ -86,6 +87,12 @@ def get_company_ust_idnr(company_name: str, registernummer: str) -> Optional[str
     logger.info(f"ℹ️ No USt-IdNr found in companies.json for {company_name}")
     return None
 
+@app.on_event("shutdown")
+def shutdown_scrapers():
+    """Đóng browser Northdata / LinkedIn dùng chung khi server dừng"""
+    northdata_scraper.close_pool()
+    linkedin_scraper.close_pool()
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -132,7 +139,8 @@ async def crawl_company(request: CompanyRequest):
         
         # Run scrapers in parallel using ThreadPoolExecutor with error handling
         with ThreadPoolExecutor(max_workers=4) as executor:
-            # 1. Start Handelsregister scraper
+            # 1. Start Handelsregister scraper - dùng lại files AD/SI < 30 ngày của cùng company
+            # (cùng tên + HRB), còn lại crawl handelsregister.de
             handelsregister_future = executor.submit(
                 handelsregister_scraper.scrape_company,
                 request.company_name,
@@ -142,14 +150,14 @@ async def crawl_company(request: CompanyRequest):
             
             # 2. Start Northdata scraper
             northdata_future = executor.submit(
-                northdata_scraper.scrape_company,
+                northdata_scraper.scrape_pooled,
                 request.company_name,
                 request.registernummer
             )
             
             # 3. Start LinkedIn scraper
             linkedin_future = executor.submit(
-                linkedin_scraper.scrape_with_selenium,
+                linkedin_scraper.scrape_pooled,
                 request.company_name,
                 request.registernummer
             )